@@ -6,9 +6,8 @@ import streamlit as st
 from src.agent import create_agent
 from src.config import Config
 from src.pdf_processor import pdf_processor
-from src.vector_store import vector_store
+from src.ingestion import ingestion_pipeline
 from src.logger import logger
-from langchain_huggingface import HuggingFaceEmbeddings
 
 from src.langsmith_evaluator import evaluate_live_question_and_log 
 
@@ -17,26 +16,21 @@ st.set_page_config(page_title="Neura AI Pipeline - Simple", page_icon="🤖", la
 
 def process_and_store_pdf(pdf_path: str):
     try:
-        vector_store.create_collection(force_recreate=False)
-        
-        documents = pdf_processor.process_pdf(pdf_path)
-        
-        embeddings_model = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        
-        embeddings = []
-        for doc in documents:
-            embedding = embeddings_model.embed_query(doc["content"])
-            embeddings.append(embedding)
-        
-        vector_store.add_embeddings(embeddings, documents)
-        logger.info(f"Stored {len(documents)} embeddings in vector store")
-        return len(documents)
+        return ingestion_pipeline.ingest_pdf(pdf_path)
         
     except Exception as e:
         logger.error(f"Error processing and storing PDF: {e}")
         raise
 
 
+def stream_tokens(agent, prompt: str, result: dict):
+    for event in agent.stream({"query": prompt}):
+        if event["type"] == "token":
+            yield event["content"]
+        else:
+            result.update(event["state"])
+
+
 def init_state():
     if "agent" not in st.session_state:
         try:
@@ -73,7 +67,13 @@ def render_sidebar():
                 else:
                     latest = sorted(pdfs)[-1]
                     num_docs = process_and_store_pdf(latest)
-                    st.sidebar.success(f"Processed {os.path.basename(latest)} into {num_docs} embeddings in vector store")
+                    if ingestion_pipeline.last_stats.get("unchanged"):
+                        st.sidebar.info(f"{os.path.basename(latest)} is unchanged, {num_docs} embeddings already stored")
+                    else:
+                        st.sidebar.success(f"Processed {os.path.basename(latest)} into {num_docs} embeddings in vector store")
+                    throughput = ingestion_pipeline.last_stats.get("chunks_per_sec")
+                    if throughput:
+                        st.sidebar.caption(f"Embedding throughput: {throughput:.1f} chunks/sec")
             except Exception as e:
                 st.sidebar.error(f"Error processing PDF: {e}")
 
@@ -104,13 +104,13 @@ def render_main():
 
             if agent:
                 try:
-                    result = agent.invoke({"query": prompt})
-                    response = result.get("response", "No response")
-                    for chunk in response.split():
-                        full_response += chunk + " "
-                        message_placeholder.markdown(full_response + "▌")
+                    result = {}
+                    streamed = message_placeholder.write_stream(stream_tokens(agent, prompt, result))
+                    full_response = result.get("response") or "No response"
 
-                    message_placeholder.markdown(full_response)
+                    # Nothing is streamed when the graph fails before generation
+                    if streamed != full_response:
+                        message_placeholder.markdown(full_response)
 
                     st.session_state.messages.append({"role": "assistant",
                                                     "content": full_response,
@@ -1,19 +1,57 @@
+import asyncio
+import contextvars
 import os
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Annotated, Any, AsyncIterator, Dict, Iterator, List, Optional
 from langgraph.graph import StateGraph, START, END
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.messages import AIMessageChunk, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 from src.logger import logger
 from src.config import Config
 from src.weather_service import weather_service
 from src.pdf_processor import pdf_processor
 from src.vector_store import vector_store
+from src.ingest_manifest import ingest_manifest
 from src.rag_retriever import rag_retriever
 from src.search_service import search_service
+from src.http_client import http_client
+from src.embeddings import embedding_registry, query_embedding_cache
+from src.cache import SemanticCache
+from src.city_extractor import city_extractor
+from src.query_router import query_router
 from langsmith import traceable
 
 
+# Weather answers go stale within minutes, so they are never cached
+RESPONSE_CACHE_ROUTES = ("pdf", "general")
+
+# Fan-out branch node per route, in the order their context is merged
+FANOUT_BRANCHES = {"weather": "fanout_weather", "pdf": "fanout_pdf", "general": "fanout_general"}
+FANOUT_LABELS = {"weather": "Weather data", "pdf": "Document excerpts", "general": "Web search results"}
+
+
+def merge_state(current: Optional[Dict[str, Any]], update: Dict[str, Any]) -> Dict[str, Any]:
+    # Reducer for the graph state. Sequential nodes return the whole state, but
+    # parallel fan-out branches each return a partial update in the same step,
+    # so dict-valued bookkeeping keys are merged instead of overwritten.
+    merged = dict(current or {})
+    for key, value in update.items():
+        if key in ("metadata", "branch_results") and isinstance(value, dict):
+            merged[key] = {**merged.get(key, {}), **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def final_stream_state(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # A traced stream records the final state as its output, like invoke, instead of every token
+    for event in reversed(events):
+        if event.get("type") == "final":
+            return event["state"]
+    return {}
+
+
 class AgentState:
     def __init__(self):
         self.query: str = ""
@@ -34,11 +72,19 @@ class AIAgent:
         )
         
         try:
-            self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+            self.embeddings = embedding_registry.get()
         except Exception as e:
             logger.warning(f"Failed to initialize embeddings: {e}")
             self.embeddings = None
         
+        self.response_cache = (SemanticCache(max_size=Config.RESPONSE_CACHE_SIZE,
+                                             ttl=Config.RESPONSE_CACHE_TTL,
+                                             threshold=Config.RESPONSE_CACHE_THRESHOLD)
+                               if Config.RESPONSE_CACHE else None)
+        
+        self.fanout = Config.AGENT_FANOUT
+        self.branch_deadline = Config.AGENT_BRANCH_DEADLINE
+        
         # Initialize and compile the LangGraph
         try:
             self.graph = self.create_graph()
@@ -48,19 +94,36 @@ class AIAgent:
             self.graph = None
     
     def create_graph(self):
-        graph = StateGraph(dict)
+        graph = StateGraph(Annotated[dict, merge_state])
         
         # NODES
-        graph.add_node("classify", self._classify_query)
-        graph.add_node("fetch_weather", self._fetch_weather)
-        graph.add_node("fetch_pdf_context", self._fetch_pdf_context)
-        graph.add_node("fetch_general_context", self._fetch_general_context)
-        graph.add_node("generate_response", self._generate_response)
+        # Each node has a sync and an async variant; graph.invoke uses the
+        # former and graph.ainvoke the latter
+        graph.add_node("classify", RunnableLambda(self._classify_query, afunc=self._aclassify_query))
+        graph.add_node("check_response_cache", RunnableLambda(self._check_response_cache,
+                                                              afunc=self._acheck_response_cache))
+        graph.add_node("fetch_weather", RunnableLambda(self._fetch_weather, afunc=self._afetch_weather))
+        graph.add_node("fetch_pdf_context", RunnableLambda(self._fetch_pdf_context, afunc=self._afetch_pdf_context))
+        graph.add_node("fetch_general_context", RunnableLambda(self._fetch_general_context,
+                                                               afunc=self._afetch_general_context))
+        graph.add_node("generate_response", RunnableLambda(self._generate_response, afunc=self._agenerate_response))
+        
+        # Fan-out branches run concurrently in one step and the merge node
+        # joins whatever they returned before their deadline
+        for route, node in FANOUT_BRANCHES.items():
+            graph.add_node(node, RunnableLambda(self._fanout_branch(route), afunc=self._afanout_branch(route)))
+        graph.add_node("merge_context", RunnableLambda(self._merge_context, afunc=self._amerge_context))
         
 
 
-        # routing logic after classification
+        # routing logic after classification and the response cache lookup
         def route_after_classify(state: Dict[str, Any]) -> str:
+            if state.get("metadata", {}).get("response_cache_hit"):
+                return END
+            candidates = state.get("metadata", {}).get("route_candidates", [])
+            if self.fanout and len(candidates) > 1:
+                logger.info(f"Fanning out to {', '.join(candidates)}")
+                return [FANOUT_BRANCHES[route] for route in candidates]
             query_type = state.get("query_type", "general")
             if query_type == "weather":
                 return "fetch_weather"
@@ -72,13 +135,16 @@ class AIAgent:
 
         # EDGES
         graph.add_edge(START, "classify")
+        graph.add_edge("classify", "check_response_cache")
         graph.add_conditional_edges(
-                                    "classify",
+                                    "check_response_cache",
                                     route_after_classify,
                                     {
                                         "fetch_weather": "fetch_weather",
                                         "fetch_pdf_context": "fetch_pdf_context",
-                                        "fetch_general_context": "fetch_general_context"
+                                        "fetch_general_context": "fetch_general_context",
+                                        **{node: node for node in FANOUT_BRANCHES.values()},
+                                        END: END
                                     }
                                 )
         
@@ -86,6 +152,9 @@ class AIAgent:
         graph.add_edge("fetch_weather", "generate_response")
         graph.add_edge("fetch_pdf_context", "generate_response")
         graph.add_edge("fetch_general_context", "generate_response")
+        for node in FANOUT_BRANCHES.values():
+            graph.add_edge(node, "merge_context")
+        graph.add_edge("merge_context", "generate_response")
         
         # Response generation leads to end
         graph.add_edge("generate_response", END)
@@ -95,29 +164,25 @@ class AIAgent:
     def _classify_query(self, state: Dict[str, Any]) -> Dict[str, Any]:
         try:
             query = state.get("query", "")
-            query_lower = query.lower()
             
-            weather_keywords = ["weather", "temperature", "rain", "snow", "wind", "forecast", "climate",
-                                "humid", "pressure", "cloud", "storm", "thunder", "lightning", "fog",
-                                "drizzle", "sleet", "hail", "degree", "celsius", "fahrenheit", "sunny",
-                                "cloudy", "windy", "rainy", "snowy", "cold", "hot", "warm", "cool",
-                                "humidity", "visibility", "sunset", "sunrise", "dew", "frost"]
+            try:
+                stats = vector_store.get_cached_stats()
+                has_documents = stats.get("vector_count", 0) > 0
+            except:
+                has_documents = False
             
-            if any(keyword in query_lower for keyword in weather_keywords):
-                state["query_type"] = "weather"
-                logger.info("Query classified as weather query")
-            else:
-                try:
-                    stats = vector_store.get_stats()
-                    if stats.get("vector_count", 0) > 0:
-                        state["query_type"] = "pdf"
-                        logger.info("Query classified as PDF query (PDFs available)")
-                    else:
-                        state["query_type"] = "general"
-                        logger.info("Query classified as general query (no PDFs available)")
-                except:
-                    state["query_type"] = "general"
-                    logger.info("Query classified as general query (fallback)")
+            query_embedding = None
+            embed_texts = None
+            if query_router.use_embeddings and self.embeddings and query_router.match_keywords(query) != "strong":
+                query_embedding = query_embedding_cache.get_embedding(query, self.embeddings)
+                embed_texts = self.embeddings.embed_documents
+            
+            decision = query_router.route(query, has_documents, query_embedding, embed_texts)
+            state["query_type"] = decision["route"]
+            state["metadata"]["route_candidates"] = decision["candidates"]
+            state["metadata"]["route_scores"] = decision["scores"]
+            logger.info(f"Query classified as {decision['route']} query "
+                        f"(method: {decision['method']}, candidates: {decision['candidates']})")
             
             return state
             
@@ -126,25 +191,79 @@ class AIAgent:
             state["query_type"] = "general"
             return state
 
-    def _fetch_weather(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def _aclassify_query(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        # Classification is local apart from an occasional collection stats refresh
+        return await asyncio.to_thread(self._classify_query, state)
+
+    def _response_cache_tag(self, state: Dict[str, Any]) -> Optional[List[Any]]:
+        route = state.get("query_type")
+        if self.response_cache is None or not self.embeddings or route not in RESPONSE_CACHE_ROUTES:
+            return None
+        if route == "pdf":
+            # write_generation only counts this process's writes; ingests from other processes
+            # (e.g. the bulk CLI) show up through the shared manifest file, which they save
+            stats = vector_store.get_cached_stats()
+            return [route, vector_store.write_generation, ingest_manifest.version(), stats.get("vector_count", 0)]
+        return [route]
+    
+    def _check_response_cache(self, state: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            if state.get("query_type") != "weather":
+            tag = self._response_cache_tag(state)
+            if tag is None:
                 return state
             
-            query = state.get("query", "")
+            query_embedding = query_embedding_cache.get_embedding(state.get("query", ""), self.embeddings)
+            response, similarity = self.response_cache.get_match(query_embedding, tag=tuple(tag))
+            # Kept so the answer is stored under the corpus version it was generated from
+            state["metadata"]["response_cache_tag"] = tag
+            if response is not None:
+                state["response"] = response
+                state["metadata"]["response_cache_hit"] = True
+                state["metadata"]["response_cache_similarity"] = similarity
+                logger.info(f"Response cache hit (similarity {similarity:.3f})")
+            return state
             
-            extraction_prompt = f"""Extract the city name from this weather query. 
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return state
+    
+    async def _acheck_response_cache(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._check_response_cache, state)
+    
+    def _store_response(self, state: Dict[str, Any]):
+        tag = state["metadata"].get("response_cache_tag")
+        if tag is None or state["metadata"].get("context_error"):
+            return
+        try:
+            query_embedding = query_embedding_cache.get_embedding(state.get("query", ""), self.embeddings)
+            self.response_cache.set(query_embedding, state["response"], tag=tuple(tag))
+        except Exception as e:
+            logger.warning(f"Failed to store response in cache: {e}")
+    
+    def _city_extraction_messages(self, query: str) -> List[Any]:
+        extraction_prompt = f"""Extract the city name from this weather query. 
 Return ONLY the city name, nothing else.
 If no city is mentioned, return 'London'.
 
 Query: {query}
 City:"""
+        
+        return [HumanMessage(content=extraction_prompt)]
+
+    def _fetch_weather(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if state.get("query_type") != "weather":
+                return state
             
-            extraction_messages = [HumanMessage(content=extraction_prompt)]
+            query = state.get("query", "")
             
-            logger.info("Using LLM to extract city name from query")
-            city_response = self.llm.invoke(extraction_messages)
-            city = city_response.content.strip()
+            city = city_extractor.extract(query)
+            if city:
+                logger.info(f"Matched city in gazetteer: {city}")
+            else:
+                logger.info("Using LLM to extract city name from query")
+                city_response = self.llm.invoke(self._city_extraction_messages(query))
+                city = city_response.content.strip()
             
             logger.info(f"Fetching weather for city: {city}")
             weather_data = weather_service.get_weather(city)
@@ -157,6 +276,36 @@ City:"""
         except Exception as e:
             logger.error(f"Error fetching weather: {e}")
             state["context"] = f"Error fetching weather: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
+            return state
+    
+    async def _afetch_weather(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if state.get("query_type") != "weather":
+                return state
+            
+            query = state.get("query", "")
+            
+            city = city_extractor.extract(query)
+            if city:
+                logger.info(f"Matched city in gazetteer: {city}")
+            else:
+                logger.info("Using LLM to extract city name from query")
+                city_response = await self.llm.ainvoke(self._city_extraction_messages(query))
+                city = city_response.content.strip()
+            
+            logger.info(f"Fetching weather for city: {city}")
+            weather_data = await weather_service.aget_weather(city)
+            
+            state["weather_data"] = weather_data
+            state["context"] = weather_service.format_weather_text(weather_data)
+            
+            return state
+            
+        except Exception as e:
+            logger.error(f"Error fetching weather: {e}")
+            state["context"] = f"Error fetching weather: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
             return state
     
     def _fetch_pdf_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
@@ -167,12 +316,13 @@ City:"""
             query = state.get("query", "")
             
             if self.embeddings:
-                query_embedding = self.embeddings.embed_query(query)
+                query_embedding = query_embedding_cache.get_embedding(query, self.embeddings)
                 
                 logger.info("Retrieving context from vector store")
                 context_result = rag_retriever.get_context_for_query(
                     query_embedding=query_embedding,
-                    include_scores=True
+                    include_scores=True,
+                    query_text=query
                 )
                 
                 state["context"] = context_result.get("context", "")
@@ -185,6 +335,39 @@ City:"""
         except Exception as e:
             logger.error(f"Error fetching PDF context: {e}")
             state["context"] = f"Error retrieving context: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
+            return state
+    
+    async def _afetch_pdf_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if state.get("query_type") != "pdf":
+                return state
+            
+            query = state.get("query", "")
+            
+            if self.embeddings:
+                # Embedding is CPU-bound, keep it off the event loop
+                query_embedding = await asyncio.to_thread(query_embedding_cache.get_embedding,
+                                                          query, self.embeddings)
+                
+                logger.info("Retrieving context from vector store")
+                context_result = await rag_retriever.aget_context_for_query(
+                    query_embedding=query_embedding,
+                    include_scores=True,
+                    query_text=query
+                )
+                
+                state["context"] = context_result.get("context", "")
+                state["metadata"]["retrieved_documents"] = context_result.get("num_documents", 0)
+            else:
+                state["context"] = "Embeddings not available"
+            
+            return state
+            
+        except Exception as e:
+            logger.error(f"Error fetching PDF context: {e}")
+            state["context"] = f"Error retrieving context: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
             return state
     
     def _fetch_general_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
@@ -195,7 +378,10 @@ City:"""
             query = state.get("query", "")
             
             logger.info("Fetching context from web search")
-            search_results = search_service.search(query, max_results=5)
+            query_embedding = None
+            if search_service.semantic_cache is not None and self.embeddings:
+                query_embedding = query_embedding_cache.get_embedding(query, self.embeddings)
+            search_results = search_service.search(query, max_results=5, query_embedding=query_embedding)
             context = search_service.format_search_context(search_results)
             
             state["context"] = context
@@ -206,46 +392,184 @@ City:"""
         except ValueError as e:
             logger.warning(f"Search service not configured: {e}")
             state["context"] = "Unable to search. Please try asking about uploaded PDFs or weather instead."
+            state["metadata"]["context_error"] = str(e)
             return state
         
         except Exception as e:
             logger.error(f"Error fetching general context: {e}")
             state["context"] = f"Error fetching information: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
             return state
     
-    def _generate_response(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def _afetch_general_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
         try:
+            if state.get("query_type") != "general":
+                return state
+            
             query = state.get("query", "")
-            context = state.get("context", "")
-            query_type = state.get("query_type", "unknown")
-          
-            if query_type == "weather":
-                system_prompt = """You are a helpful weather assistant. 
+            
+            logger.info("Fetching context from web search")
+            query_embedding = None
+            if search_service.semantic_cache is not None and self.embeddings:
+                query_embedding = await asyncio.to_thread(query_embedding_cache.get_embedding,
+                                                          query, self.embeddings)
+            search_results = await search_service.asearch(query, max_results=5, query_embedding=query_embedding)
+            context = search_service.format_search_context(search_results)
+            
+            state["context"] = context
+            state["metadata"]["search_results_count"] = len(search_results.get("results", []))
+            
+            return state
+            
+        except ValueError as e:
+            logger.warning(f"Search service not configured: {e}")
+            state["context"] = "Unable to search. Please try asking about uploaded PDFs or weather instead."
+            state["metadata"]["context_error"] = str(e)
+            return state
+        
+        except Exception as e:
+            logger.error(f"Error fetching general context: {e}")
+            state["context"] = f"Error fetching information: {str(e)}"
+            state["metadata"]["context_error"] = str(e)
+            return state
+    
+    def _branch_fetchers(self, route: str):
+        return {
+            "weather": (self._fetch_weather, self._afetch_weather),
+            "pdf": (self._fetch_pdf_context, self._afetch_pdf_context),
+            "general": (self._fetch_general_context, self._afetch_general_context),
+        }[route]
+    
+    def _branch_state(self, state: Dict[str, Any], route: str) -> Dict[str, Any]:
+        # Each branch fetches into its own copy so concurrent branches never share state
+        return {**state, "query_type": route, "context": "", "weather_data": None, "metadata": {}}
+    
+    def _branch_update(self, route: str, branch_state: Dict[str, Any]) -> Dict[str, Any]:
+        error = branch_state["metadata"].get("context_error")
+        result = {
+            "status": "error" if error else "ok",
+            "context": branch_state.get("context", ""),
+            "weather_data": branch_state.get("weather_data"),
+            "metadata": branch_state["metadata"]
+        }
+        return {"branch_results": {route: result}}
+    
+    def _fanout_branch(self, route: str):
+        def run(state: Dict[str, Any]) -> Dict[str, Any]:
+            fetch, _ = self._branch_fetchers(route)
+            branch_state = self._branch_state(state, route)
+            # The branch runs in a worker so the deadline can be enforced; the
+            # copied context keeps its calls inside the current trace. Each branch
+            # gets its own worker, so one still blocked past its deadline (until its
+            # HTTP timeouts fire) never queues the branches of later requests
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"fanout-{route}")
+            future = executor.submit(contextvars.copy_context().run, fetch, branch_state)
+            try:
+                future.result(timeout=self.branch_deadline)
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"{route} branch missed its {self.branch_deadline}s deadline")
+                return {"branch_results": {route: {"status": "timeout"}}}
+            except Exception as e:
+                logger.error(f"{route} branch failed: {e}")
+                return {"branch_results": {route: {"status": "error"}}}
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            return self._branch_update(route, branch_state)
+        return run
+    
+    def _afanout_branch(self, route: str):
+        async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+            _, afetch = self._branch_fetchers(route)
+            branch_state = self._branch_state(state, route)
+            try:
+                await asyncio.wait_for(afetch(branch_state), timeout=self.branch_deadline)
+            except asyncio.TimeoutError:
+                logger.warning(f"{route} branch missed its {self.branch_deadline}s deadline")
+                return {"branch_results": {route: {"status": "timeout"}}}
+            except Exception as e:
+                logger.error(f"{route} branch failed: {e}")
+                return {"branch_results": {route: {"status": "error"}}}
+            return self._branch_update(route, branch_state)
+        return run
+    
+    def _merge_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        results = state.get("branch_results", {})
+        sections = []
+        sources = []
+        for route in FANOUT_BRANCHES:
+            result = results.get(route)
+            if not result or result["status"] != "ok" or not result.get("context"):
+                continue
+            sections.append(f"[{FANOUT_LABELS[route]}]\n{result['context']}")
+            sources.append(route)
+            state["metadata"].update(result["metadata"])
+            if result.get("weather_data"):
+                state["weather_data"] = result["weather_data"]
+        
+        state["metadata"]["fanout"] = {route: result["status"] for route, result in results.items()}
+        state["metadata"]["fanout_sources"] = sources
+        if len(sources) == 1:
+            state["query_type"] = sources[0]
+        if "weather" in sources:
+            # Answers that include live weather must not be served from the response cache
+            state["metadata"]["response_cache_tag"] = None
+        
+        if sections:
+            state["context"] = "\n\n".join(sections)
+        else:
+            state["context"] = "No context source responded in time."
+            state["metadata"]["context_error"] = "all fan-out branches failed or timed out"
+        
+        logger.info(f"Merged context from {sources or 'no sources'} (branches: {state['metadata']['fanout']})")
+        return state
+    
+    async def _amerge_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return self._merge_context(state)
+    
+    def _response_messages(self, state: Dict[str, Any]) -> List[Any]:
+        query = state.get("query", "")
+        context = state.get("context", "")
+        query_type = state.get("query_type", "unknown")
+      
+        if len(state.get("metadata", {}).get("fanout_sources", [])) > 1:
+            system_prompt = """You are a helpful AI assistant. 
+The context combines several sources: weather data, document excerpts and web search results.
+Use only the sources that are relevant to the question and ignore the rest.
+Cite the document or web source for any information you use."""
+            
+        elif query_type == "weather":
+            system_prompt = """You are a helpful weather assistant. 
 Provide accurate and clear weather information based on the data provided.
 Format the response in a friendly and easy-to-read manner."""
-                
-            elif query_type == "pdf":
-                system_prompt = """You are a helpful document assistant. 
+            
+        elif query_type == "pdf":
+            system_prompt = """You are a helpful document assistant. 
 Answer questions based on the provided context from the documents.
 If the answer is not in the context, say so clearly.
 Always cite the source document."""
-                
-            else:
-                system_prompt = """You are a helpful AI assistant. 
+            
+        else:
+            system_prompt = """You are a helpful AI assistant. 
 Answer the user's question based on the provided search results and context.
 If information comes from web sources, cite them appropriately.
 Be accurate, clear, and concise."""
-            
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=f"Context:\n{context}\n\nQuestion: {query}")
-            ]
+        
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Context:\n{context}\n\nQuestion: {query}")
+        ]
+    
+    def _generate_response(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            messages = self._response_messages(state)
             
             logger.info("Generating response with LLM")
             response = self.llm.invoke(messages)
             
             state["response"] = response.content
             state["messages"] = messages + [response]
+            self._store_response(state)
             
             logger.info("Response generated successfully")
             return state
@@ -255,18 +579,40 @@ Be accurate, clear, and concise."""
             state["response"] = f"Error generating response: {str(e)}"
             return state
     
+    async def _agenerate_response(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            messages = self._response_messages(state)
+            
+            logger.info("Generating response with LLM")
+            response = await self.llm.ainvoke(messages)
+            
+            state["response"] = response.content
+            state["messages"] = messages + [response]
+            self._store_response(state)
+            
+            logger.info("Response generated successfully")
+            return state
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            state["response"] = f"Error generating response: {str(e)}"
+            return state
+    
+    def _initial_state(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "query": input_data.get("query", ""),
+            "query_type": "",
+            "weather_data": None,
+            "context": "",
+            "response": "",
+            "messages": [],
+            "metadata": {}
+        }
+    
     @traceable
     def invoke(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            initial_state = {
-                "query": input_data.get("query", ""),
-                "query_type": "",
-                "weather_data": None,
-                "context": "",
-                "response": "",
-                "messages": [],
-                "metadata": {}
-            }
+            initial_state = self._initial_state(input_data)
             
             logger.info(f"Processing query: {initial_state['query']}")
             
@@ -281,6 +627,9 @@ Be accurate, clear, and concise."""
                 state = initial_state
                 
                 state = self._classify_query(state)
+                state = self._check_response_cache(state)
+                if state["metadata"].get("response_cache_hit"):
+                    return state
                 
                 if state.get("query_type") == "weather":
                     state = self._fetch_weather(state)
@@ -300,7 +649,128 @@ Be accurate, clear, and concise."""
                 "metadata": {"error": str(e)}
             }
     
+    @traceable
+    async def ainvoke(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            initial_state = self._initial_state(input_data)
+            
+            logger.info(f"Processing query: {initial_state['query']}")
+            
+            if self.graph:
+                logger.info("Executing query using LangGraph (async)")
+                return await self.graph.ainvoke(initial_state)
+            else:
+                logger.warning("Graph not available, falling back to manual method calls")
+                state = initial_state
+                
+                state = await self._aclassify_query(state)
+                state = await self._acheck_response_cache(state)
+                if state["metadata"].get("response_cache_hit"):
+                    return state
+                
+                if state.get("query_type") == "weather":
+                    state = await self._afetch_weather(state)
+                elif state.get("query_type") == "pdf":
+                    state = await self._afetch_pdf_context(state)
+                else:
+                    state = await self._afetch_general_context(state)
+                
+                state = await self._agenerate_response(state)
+                return state
+            
+        except Exception as e:
+            logger.error(f"Error invoking agent: {e}")
+            return {
+                "query": input_data.get("query", ""),
+                "response": f"Error: {str(e)}",
+                "metadata": {"error": str(e)}
+            }
+
+
+    @staticmethod
+    def _token_from_message_event(event) -> str:
+        chunk, metadata = event
+        # Only answer tokens are streamed: not intermediate LLM calls such as city
+        # extraction, nor the prompt messages the node writes back into state
+        if metadata.get("langgraph_node") != "generate_response" or not isinstance(chunk, AIMessageChunk):
+            return ""
+        return chunk.content if isinstance(chunk.content, str) else ""
+    
+    @traceable(reduce_fn=final_stream_state)
+    def stream(self, input_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        initial_state = self._initial_state(input_data)
+        
+        if not self.graph:
+            state = self.invoke(input_data)
+            yield {"type": "token", "content": state.get("response", "")}
+            yield {"type": "final", "state": state}
+            return
+        
+        try:
+            logger.info(f"Streaming query: {initial_state['query']}")
+            final_state = initial_state
+            for mode, event in self.graph.stream(initial_state, stream_mode=["messages", "values"]):
+                if mode == "values":
+                    final_state = event
+                    continue
+                token = self._token_from_message_event(event)
+                if token:
+                    yield {"type": "token", "content": token}
+            
+            if final_state.get("metadata", {}).get("response_cache_hit"):
+                # Cached answers skip the LLM, so they arrive as a single token
+                yield {"type": "token", "content": final_state["response"]}
+            
+            yield {"type": "final", "state": final_state}
+            
+        except Exception as e:
+            logger.error(f"Error streaming agent response: {e}")
+            yield {"type": "final", "state": {
+                "query": initial_state["query"],
+                "response": f"Error: {str(e)}",
+                "metadata": {"error": str(e)}
+            }}
+    
+    @traceable(reduce_fn=final_stream_state)
+    async def astream(self, input_data: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        initial_state = self._initial_state(input_data)
+        
+        if not self.graph:
+            state = await self.ainvoke(input_data)
+            yield {"type": "token", "content": state.get("response", "")}
+            yield {"type": "final", "state": state}
+            return
+        
+        try:
+            logger.info(f"Streaming query: {initial_state['query']}")
+            final_state = initial_state
+            async for mode, event in self.graph.astream(initial_state, stream_mode=["messages", "values"]):
+                if mode == "values":
+                    final_state = event
+                    continue
+                token = self._token_from_message_event(event)
+                if token:
+                    yield {"type": "token", "content": token}
+            
+            if final_state.get("metadata", {}).get("response_cache_hit"):
+                # Cached answers skip the LLM, so they arrive as a single token
+                yield {"type": "token", "content": final_state["response"]}
+            
+            yield {"type": "final", "state": final_state}
+            
+        except Exception as e:
+            logger.error(f"Error streaming agent response: {e}")
+            yield {"type": "final", "state": {
+                "query": initial_state["query"],
+                "response": f"Error: {str(e)}",
+                "metadata": {"error": str(e)}
+            }}
 
+    async def aclose(self):
+        # Closes the current event loop's HTTP and Qdrant pools. asyncio.run() does
+        # this by itself; call it before closing a loop that is managed by hand
+        await http_client.aclose()
+        await vector_store.aclose()
 
     def _process_query(self, query: str) -> str:
         result = self.invoke({"query": query})
@@ -0,0 +1,259 @@
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.logger import logger
+from src.config import Config
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; saves are then only serialised within one process
+    fcntl = None
+
+
+# Keeps decimals such as "28.4" together so scores and version numbers match exactly
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _doc_terms(doc: Dict[str, Any]) -> Dict[str, int]:
+    # Term counts are saved with each chunk so loading never re-tokenizes the corpus;
+    # files written before that are tokenized once
+    if "terms" not in doc:
+        doc["terms"] = dict(Counter(tokenize(doc["document"])))
+    return doc["terms"]
+
+
+def _build_postings(docs: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, int]], int]:
+    postings: Dict[str, Dict[str, int]] = {}
+    total_length = 0
+    for doc_id, doc in docs.items():
+        terms = _doc_terms(doc)
+        doc["length"] = sum(terms.values())
+        total_length += doc["length"]
+        for term, frequency in terms.items():
+            postings.setdefault(term, {})[doc_id] = frequency
+    return postings, total_length
+
+
+class BM25Index:
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path or Config.BM25_INDEX_PATH
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+        self._loaded = False
+        # Changes not saved yet; None marks a removed chunk. Like the ingest manifest they
+        # are replayed on top of what another process (the bulk CLI next to the app) saved
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending_reset = False
+        self._disk_version: Optional[Tuple[int, int, int]] = None
+        self._reload_thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_docs(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("docs", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable BM25 index {self.path}: {e}")
+            return {}
+
+    def _load(self) -> Tuple[Optional[Tuple[int, int, int]], Dict[str, Any], Dict[str, Dict[str, int]], int]:
+        version = self._stat()
+        docs = self._read_docs()
+        postings, total_length = _build_postings(docs)
+        return version, docs, postings, total_length
+
+    def _install(self,
+                 version: Optional[Tuple[int, int, int]],
+                 docs: Dict[str, Any],
+                 postings: Dict[str, Dict[str, int]],
+                 total_length: int):
+        # Called under the lock: the file's copy becomes the index and unsaved changes go on top
+        self._disk_version = version
+        if self._pending_reset:
+            docs, postings, total_length = {}, {}, 0
+        self._docs, self._postings, self._total_length = docs, postings, total_length
+        for doc_id, doc in self._pending.items():
+            if doc is None:
+                self._remove(doc_id)
+            else:
+                self._add(doc_id, doc)
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        # Loaded on first use so processes that never search do not pay for it
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._install(*self._load())
+            if self._disk_version is not None:
+                logger.info(f"Loaded BM25 index with {len(self._docs)} chunks from {self.path}")
+
+    def _refresh(self):
+        # A save by another process is picked up on a background thread; searches
+        # keep using the current copy until the new one is built
+        if self._stat() == self._disk_version:
+            return
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return
+            self._reload_thread = threading.Thread(target=self._reload, args=(self._disk_version,),
+                                                   name="bm25-reload", daemon=True)
+            self._reload_thread.start()
+
+    def _reload(self, started_version: Optional[Tuple[int, int, int]]):
+        try:
+            loaded = self._load()
+            with self._lock:
+                # A save in the meantime has already merged the file
+                if self._disk_version == started_version:
+                    self._install(*loaded)
+                    logger.info(f"Reloaded BM25 index with {len(self._docs)} chunks from {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to reload BM25 index {self.path}: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _add(self, doc_id: str, doc: Dict[str, Any]):
+        if doc_id in self._docs:
+            self._remove(doc_id)
+        terms = _doc_terms(doc)
+        doc["length"] = sum(terms.values())
+        self._docs[doc_id] = doc
+        self._total_length += doc["length"]
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def _remove(self, doc_id: str):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for term in doc["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._ensure_loaded()
+            for doc in documents:
+                doc_id = str(doc["point_id"])
+                entry = {
+                    "document": doc.get("content", ""),
+                    "source": doc.get("source", ""),
+                    "chunk_id": doc.get("chunk_id"),
+                    "metadata": doc.get("metadata", {})
+                }
+                self._pending[doc_id] = entry
+                self._add(doc_id, entry)
+
+    def remove(self, doc_ids: Iterable[Any]):
+        with self._lock:
+            self._ensure_loaded()
+            for doc_id in doc_ids:
+                doc_id = str(doc_id)
+                self._pending[doc_id] = None
+                self._remove(doc_id)
+
+    def reset(self):
+        with self._lock:
+            self._docs, self._postings, self._total_length = {}, {}, 0
+            self._pending = {}
+            self._pending_reset = True
+            self._loaded = True
+
+    def save(self):
+        with self._lock:
+            if not self._pending and not self._pending_reset:
+                return
+            with self._file_lock():
+                if self._stat() != self._disk_version:
+                    self._install(*self._load())
+                docs = {doc_id: {k: v for k, v in doc.items() if k != "length"}
+                        for doc_id, doc in self._docs.items()}
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                    json.dump({"docs": docs}, f)
+                os.replace(tmp_path, self.path)
+                self._pending = {}
+                self._pending_reset = False
+                self._disk_version = self._stat()
+
+    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            self._refresh()
+            if not self._docs:
+                return []
+
+            count = len(self._docs)
+            average_length = self._total_length / count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length_norm = 1 - self.b + self.b * self._docs[doc_id]["length"] / average_length
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (
+                        frequency + self.k1 * length_norm)
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [{
+                "id": doc_id,
+                "score": score,
+                "document": self._docs[doc_id]["document"],
+                "source": self._docs[doc_id]["source"],
+                "chunk_id": self._docs[doc_id]["chunk_id"],
+                "metadata": dict(self._docs[doc_id]["metadata"])
+            } for doc_id, score in best]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._docs)
+
+
+bm25_index = BM25Index()
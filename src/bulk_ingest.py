@@ -0,0 +1,251 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Tuple
+from src.pdf_processor import PDFProcessor
+from src.ingestion import ingestion_pipeline
+from src.hashing import sha256_file
+from src.logger import logger
+from src.config import Config
+
+
+def find_pdfs(root: str) -> List[str]:
+    pdf_files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.lower().endswith('.pdf'):
+                pdf_files.append(os.path.join(dirpath, filename))
+    return sorted(pdf_files)
+
+
+def extract_documents(file_path: str,
+                      chunk_size: int,
+                      chunk_overlap: int,
+                      known_hash: Optional[str] = None) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+    # Runs inside worker processes, so it builds its own processor. Files whose
+    # hash matches the manifest are not parsed at all.
+    file_hash = sha256_file(file_path)
+    if file_hash == known_hash:
+        return file_hash, None
+    # Files are already spread over processes here, so pages are not sharded again
+    processor = PDFProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap, shard_workers=1)
+    return file_hash, processor.process_pdf(file_path, file_hash)
+
+
+class BulkIngestor:
+    def __init__(self,
+                 pipeline=None,
+                 workers: Optional[int] = None,
+                 queue_size: Optional[int] = None,
+                 manifest_save_every: Optional[int] = None):
+        self.pipeline = pipeline or ingestion_pipeline
+        self.workers = workers or Config.INGEST_WORKERS or os.cpu_count() or 1
+        self.queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self.manifest_save_every = manifest_save_every or Config.INGEST_MANIFEST_SAVE_EVERY
+        self.stats: Dict[str, Any] = {}
+        # Files whose chunks are not all upserted yet, keyed by path
+        self._pending_files: Dict[str, Dict[str, Any]] = {}
+        self._files_lock = threading.Lock()
+        self._unsaved_files = 0
+        self._settings: Dict[str, Any] = {}
+
+    def _commit_file(self, path: str, entry: Dict[str, Any]):
+        # Runs on the upsert thread once the file's last chunk is stored, so a
+        # crash before that leaves the old manifest entry and the file is redone
+        self.pipeline.update_reused(entry["reused"])
+        self.pipeline.commit_file(path, entry["file_hash"], entry["old_chunks"], entry["new_chunks"], save=False)
+        self._unsaved_files += 1
+        if self._unsaved_files >= self.manifest_save_every:
+            self.pipeline.manifest.save()
+            self._unsaved_files = 0
+
+    def _upsert_worker(self, upsert_queue: queue.Queue):
+        while True:
+            item = upsert_queue.get()
+            try:
+                if item is None:
+                    return
+                kind, payload = item
+                if kind == "commit":
+                    with self._files_lock:
+                        entry = self._pending_files.pop(payload, None)
+                    if entry is not None:
+                        self._commit_file(payload, entry)
+                    continue
+
+                embeddings, batch = payload
+                try:
+                    self.pipeline.store_batch(embeddings, batch)
+                except Exception as e:
+                    logger.error(f"Error upserting batch of {len(batch)} chunks: {e}")
+                    self.stats["failed_chunks"] += len(batch)
+                    # The affected files keep their old manifest entry, so the next run redoes them
+                    with self._files_lock:
+                        for source in {doc["source"] for doc in batch}:
+                            self._pending_files.pop(source, None)
+                    continue
+
+                self.stats["chunks"] += len(batch)
+                completed = []
+                with self._files_lock:
+                    for doc in batch:
+                        entry = self._pending_files.get(doc["source"])
+                        if entry is None:
+                            continue
+                        entry["remaining"] -= 1
+                        if entry["remaining"] == 0:
+                            completed.append((doc["source"], self._pending_files.pop(doc["source"])))
+                for path, entry in completed:
+                    self._commit_file(path, entry)
+            except Exception as e:
+                logger.error(f"Error committing ingested files: {e}")
+            finally:
+                upsert_queue.task_done()
+
+    def _embed_pending(self, pending: List[Dict[str, Any]], upsert_queue: queue.Queue, flush: bool = False):
+        batch_size = self.pipeline.batch_size
+        while len(pending) >= batch_size or (flush and pending):
+            batch = pending[:batch_size]
+            del pending[:batch_size]
+            embeddings, seconds = self.pipeline.embed_batch(batch)
+            self.stats["embed_seconds"] += seconds
+            # Blocks when the upsert stage falls behind
+            upsert_queue.put(("batch", (embeddings, batch)))
+
+    def _extract_args(self, path: str) -> Tuple[str, int, int, Optional[str]]:
+        entry = self.pipeline.manifest.get_file(path)
+        # Files indexed with other chunk or model settings are redone even if their bytes are the same
+        known = entry is not None and entry.get("settings") == self._settings
+        return (path,
+                self.pipeline.processor.chunk_size,
+                self.pipeline.processor.chunk_overlap,
+                entry["file_hash"] if known else None)
+
+    def _iter_extracted(self, paths: List[str]):
+        if self.workers <= 1:
+            for path in paths:
+                try:
+                    yield path, extract_documents(*self._extract_args(path))
+                except Exception as e:
+                    logger.error(f"Error extracting {path}: {e}")
+                    yield path, None
+            return
+
+        max_in_flight = self.workers * 2
+        remaining = iter(paths)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = {}
+            for path in remaining:
+                in_flight[executor.submit(extract_documents, *self._extract_args(path))] = path
+                if len(in_flight) >= max_in_flight:
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    try:
+                        yield path, future.result()
+                    except Exception as e:
+                        logger.error(f"Error extracting {path}: {e}")
+                        yield path, None
+
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        in_flight[executor.submit(extract_documents, *self._extract_args(next_path))] = next_path
+
+    def run(self, pdf_dir: Optional[str] = None) -> Dict[str, Any]:
+        root = pdf_dir or Config.PDF_DIR
+        paths = find_pdfs(root)
+        logger.info(f"Bulk ingesting {len(paths)} PDFs from {root} with {self.workers} workers")
+
+        self.stats = {"files": 0, "unchanged_files": 0, "failed_files": 0, "purged_files": 0,
+                      "chunks": 0, "reused_chunks": 0, "failed_chunks": 0, "embed_seconds": 0.0}
+        start = time.perf_counter()
+
+        self.pipeline.store.create_collection(force_recreate=False)
+        self.pipeline.sync_manifest()
+        self._pending_files = {}
+        self._unsaved_files = 0
+        self._settings = self.pipeline.settings()
+
+        upsert_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upserter = threading.Thread(target=self._upsert_worker, args=(upsert_queue,), daemon=True)
+        upserter.start()
+
+        pending: List[Dict[str, Any]] = []
+        try:
+            for path, result in self._iter_extracted(paths):
+                if result is None:
+                    self.stats["failed_files"] += 1
+                    continue
+
+                file_hash, documents = result
+                if documents is None:
+                    self.stats["unchanged_files"] += 1
+                    continue
+
+                self.stats["files"] += 1
+                entry = self.pipeline.manifest.get_file(path)
+                old_chunks = dict(entry["chunks"]) if entry else {}
+                new_chunks: Dict[str, Any] = {}
+                reused: List[Dict[str, Any]] = []
+                new_documents = list(self.pipeline.diff_chunks(documents, old_chunks, new_chunks, reused,
+                                                               self.pipeline.can_reuse(entry)))
+                self.stats["reused_chunks"] += len(new_chunks) - len(new_documents)
+
+                with self._files_lock:
+                    self._pending_files[path] = {"file_hash": file_hash, "old_chunks": old_chunks,
+                                                 "new_chunks": new_chunks, "reused": reused,
+                                                 "remaining": len(new_documents)}
+                if not new_documents:
+                    upsert_queue.put(("commit", path))
+
+                pending.extend(new_documents)
+                self._embed_pending(pending, upsert_queue)
+
+            self._embed_pending(pending, upsert_queue, flush=True)
+        finally:
+            upsert_queue.put(None)
+            upserter.join()
+            if self._unsaved_files:
+                self.pipeline.manifest.save()
+                self._unsaved_files = 0
+            if self._pending_files:
+                logger.warning(f"{len(self._pending_files)} files were not fully stored and will be "
+                               f"ingested again on the next run")
+
+        self.stats["purged_files"] = self.pipeline.purge_missing_files()
+        self.pipeline.lexical_index.save()
+
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = elapsed
+        self.stats["chunks_per_sec"] = self.stats["chunks"] / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Bulk ingestion finished: {self.stats['files']} files, {self.stats['chunks']} chunks "
+                    f"in {elapsed:.1f}s ({self.stats['chunks_per_sec']:.1f} chunks/sec), "
+                    f"{self.stats['unchanged_files']} unchanged, {self.stats['purged_files']} purged, "
+                    f"{self.stats['failed_files']} failed files, {self.stats['failed_chunks']} failed chunks")
+        return self.stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest every PDF under a directory into the vector store")
+    parser.add_argument("--pdf-dir", default=Config.PDF_DIR, help="Directory to walk for PDF files")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction worker processes")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks per embedding batch")
+    parser.add_argument("--queue-size", type=int, default=None, help="Embedded batches buffered before upsert")
+    args = parser.parse_args(argv)
+
+    if args.batch_size:
+        ingestion_pipeline.batch_size = args.batch_size
+
+    ingestor = BulkIngestor(workers=args.workers, queue_size=args.queue_size)
+    stats = ingestor.run(args.pdf_dir)
+    return 1 if stats["failed_files"] or stats["failed_chunks"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+
+class TTLCache:
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_expired(self, stored_at: float) -> bool:
+        return bool(self.ttl) and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry[1]):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        # Like get(), but also returns how many seconds ago the value was stored
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry[1]):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], time.monotonic() - entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SingleFlight:
+    # Concurrent calls for the same key share one execution of fn; the
+    # followers block until the leader finishes and get its result or error
+    def __init__(self):
+        self._calls: Dict[Hashable, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls: Dict[Tuple[Any, Hashable], asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Futures belong to one event loop, so calls are only shared within a loop
+        loop = asyncio.get_running_loop()
+        call_key = (loop, key)
+        future = self._calls.get(call_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._calls[call_key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the error as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._calls[call_key]
+
+
+class SemanticCache:
+    # Values are looked up by embedding similarity instead of exact key. The
+    # vectors live in one preallocated float32 matrix so a lookup is a single
+    # matrix-vector product; the least recently used slot is reused when full.
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None, threshold: float = 0.95):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._values: List[Any] = [None] * max_size
+        self._tags: List[Hashable] = [None] * max_size
+        self._stored_at = np.zeros(max_size, dtype=np.float64)
+        self._last_used = np.zeros(max_size, dtype=np.float64)
+        self._used = np.zeros(max_size, dtype=bool)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _live_mask(self, now: float) -> np.ndarray:
+        mask = self._used.copy()
+        if self.ttl:
+            mask &= now - self._stored_at <= self.ttl
+        return mask
+
+    def get(self, embedding, tag: Hashable = None) -> Any:
+        return self.get_match(embedding, tag)[0]
+
+    def get_match(self, embedding, tag: Hashable = None) -> Tuple[Any, float]:
+        # Returns (value, similarity) of the closest live entry with the same
+        # tag, or (None, best similarity) when nothing clears the threshold
+        vector = self._normalize(embedding)
+        with self._lock:
+            now = time.monotonic()
+            mask = self._live_mask(now)
+            if tag is not None:
+                mask &= np.array([t == tag for t in self._tags], dtype=bool)
+            if self._vectors is None or not mask.any():
+                self.misses += 1
+                return None, 0.0
+
+            similarities = self._vectors @ vector
+            similarities[~mask] = -np.inf
+            index = int(np.argmax(similarities))
+            similarity = float(similarities[index])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None, similarity
+
+            self._last_used[index] = now
+            self.hits += 1
+            return self._values[index], similarity
+
+    def set(self, embedding, value: Any, tag: Hashable = None):
+        vector = self._normalize(embedding)
+        with self._lock:
+            now = time.monotonic()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            live = self._live_mask(now)
+            if not live.all():
+                index = int(np.argmin(live))
+            else:
+                index = int(np.argmin(self._last_used))
+
+            self._vectors[index] = vector
+            self._values[index] = value
+            self._tags[index] = tag
+            self._stored_at[index] = now
+            self._last_used[index] = now
+            self._used[index] = True
+
+    def clear(self):
+        with self._lock:
+            self._values = [None] * self.max_size
+            self._tags = [None] * self.max_size
+            self._used[:] = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._live_mask(time.monotonic()).sum())
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
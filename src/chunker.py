@@ -0,0 +1,215 @@
+import itertools
+import re
+import threading
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from src.logger import logger
+from src.config import Config
+
+
+# Words and punctuation marks; close enough to BPE counts when no tokenizer is configured
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# A sentence ends at the whitespace after a terminator when the next one starts with a
+# capital, digit, quote or bracket; a blank line always ends a paragraph. Both need the
+# next non-space character, so a break at the end of the text read so far is only
+# taken once more text arrives. The paragraph break only starts at the beginning of a
+# whitespace run, so long runs of padding are scanned in linear time
+_BOUNDARY_PATTERN = re.compile(
+    r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[A-Z0-9\"'(\[])"
+    r"|(?<!\s)(?=\s*\n[^\S\n]*\n)\s+(?=\S)"
+)
+
+# (start, end, token count, ends a paragraph)
+Unit = Tuple[int, int, int, bool]
+
+
+class TokenCounter:
+    def __init__(self, tokenizer=None, tokenizer_name: Optional[str] = None):
+        self.tokenizer = tokenizer
+        self.tokenizer_name = tokenizer_name if tokenizer_name is not None else Config.CHUNK_TOKENIZER
+        self._load_failed = tokenizer is None and not self.tokenizer_name
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            # Optional dependency; without it token counts are estimated with a regex
+            from tokenizers import Tokenizer
+        except ImportError:
+            logger.warning("tokenizers is not installed, falling back to estimated token counts")
+            return None
+
+        try:
+            tokenizer = Tokenizer.from_pretrained(self.tokenizer_name)
+            tokenizer.no_truncation()
+            logger.info(f"Loaded tokenizer {self.tokenizer_name} for token counting")
+            return tokenizer
+        except Exception as e:
+            logger.warning(f"Failed to load tokenizer {self.tokenizer_name}, "
+                           f"falling back to estimated token counts: {e}")
+            return None
+
+    def _get_tokenizer(self):
+        if self.tokenizer is None and not self._load_failed:
+            with self._lock:
+                if self.tokenizer is None and not self._load_failed:
+                    self.tokenizer = self._load()
+                    self._load_failed = self.tokenizer is None
+        return self.tokenizer
+
+    @property
+    def name(self) -> str:
+        # The tokenizer counts actually come from; empty when they are estimated
+        return self.tokenizer_name if self._get_tokenizer() is not None else ""
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return [match.span() for match in _TOKEN_PATTERN.finditer(text)]
+        return list(tokenizer.encode(text, add_special_tokens=False).offsets)
+
+    def count(self, text: str) -> int:
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return sum(1 for _ in _TOKEN_PATTERN.finditer(text))
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+class Chunker:
+    def __init__(self,
+                 chunk_size: Optional[int] = None,
+                 chunk_overlap: Optional[int] = None,
+                 counter: Optional[TokenCounter] = None):
+        self.chunk_size = chunk_size if chunk_size is not None else Config.CHUNK_SIZE
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else Config.CHUNK_OVERLAP
+        if self.chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {self.chunk_size}")
+        if not 0 <= self.chunk_overlap < self.chunk_size:
+            raise ValueError(f"chunk_overlap must be at least 0 and below chunk_size ({self.chunk_size}), "
+                             f"got {self.chunk_overlap}")
+        self.counter = counter or token_counter
+
+    def _units(self, buffer: str, offset: int, start: int, end: int, paragraph_end: bool) -> List[Unit]:
+        # buffer[start:end] is one sentence; one longer than a chunk is cut at token boundaries
+        text = buffer[start:end]
+        tokens = self.counter.count(text)
+        if tokens <= self.chunk_size:
+            return [(offset + start, offset + end, tokens, paragraph_end)] if tokens else []
+
+        spans = self.counter.spans(text)
+        units = []
+        for i in range(0, len(spans), self.chunk_size):
+            piece_start = spans[i][0] if i else 0
+            last = i + self.chunk_size >= len(spans)
+            piece_end = len(text) if last else spans[i + self.chunk_size][0]
+            units.append((offset + start + piece_start, offset + start + piece_end,
+                          min(self.chunk_size, len(spans) - i), paragraph_end and last))
+        return units
+
+    def _take_count(self, units: Deque[Unit], carried: int) -> int:
+        # Greedy: as many whole sentences as fit, but stop at a paragraph break
+        # instead when one falls in the second half of the chunk
+        tokens = 0
+        take = 0
+        paragraph_take = 0
+        for unit in units:
+            if take and tokens + unit[2] > self.chunk_size:
+                return paragraph_take or take
+            take += 1
+            tokens += unit[2]
+            if unit[3] and take > carried and tokens * 2 >= self.chunk_size:
+                paragraph_take = take
+        return take
+
+    def iter_spans(self, pieces: Iterable[str]) -> Iterator[Tuple[int, int, str, int]]:
+        # Yields (start, end, text, token count) with offsets into the concatenated
+        # pieces. Only text from the oldest sentence still needed is buffered, and
+        # each character is scanned for boundaries and counted once, so the pass is
+        # linear in the length of the text
+        buffer = ""
+        buffer_start = 0
+        unit_start = 0
+        search_from = 0
+        units: Deque[Unit] = deque()
+        total = 0
+        carried = 0
+
+        def pack(final: bool) -> List[Tuple[int, int, str, int]]:
+            nonlocal total, carried
+            chunks = []
+            while len(units) > carried and (final or total > self.chunk_size):
+                take = self._take_count(units, carried)
+                if take <= carried:
+                    # The overlap and the next sentence do not fit together, so this chunk starts fresh
+                    for _ in range(carried):
+                        total -= units.popleft()[2]
+                    carried = 0
+                    continue
+
+                chunk_units = list(itertools.islice(units, take))
+                start, end = chunk_units[0][0], chunk_units[-1][1]
+                text = buffer[start - buffer_start:end - buffer_start]
+                stripped = text.lstrip()
+                start += len(text) - len(stripped)
+                stripped = stripped.rstrip()
+                chunks.append((start, start + len(stripped), stripped, sum(unit[2] for unit in chunk_units)))
+
+                # Trailing sentences that fit in the overlap also open the next chunk
+                keep = 0
+                kept_tokens = 0
+                for unit in reversed(chunk_units[1:]):
+                    if kept_tokens + unit[2] > self.chunk_overlap:
+                        break
+                    keep += 1
+                    kept_tokens += unit[2]
+                for _ in range(take - keep):
+                    total -= units.popleft()[2]
+                carried = keep
+            return chunks
+
+        for piece in pieces:
+            buffer += piece
+            if piece.isspace():
+                # Boundaries and tokens all need a non-space character, so padding
+                # only extends the trailing run; it is scanned once text follows
+                continue
+            for match in _BOUNDARY_PATTERN.finditer(buffer, search_from - buffer_start):
+                new_units = self._units(buffer, buffer_start, unit_start - buffer_start, match.end(),
+                                        match.group().count("\n") >= 2)
+                units.extend(new_units)
+                total += sum(unit[2] for unit in new_units)
+                unit_start = buffer_start + match.end()
+            # Text with no boundary yet is cut every chunk_size tokens, where the sentence
+            # would be cut anyway, so it is not buffered whole. The last word may still
+            # continue in the next piece, so it is left out
+            if len(buffer) - (unit_start - buffer_start) > self.chunk_size:
+                tail = buffer[unit_start - buffer_start:]
+                words = tail.rstrip().rsplit(None, 1)
+                spans = self.counter.spans(tail[:len(words[0])] if len(words) > 1 else "")
+                cut_start = unit_start
+                for i in range(self.chunk_size, len(spans), self.chunk_size):
+                    cut_end = unit_start + spans[i][0]
+                    units.append((cut_start, cut_end, self.chunk_size, False))
+                    total += self.chunk_size
+                    cut_start = cut_end
+                unit_start = cut_start
+            # Trailing whitespace may still turn into a boundary, so it is searched again
+            search_from = max(unit_start, buffer_start + len(buffer.rstrip()))
+
+            yield from pack(final=False)
+
+            keep_from = units[0][0] if units else unit_start
+            if keep_from > buffer_start:
+                buffer = buffer[keep_from - buffer_start:]
+                buffer_start = keep_from
+
+        new_units = self._units(buffer, buffer_start, unit_start - buffer_start, len(buffer), False)
+        units.extend(new_units)
+        total += sum(unit[2] for unit in new_units)
+        yield from pack(final=True)
+
+    def split(self, text: str) -> List[Tuple[int, int, str, int]]:
+        return list(self.iter_spans([text]))
+
+
+token_counter = TokenCounter()
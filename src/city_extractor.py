@@ -0,0 +1,75 @@
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, List, Optional
+from src.logger import logger
+from src.config import Config
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_TERMINAL = "$"
+
+
+def _tokenize(text: str) -> List[str]:
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return _TOKEN_PATTERN.findall(normalized)
+
+
+class CityExtractor:
+    def __init__(self, gazetteer_path: Optional[str] = None):
+        self.gazetteer_path = gazetteer_path or Config.CITY_GAZETTEER_PATH
+        self._trie: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        # Word-level trie: each level maps a token to the next level, and the
+        # terminal key holds the display name of the city ending there
+        trie: Dict[str, Any] = {}
+        count = 0
+        try:
+            with open(self.gazetteer_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    name = line.strip()
+                    if not name or name.startswith("#"):
+                        continue
+                    tokens = _tokenize(name)
+                    if not tokens:
+                        continue
+                    node = trie
+                    for token in tokens:
+                        node = node.setdefault(token, {})
+                    node[_TERMINAL] = name
+                    count += 1
+            logger.info(f"Loaded {count} cities from gazetteer {self.gazetteer_path}")
+        except Exception as e:
+            logger.warning(f"Failed to load city gazetteer {self.gazetteer_path}: {e}")
+        return trie
+
+    def _get_trie(self) -> Dict[str, Any]:
+        if self._trie is None:
+            with self._lock:
+                if self._trie is None:
+                    self._trie = self._load()
+        return self._trie
+
+    def extract(self, query: str) -> Optional[str]:
+        trie = self._get_trie()
+        tokens = _tokenize(query)
+
+        # Leftmost match wins; at a given start the longest name wins, so
+        # "New York City" beats "New York"
+        for start in range(len(tokens)):
+            node = trie
+            match = None
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                match = node.get(_TERMINAL, match)
+            if match:
+                return match
+        return None
+
+
+city_extractor = CityExtractor()
@@ -13,15 +13,74 @@ class Config:
     LANGSMITH_PROJECT: str = os.getenv("LANGSMITH_PROJECT", "neura-ai-pipeline")
     LANGSMITH_ENDPOINT: str = os.getenv("LANGSMITH_ENDPOINT", "https://api.smith.langchain.com")
     
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "server")
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
     QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION", "documents")
+    UPSERT_BATCH_SIZE: int = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+    UPSERT_WORKERS: int = int(os.getenv("UPSERT_WORKERS", "2"))
+    UPSERT_MAX_RETRIES: int = int(os.getenv("UPSERT_MAX_RETRIES", "3"))
+    STATS_CACHE_TTL: float = float(os.getenv("STATS_CACHE_TTL", "10"))
+    
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+    HTTP_MAX_RETRIES: int = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+    HTTP_BACKOFF_FACTOR: float = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+    HTTP_BACKOFF_JITTER: float = float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
+    HTTP_CIRCUIT_FAILURES: int = int(os.getenv("HTTP_CIRCUIT_FAILURES", "5"))
+    HTTP_CIRCUIT_RESET: float = float(os.getenv("HTTP_CIRCUIT_RESET", "30"))
+    
+    WEATHER_CACHE_TTL: float = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+    WEATHER_STALE_TTL: float = float(os.getenv("WEATHER_STALE_TTL", "600"))
+    WEATHER_CACHE_SIZE: int = int(os.getenv("WEATHER_CACHE_SIZE", "256"))
+    
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", "512"))
+    SEARCH_CACHE_TTL: float = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+    SEARCH_SEMANTIC_CACHE: bool = os.getenv("SEARCH_SEMANTIC_CACHE", "false").lower() == "true"
+    SEARCH_SEMANTIC_THRESHOLD: float = float(os.getenv("SEARCH_SEMANTIC_THRESHOLD", "0.92"))
+    
+    RESPONSE_CACHE: bool = os.getenv("RESPONSE_CACHE", "false").lower() == "true"
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_THRESHOLD: float = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+    
+    AGENT_FANOUT: bool = os.getenv("AGENT_FANOUT", "false").lower() == "true"
+    AGENT_BRANCH_DEADLINE: float = float(os.getenv("AGENT_BRANCH_DEADLINE", "8"))
     
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "mixtral-8x7b-32768")
-    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+    QUERY_CACHE_SIZE: int = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+    QUERY_CACHE_TTL: float = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+    
+    ROUTER_USE_EMBEDDINGS: bool = os.getenv("ROUTER_USE_EMBEDDINGS", "false").lower() == "true"
+    ROUTER_MARGIN: float = float(os.getenv("ROUTER_MARGIN", "0.05"))
+    ROUTER_PDF_PRIOR: float = float(os.getenv("ROUTER_PDF_PRIOR", "0.05"))
+    ROUTER_WEAK_KEYWORD_BONUS: float = float(os.getenv("ROUTER_WEAK_KEYWORD_BONUS", "0.1"))
     
-    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "1000"))
-    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "200"))
+    # Below the embedding model's 256-token window, which also holds [CLS] and [SEP]
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "240"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "48"))
+    CHUNK_TOKENIZER: str = os.getenv("CHUNK_TOKENIZER", EMBEDDING_MODEL)
     TOP_K_RETRIEVAL: int = int(os.getenv("TOP_K_RETRIEVAL", "5"))
+    HYBRID_RETRIEVAL: bool = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_MODEL: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES: int = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_TOP_N: int = int(os.getenv("RERANK_TOP_N", "3"))
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+    RERANK_LATENCY_BUDGET: float = float(os.getenv("RERANK_LATENCY_BUDGET", "0.5"))
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    CONTEXT_MIN_PASSAGE_TOKENS: int = int(os.getenv("CONTEXT_MIN_PASSAGE_TOKENS", "50"))
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "0"))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+    INGEST_MANIFEST_SAVE_EVERY: int = int(os.getenv("INGEST_MANIFEST_SAVE_EVERY", "50"))
+    PDF_SHARD_WORKERS: int = int(os.getenv("PDF_SHARD_WORKERS", "0"))
+    PDF_SHARD_THRESHOLD: int = int(os.getenv("PDF_SHARD_THRESHOLD", "200"))
+    PDF_SHARD_PAGES: int = int(os.getenv("PDF_SHARD_PAGES", "50"))
     
     TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2048"))
@@ -31,6 +90,15 @@ class Config:
     
     DATA_DIR: str = os.getenv("DATA_DIR", "data")
     PDF_DIR: str = os.path.join(DATA_DIR, "pdfs")
+    CITY_GAZETTEER_PATH: str = os.getenv("CITY_GAZETTEER_PATH",
+                                         os.path.join(os.path.dirname(__file__), "data", "cities.txt"))
+    QDRANT_PATH: str = os.getenv("QDRANT_PATH", os.path.join(DATA_DIR, "qdrant"))
+    PAGE_TEXT_CACHE: bool = os.getenv("PAGE_TEXT_CACHE", "true").lower() == "true"
+    PAGE_TEXT_CACHE_DIR: str = os.getenv("PAGE_TEXT_CACHE_DIR", os.path.join(DATA_DIR, "page_text"))
+    EMBEDDING_STORE: bool = os.getenv("EMBEDDING_STORE", "true").lower() == "true"
+    EMBEDDING_STORE_DIR: str = os.getenv("EMBEDDING_STORE_DIR", os.path.join(DATA_DIR, "embeddings"))
+    BM25_INDEX_PATH: str = os.getenv("BM25_INDEX_PATH", os.path.join(DATA_DIR, "bm25_index.json.gz"))
+    INGEST_MANIFEST_PATH: str = os.getenv("INGEST_MANIFEST_PATH", os.path.join(DATA_DIR, "ingest_manifest.json"))
     
     @classmethod
     def validate(cls) -> bool:
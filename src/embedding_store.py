@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src.logger import logger
+from src.config import Config
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; appends are then only serialised within one process
+    fcntl = None
+
+
+class _ModelEmbeddings:
+    # One directory per model: vectors.f32 holds raw float32 rows in append
+    # order, index.tsv maps chunk content hashes to row numbers
+    def __init__(self, directory: str, model_name: str):
+        self.directory = directory
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.tsv")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.dim: Optional[int] = None
+        self.rows: Dict[str, int] = {}
+        self._index_offset = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._load_meta()
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                self.dim = int(json.load(f)["dim"])
+
+    def _write_meta(self, dim: int):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "dim": dim}, f)
+        os.replace(tmp_path, self.meta_path)
+        self.dim = dim
+
+    def refresh(self):
+        # Reads index lines appended since the last call, including ones
+        # written by other processes
+        if self.dim is None:
+            self._load_meta()
+        if self.dim is None or not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._index_offset)
+            data = f.read()
+        # A line without its newline is still being written
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            parts = line.split(b"\t")
+            if len(parts) == 2 and parts[1].isdigit():
+                self.rows[parts[0].decode("ascii")] = int(parts[1])
+        self._index_offset += complete
+        if complete:
+            self._vectors = None
+
+    def _matrix(self) -> np.ndarray:
+        if self._vectors is None:
+            count = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+            self._vectors = (np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(count, self.dim))
+                             if count else np.empty((0, self.dim), dtype=np.float32))
+        return self._vectors
+
+    def get(self, hashes: List[str]) -> List[Optional[List[float]]]:
+        if self.dim is None:
+            return [None] * len(hashes)
+        matrix = self._matrix()
+        vectors: List[Optional[List[float]]] = []
+        for content_hash in hashes:
+            row = self.rows.get(content_hash)
+            vectors.append(matrix[row].tolist() if row is not None and row < len(matrix) else None)
+        return vectors
+
+    def append(self, hashes: List[str], vectors: List[List[float]]):
+        array = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self._load_meta()
+        if self.dim is None:
+            self._write_meta(array.shape[1])
+        elif array.shape[1] != self.dim:
+            logger.warning(f"Not storing {array.shape[1]}-dimensional embeddings for {self.model_name}, "
+                           f"the store holds {self.dim}-dimensional ones")
+            return
+
+        row_bytes = 4 * self.dim
+        with open(self.index_path, 'ab') as index_file:
+            if fcntl is not None:
+                fcntl.flock(index_file.fileno(), fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                positions: Dict[str, int] = {}
+                for i, content_hash in enumerate(hashes):
+                    if content_hash not in self.rows and content_hash not in positions:
+                        positions[content_hash] = i
+                if not positions:
+                    return
+
+                with open(self.vectors_path, 'ab') as vectors_file:
+                    # Drops a partial row left by an interrupted write
+                    first_row = os.path.getsize(self.vectors_path) // row_bytes
+                    vectors_file.truncate(first_row * row_bytes)
+                    vectors_file.write(array[list(positions.values())].tobytes())
+                    vectors_file.flush()
+                    os.fsync(vectors_file.fileno())
+
+                # Rows are written before the index lines that point at them
+                lines = "".join(f"{content_hash}\t{first_row + n}\n" for n, content_hash in enumerate(positions))
+                if os.path.getsize(self.index_path) > self._index_offset:
+                    # Ends a line torn by an interrupted write so it stays unreadable on its own
+                    lines = "\n" + lines
+                index_file.write(lines.encode("ascii"))
+                index_file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(index_file.fileno(), fcntl.LOCK_UN)
+        self.refresh()
+
+
+class EmbeddingStore:
+    def __init__(self, directory: Optional[str] = None, enabled: Optional[bool] = None):
+        self.directory = directory or Config.EMBEDDING_STORE_DIR
+        self.enabled = Config.EMBEDDING_STORE if enabled is None else enabled
+        self._models: Dict[str, _ModelEmbeddings] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_model(self, model_name: str) -> _ModelEmbeddings:
+        store = self._models.get(model_name)
+        if store is None:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            store = _ModelEmbeddings(os.path.join(self.directory, slug), model_name)
+            self._models[model_name] = store
+        return store
+
+    def get_many(self, model_name: str, hashes: List[str]) -> List[Optional[List[float]]]:
+        try:
+            with self._lock:
+                store = self._get_model(model_name)
+                if any(content_hash not in store.rows for content_hash in hashes):
+                    store.refresh()
+                vectors = store.get(hashes)
+        except Exception as e:
+            logger.warning(f"Could not read stored embeddings for {model_name}: {e}")
+            vectors = [None] * len(hashes)
+
+        found = sum(1 for vector in vectors if vector is not None)
+        self.hits += found
+        self.misses += len(hashes) - found
+        return vectors
+
+    def put_many(self, model_name: str, hashes: List[str], vectors: List[List[float]]):
+        if not hashes:
+            return
+        try:
+            with self._lock:
+                self._get_model(model_name).append(hashes, vectors)
+        except Exception as e:
+            logger.warning(f"Could not store embeddings for {model_name}: {e}")
+
+    def count(self, model_name: str) -> int:
+        with self._lock:
+            store = self._get_model(model_name)
+            store.refresh()
+            return len(store.rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+embedding_store = EmbeddingStore()
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+from src.cache import TTLCache
+from src.logger import logger
+from src.config import Config
+
+
+class EmbeddingRegistry:
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._load_times: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def get(self,
+            model_name: Optional[str] = None,
+            device: Optional[str] = None):
+        key = (model_name or Config.EMBEDDING_MODEL, device or Config.EMBEDDING_DEVICE)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(*key)
+                self._models[key] = model
+        return model
+
+    def _load(self, model_name: str, device: str):
+        try:
+            logger.info(f"Loading embedding model {model_name} on {device}")
+            start = time.perf_counter()
+
+            model = HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device})
+            # Warm-up pass so the first real query does not pay for lazy initialisation
+            model.embed_query("warm-up")
+
+            elapsed = time.perf_counter() - start
+            self._load_times[(model_name, device)] = elapsed
+            logger.info(f"Loaded embedding model {model_name} on {device} in {elapsed:.2f}s")
+            return model
+
+        except Exception as e:
+            logger.error(f"Failed to load embedding model {model_name}: {e}")
+            raise
+
+    def get_load_time(self,
+                      model_name: Optional[str] = None,
+                      device: Optional[str] = None) -> Optional[float]:
+        key = (model_name or Config.EMBEDDING_MODEL, device or Config.EMBEDDING_DEVICE)
+        return self._load_times.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._load_times.clear()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size: int = None, ttl: Optional[float] = None):
+        self._cache = TTLCache(
+            max_size=max_size or Config.QUERY_CACHE_SIZE,
+            ttl=ttl if ttl is not None else Config.QUERY_CACHE_TTL
+        )
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        # MiniLM is uncased, so case and whitespace do not change the embedding
+        return " ".join(query.lower().split())
+
+    def get_embedding(self, query: str, model) -> List[float]:
+        normalized = self.normalize(query)
+        key = (getattr(model, "model_name", None), normalized)
+
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = np.asarray(model.embed_query(normalized), dtype=np.float32)
+            self._cache.set(key, vector)
+        return vector.tolist()
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._cache.get_stats()
+
+    def clear(self):
+        self._cache.clear()
+
+
+embedding_registry = EmbeddingRegistry()
+query_embedding_cache = QueryEmbeddingCache()
@@ -0,0 +1,21 @@
+import hashlib
+import uuid
+
+
+def sha256_file(file_path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+POINT_ID_NAMESPACE = uuid.UUID("6f1c3c1e-2f0b-5c8e-9a57-7a1d4e0b9c21")
+
+
+def point_id(source: str, content_hash: str) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source}:{content_hash}"))
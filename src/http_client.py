@@ -0,0 +1,219 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.logger import logger
+from src.config import Config
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def close_at_loop_shutdown(aclose: Callable[[], Awaitable[Any]]) -> AsyncIterator[None]:
+    # Must be called on a running loop. asyncio.run() finalizes the async generators
+    # still alive on its loop right before closing it, so one parked at its first
+    # yield runs aclose while the loop can still await it. Keep the returned
+    # generator referenced for as long as the resource lives
+    async def closer():
+        try:
+            yield
+        finally:
+            await aclose()
+
+    generator = closer()
+    try:
+        generator.__anext__().send(None)
+    except StopIteration:
+        pass
+    return generator
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        # Once the reset timeout passes, requests are let through again; the
+        # next failure re-opens the circuit straight away
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HTTPClient:
+    def __init__(self,
+                 pool_size: Optional[int] = None,
+                 connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None,
+                 backoff_jitter: Optional[float] = None,
+                 circuit_failures: Optional[int] = None,
+                 circuit_reset: Optional[float] = None):
+        self.pool_size = pool_size or Config.HTTP_POOL_SIZE
+        self.connect_timeout = connect_timeout or Config.HTTP_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or Config.HTTP_READ_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else Config.HTTP_MAX_RETRIES
+        self.backoff_factor = backoff_factor if backoff_factor is not None else Config.HTTP_BACKOFF_FACTOR
+        self.backoff_jitter = backoff_jitter if backoff_jitter is not None else Config.HTTP_BACKOFF_JITTER
+        self.circuit_failures = circuit_failures or Config.HTTP_CIRCUIT_FAILURES
+        self.circuit_reset = circuit_reset if circuit_reset is not None else Config.HTTP_CIRCUIT_RESET
+
+        self._session: Optional[requests.Session] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        # One async pool per event loop, dropped with the loop
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            # Both upstream APIs are read-only, so retrying POST is safe
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _get_breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.circuit_failures, self.circuit_reset)
+                self._breakers[host] = breaker
+        return breaker
+
+    def _check_circuit(self, url: str) -> CircuitBreaker:
+        breaker = self._get_breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {urlsplit(url).netloc}, skipping request")
+        return breaker
+
+    def _record(self, breaker: CircuitBreaker, status_code: int, url: str):
+        if status_code in RETRY_STATUSES:
+            breaker.record_failure()
+            if breaker.state == "open":
+                logger.warning(f"Opened circuit for {urlsplit(url).netloc} after {breaker.failures} failures")
+        else:
+            breaker.record_success()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        breaker = self._check_circuit(url)
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+        self._record(breaker, response.status_code, url)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # The async connection pool belongs to the event loop it was created on and
+        # is closed when asyncio.run() shuts that loop down
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(max_connections=self.pool_size,
+                                        max_keepalive_connections=self.pool_size),
+                    transport=httpx.AsyncHTTPTransport(retries=self.max_retries)
+                )
+                entry = (client, close_at_loop_shutdown(client.aclose))
+                self._async_clients[loop] = entry
+        return entry[0]
+
+    async def aclose(self):
+        # For loops not run by asyncio.run(): closes this loop's pool before the loop goes away
+        with self._lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_factor * 2 ** attempt + random.uniform(0, self.backoff_jitter)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        breaker = self._check_circuit(url)
+        client = self._get_async_client()
+        # The transport only retries failed connects; statuses are retried here
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.RequestError:
+                breaker.record_failure()
+                raise
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+            delay = self._backoff(attempt)
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s "
+                           f"(attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+        self._record(breaker, response.status_code, url)
+        return response
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+
+http_client = HTTPClient()
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+from src.logger import logger
+from src.config import Config
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; saves are then only serialised within one process
+    fcntl = None
+
+
+class IngestManifest:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.INGEST_MANIFEST_PATH
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {"files": {}}
+        # Changes not saved yet; None marks a removed file. They are replayed on
+        # top of whatever another process (e.g. the bulk CLI next to the app)
+        # has written in the meantime, instead of overwriting it
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pending_reset = False
+        self._disk_version: Optional[Tuple[int, int, int]] = None
+        self.load()
+
+    @staticmethod
+    def file_key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_files(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get("files", {})
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ingest manifest {self.path}: {e}")
+            return {}
+
+    def _merge(self):
+        self._disk_version = self._stat()
+        files = {} if self._pending_reset else self._read_files()
+        for key, entry in self._pending.items():
+            if entry is None:
+                files.pop(key, None)
+            else:
+                files[key] = entry
+        self._data = {"files": files}
+
+    def load(self):
+        with self._lock:
+            self._merge()
+            if self._disk_version is not None:
+                logger.info(f"Loaded ingest manifest with {len(self._data['files'])} files from {self.path}")
+
+    def _refresh(self):
+        if self._stat() != self._disk_version:
+            self.load()
+
+    @contextmanager
+    def _file_lock(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def save(self):
+        with self._lock, self._file_lock():
+            self._merge()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+            self._pending = {}
+            self._pending_reset = False
+            self._disk_version = self._stat()
+
+    def version(self) -> Optional[Tuple[int, int, int]]:
+        # Changes whenever any process saves the manifest
+        return self._stat()
+
+    def get_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return self._data["files"].get(self.file_key(file_path))
+
+    def set_file(self,
+                 file_path: str,
+                 file_hash: str,
+                 chunks: Dict[str, Any],
+                 settings: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            key = self.file_key(file_path)
+            entry = {"file_hash": file_hash, "chunks": chunks, "settings": settings or {}}
+            self._pending[key] = entry
+            self._data["files"][key] = entry
+
+    def remove_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            key = self.file_key(file_path)
+            self._pending[key] = None
+            return self._data["files"].pop(key, None)
+
+    def files(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._data["files"].keys())
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self._pending_reset = True
+            self._data["files"] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._data["files"])
+
+
+ingest_manifest = IngestManifest()
@@ -0,0 +1,258 @@
+import os
+import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from src.pdf_processor import pdf_processor
+from src.vector_store import vector_store
+from src.embeddings import embedding_registry
+from src.embedding_store import embedding_store as default_embedding_store
+from src.ingest_manifest import ingest_manifest
+from src.bm25_index import bm25_index
+from src.hashing import point_id, sha256_file, sha256_text
+from src.logger import logger
+from src.config import Config
+
+
+class IngestionPipeline:
+    def __init__(self,
+                 embeddings_model=None,
+                 batch_size: int = None,
+                 processor=None,
+                 store=None,
+                 manifest=None,
+                 lexical_index=None,
+                 embedding_store=None):
+        self.embeddings_model = embeddings_model
+        self.batch_size = batch_size or Config.EMBED_BATCH_SIZE
+        self.processor = processor or pdf_processor
+        self.store = store or vector_store
+        self.manifest = manifest if manifest is not None else ingest_manifest
+        self.lexical_index = lexical_index if lexical_index is not None else bm25_index
+        self.embedding_store = embedding_store if embedding_store is not None else default_embedding_store
+        self.last_stats: Dict[str, Any] = {}
+
+    def _get_embeddings_model(self):
+        if self.embeddings_model is None:
+            self.embeddings_model = embedding_registry.get()
+        return self.embeddings_model
+
+    def embed_batch(self, documents: List[Dict[str, Any]]) -> Tuple[List[List[float]], float]:
+        model = self._get_embeddings_model()
+        start = time.perf_counter()
+        texts = [doc["content"] for doc in documents]
+        model_name = getattr(model, "model_name", None)
+        if not self.embedding_store.enabled or not isinstance(model_name, str):
+            return model.embed_documents(texts), time.perf_counter() - start
+
+        # Chunks embedded before, e.g. ahead of a collection rebuild, are read
+        # back from the local store instead of going through the model again
+        hashes = [doc.get("content_hash") or sha256_text(text) for doc, text in zip(documents, texts)]
+        embeddings = self.embedding_store.get_many(model_name, hashes)
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+        if missing:
+            computed = model.embed_documents([texts[i] for i in missing])
+            self.embedding_store.put_many(model_name, [hashes[i] for i in missing], computed)
+            for i, vector in zip(missing, computed):
+                embeddings[i] = vector
+        if len(missing) < len(documents):
+            logger.info(f"Reused {len(documents) - len(missing)} of {len(documents)} stored embeddings")
+        return embeddings, time.perf_counter() - start
+
+    def _record_stats(self, chunks: int, seconds: float):
+        self.last_stats = {
+            "chunks": chunks,
+            "batch_size": self.batch_size,
+            "seconds": seconds,
+            "chunks_per_sec": chunks / seconds if seconds > 0 else 0.0,
+        }
+        logger.info(f"Embedded {chunks} chunks in {seconds:.2f}s "
+                    f"({self.last_stats['chunks_per_sec']:.1f} chunks/sec, batch size {self.batch_size})")
+
+    def _iter_batches(self, documents: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def embed_documents(self, documents: List[Dict[str, Any]]) -> List[List[float]]:
+        try:
+            embeddings = []
+            elapsed = 0.0
+            for batch in self._iter_batches(documents):
+                batch_embeddings, seconds = self.embed_batch(batch)
+                embeddings.extend(batch_embeddings)
+                elapsed += seconds
+
+            self._record_stats(len(documents), elapsed)
+            return embeddings
+
+        except Exception as e:
+            logger.error(f"Error embedding documents: {e}")
+            raise
+
+    def sync_manifest(self):
+        # A recreated or wiped collection invalidates everything the manifest remembers
+        try:
+            stats = self.store.get_stats()
+            vector_count = stats.get("vector_count") or 0
+            if vector_count == 0:
+                if len(self.manifest):
+                    logger.warning("Vector collection is empty, resetting ingest manifest")
+                    self.manifest.reset()
+                    self.manifest.save()
+                if len(self.lexical_index):
+                    self.lexical_index.reset()
+                    self.lexical_index.save()
+            elif not len(self.lexical_index):
+                # e.g. the index file was deleted or predates the collection
+                self.rebuild_lexical_index()
+        except Exception as e:
+            logger.warning(f"Could not check collection state for ingest manifest: {e}")
+
+    def rebuild_lexical_index(self):
+        logger.info("Rebuilding BM25 index from the vector collection")
+        self.lexical_index.reset()
+        batch = []
+        for doc in self.store.scroll_documents():
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                self.lexical_index.add_documents(batch)
+                batch = []
+        self.lexical_index.add_documents(batch)
+        self.lexical_index.save()
+        logger.info(f"Rebuilt BM25 index with {len(self.lexical_index)} chunks")
+
+    def _embedding_model_name(self) -> str:
+        model_name = getattr(self.embeddings_model, "model_name", None)
+        return model_name if isinstance(model_name, str) else Config.EMBEDDING_MODEL
+
+    def settings(self) -> Dict[str, Any]:
+        # A file's chunks and vectors depend on these as much as on its bytes
+        return {"embedding_model": self._embedding_model_name(), **self.processor.chunk_settings()}
+
+    def is_unchanged(self, file_path: str, file_hash: str) -> bool:
+        entry = self.manifest.get_file(file_path)
+        return (entry is not None and entry["file_hash"] == file_hash
+                and entry.get("settings") == self.settings())
+
+    def can_reuse(self, entry: Optional[Dict[str, Any]]) -> bool:
+        # Vectors from another embedding model are not comparable with this one's queries
+        return (entry is not None
+                and entry.get("settings", {}).get("embedding_model") == self._embedding_model_name())
+
+    def diff_chunks(self,
+                    documents: Iterable[Dict[str, Any]],
+                    old_chunks: Dict[str, Any],
+                    new_chunks: Dict[str, Any],
+                    reused: Optional[List[Dict[str, Any]]] = None,
+                    reuse: bool = True) -> Iterator[Dict[str, Any]]:
+        # Yields only chunks whose content is not already stored, assigning them
+        # point ids; unchanged chunks keep their existing ids in new_chunks and
+        # are collected in reused so their positions can be refreshed. Without
+        # reuse every chunk is yielded and overwrites its old point
+        for doc in documents:
+            content_hash = sha256_text(doc["content"])
+            doc["content_hash"] = content_hash
+            if content_hash in new_chunks:
+                continue
+            if reuse and content_hash in old_chunks:
+                new_chunks[content_hash] = old_chunks[content_hash]
+                if reused is not None:
+                    doc["point_id"] = old_chunks[content_hash]
+                    reused.append(doc)
+                continue
+            doc["point_id"] = point_id(doc["source"], content_hash)
+            new_chunks[content_hash] = doc["point_id"]
+            yield doc
+
+    def commit_file(self,
+                    file_path: str,
+                    file_hash: str,
+                    old_chunks: Dict[str, Any],
+                    new_chunks: Dict[str, Any],
+                    save: bool = True) -> int:
+        stale_ids = [point_id for content_hash, point_id in old_chunks.items()
+                     if content_hash not in new_chunks]
+        self.store.delete_points(stale_ids)
+        self.lexical_index.remove(stale_ids)
+        self.manifest.set_file(file_path, file_hash, new_chunks, self.settings())
+        if save:
+            self.manifest.save()
+        return len(stale_ids)
+
+    def update_reused(self, reused: List[Dict[str, Any]]):
+        # Text inserted earlier in a file shifts the chunk ids and pages of the
+        # chunks after it; stale ids would make the retriever stitch unrelated
+        # chunks together
+        if not reused:
+            return
+        self.store.update_positions(reused)
+        self.lexical_index.add_documents(reused)
+
+    def store_batch(self, embeddings: List[List[float]], batch: List[Dict[str, Any]]):
+        self.store.add_embeddings(embeddings, batch, ids=[doc["point_id"] for doc in batch])
+        self.lexical_index.add_documents(batch)
+
+    def purge_missing_files(self) -> int:
+        purged = 0
+        for file_path in self.manifest.files():
+            if os.path.exists(file_path):
+                continue
+            entry = self.manifest.remove_file(file_path)
+            self.store.delete_points(list(entry["chunks"].values()))
+            self.lexical_index.remove(entry["chunks"].values())
+            purged += 1
+            logger.info(f"Purged {len(entry['chunks'])} chunks of deleted file {file_path}")
+
+        if purged:
+            self.manifest.save()
+            self.lexical_index.save()
+        return purged
+
+    def ingest_pdf(self, pdf_path: str) -> int:
+        try:
+            self.store.create_collection(force_recreate=False)
+            self.sync_manifest()
+
+            file_hash = sha256_file(pdf_path)
+            entry = self.manifest.get_file(pdf_path)
+            if self.is_unchanged(pdf_path, file_hash):
+                logger.info(f"Skipping unchanged PDF: {pdf_path}")
+                self.last_stats = {"chunks": 0, "unchanged": True}
+                return len(entry["chunks"])
+
+            old_chunks = dict(entry["chunks"]) if entry else {}
+            new_chunks: Dict[str, Any] = {}
+            reused: List[Dict[str, Any]] = []
+
+            # Chunks are embedded and stored batch by batch while later pages
+            # are still being extracted
+            total = 0
+            elapsed = 0.0
+            chunks = self.processor.iter_chunks(pdf_path, file_hash)
+            documents = self.diff_chunks(chunks, old_chunks, new_chunks, reused, self.can_reuse(entry))
+            for batch in self._iter_batches(documents):
+                embeddings, seconds = self.embed_batch(batch)
+                self.store_batch(embeddings, batch)
+                total += len(batch)
+                elapsed += seconds
+
+            self.update_reused(reused)
+            deleted = self.commit_file(pdf_path, file_hash, old_chunks, new_chunks)
+            self.lexical_index.save()
+
+            self._record_stats(total, elapsed)
+            self.last_stats.update({"unchanged": False, "reused": len(new_chunks) - total, "deleted": deleted})
+            logger.info(f"Stored {total} new embeddings in vector store "
+                        f"({self.last_stats['reused']} reused, {deleted} removed)")
+            return len(new_chunks)
+
+        except Exception as e:
+            logger.error(f"Error ingesting PDF {pdf_path}: {e}")
+            raise
+
+
+ingestion_pipeline = IngestionPipeline()
@@ -0,0 +1,68 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Iterable, Iterator, Optional, Tuple
+from src.logger import logger
+from src.config import Config
+
+
+class PageTextCache:
+    def __init__(self, directory: Optional[str] = None, enabled: Optional[bool] = None):
+        self.directory = directory or Config.PAGE_TEXT_CACHE_DIR
+        self.enabled = Config.PAGE_TEXT_CACHE if enabled is None else enabled
+
+    def _path(self, file_hash: str, version: str) -> str:
+        # Entries from another extractor version are simply never looked up again
+        version_tag = hashlib.sha256(version.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"{file_hash}-{version_tag}.jsonl.gz")
+
+    def contains(self, file_hash: str, version: str) -> bool:
+        return self.enabled and os.path.exists(self._path(file_hash, version))
+
+    def iter_pages(self, file_path: str, file_hash: str, version: str) -> Iterator[Tuple[int, str]]:
+        path = self._path(file_hash, version)
+        logger.info(f"Loading extracted text of {file_path} from cache")
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    page_num, text = json.loads(line)
+                    yield page_num, text
+        except (OSError, EOFError, ValueError) as e:
+            # Dropped so the next attempt extracts the file again
+            logger.error(f"Unreadable page text cache entry {path}: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    def store(self,
+              file_hash: str,
+              version: str,
+              pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        # Passes pages through while writing them. The entry only becomes visible
+        # once the last page is written, so an interrupted extraction leaves nothing behind
+        path = self._path(file_hash, version)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            f = gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6)
+        except OSError as e:
+            logger.warning(f"Not caching extracted text in {self.directory}: {e}")
+            yield from pages
+            return
+
+        complete = False
+        try:
+            with f:
+                for page_num, text in pages:
+                    f.write(json.dumps([page_num, text]) + "\n")
+                    yield page_num, text
+            os.replace(tmp_path, path)
+            complete = True
+        finally:
+            if not complete and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+page_text_cache = PageTextCache()
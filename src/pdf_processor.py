@@ -1,40 +1,128 @@
+import bisect
 import os
-from typing import List, Dict, Any, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from pathlib import Path
 import PyPDF2
+from src.chunker import Chunker
+from src.hashing import sha256_file
+from src.page_text_cache import page_text_cache
 from src.logger import logger
 from src.config import Config
 
 
+# Part of the page text cache key; bump the suffix when extraction changes
+EXTRACTOR_VERSION = f"PyPDF2 {PyPDF2.__version__}/1"
+
+
+def _extract_page_text(page, page_num: int) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception as e:
+        logger.warning(f"Error extracting text from page {page_num}: {e}")
+        return ""
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    # Runs inside worker processes, so each one opens the file itself and
+    # extracts pages start..end-1 (0-based)
+    with open(file_path, 'rb') as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        return [_extract_page_text(pdf_reader.pages[i], i + 1) for i in range(start, end)]
+
+
 class PDFProcessor:
-    def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
-        self.chunk_size = chunk_size or Config.CHUNK_SIZE
-        self.chunk_overlap = chunk_overlap or Config.CHUNK_OVERLAP
+    def __init__(self,
+                 chunk_size: int = None,
+                 chunk_overlap: int = None,
+                 shard_workers: Optional[int] = None,
+                 shard_threshold: Optional[int] = None,
+                 shard_pages: Optional[int] = None,
+                 page_cache=None):
+        self.chunker = Chunker(chunk_size, chunk_overlap)
+        self.chunk_size = self.chunker.chunk_size
+        self.chunk_overlap = self.chunker.chunk_overlap
+        self.shard_workers = (shard_workers if shard_workers is not None
+                              else Config.PDF_SHARD_WORKERS or os.cpu_count() or 1)
+        self.shard_threshold = shard_threshold or Config.PDF_SHARD_THRESHOLD
+        self.shard_pages = shard_pages or Config.PDF_SHARD_PAGES
+        self.page_cache = page_cache if page_cache is not None else page_text_cache
         self.pdf_dir = Config.PDF_DIR
         os.makedirs(self.pdf_dir, exist_ok=True)
     
-    def load_pdf(self, file_path: str) -> str:
-        try:
-            if not os.path.exists(file_path):
-                raise FileNotFoundError(f"PDF file not found: {file_path}")
+    def chunk_settings(self) -> Dict[str, Any]:
+        return {"chunk_size": self.chunk_size, "chunk_overlap": self.chunk_overlap,
+                "chunk_tokenizer": self.chunker.counter.name}
+    
+    def iter_pages(self, file_path: str, file_hash: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"PDF file not found: {file_path}")
+        
+        if not file_path.lower().endswith('.pdf'):
+            raise ValueError(f"File is not a PDF: {file_path}")
+        
+        if not self.page_cache.enabled:
+            yield from self._extract_pages(file_path)
+            return
+        
+        # Re-chunking or re-embedding a file that was extracted before skips parsing entirely
+        file_hash = file_hash or sha256_file(file_path)
+        if self.page_cache.contains(file_hash, EXTRACTOR_VERSION):
+            yield from self.page_cache.iter_pages(file_path, file_hash, EXTRACTOR_VERSION)
+        else:
+            yield from self.page_cache.store(file_hash, EXTRACTOR_VERSION, self._extract_pages(file_path))
+    
+    def _extract_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        logger.info(f"Loading PDF: {file_path}")
+        
+        with open(file_path, 'rb') as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
             
-            if not file_path.endswith('.pdf'):
-                raise ValueError(f"File is not a PDF: {file_path}")
+            page_count = len(pdf_reader.pages)
+            if page_count == 0:
+                raise ValueError("PDF file is empty")
             
-            logger.info(f"Loading PDF: {file_path}")
+            if self.shard_workers <= 1 or page_count < self.shard_threshold:
+                for page_num, page in enumerate(pdf_reader.pages, 1):
+                    yield page_num, _extract_page_text(page, page_num)
+                return
+        
+        yield from self._iter_sharded_pages(file_path, page_count)
+    
+    def _iter_sharded_pages(self, file_path: str, page_count: int) -> Iterator[Tuple[int, str]]:
+        # Extraction is pure Python and CPU bound, so large files are split into
+        # page ranges for a process pool. Shards are yielded in page order and
+        # only a few are submitted ahead, so memory stays bounded and the
+        # first chunks are not held back until the whole file is parsed.
+        shards = [(start, min(start + self.shard_pages, page_count))
+                  for start in range(0, page_count, self.shard_pages)]
+        workers = min(self.shard_workers, len(shards))
+        logger.info(f"Extracting {page_count} pages in {len(shards)} shards with {workers} processes")
+        
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            remaining = iter(shards)
+            in_flight = deque()
+            for start, end in remaining:
+                in_flight.append((start, executor.submit(extract_page_range, file_path, start, end)))
+                if len(in_flight) >= workers * 2:
+                    break
             
-            text = ""
-            with open(file_path, 'rb') as pdf_file:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                
-                if len(pdf_reader.pages) == 0:
-                    raise ValueError("PDF file is empty")
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        text += page.extract_text()
-                    except Exception as e:
-                        logger.warning(f"Error extracting text from page {page_num + 1}: {e}")
+            while in_flight:
+                start, future = in_flight.popleft()
+                texts = future.result()
+                next_shard = next(remaining, None)
+                if next_shard is not None:
+                    in_flight.append((next_shard[0], executor.submit(extract_page_range, file_path, *next_shard)))
+                for offset, text in enumerate(texts):
+                    yield start + offset + 1, text
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def load_pdf(self, file_path: str) -> str:
+        try:
+            text = "".join(page_text for _, page_text in self.iter_pages(file_path))
             
             logger.info(f"Successfully loaded PDF with {len(text)} characters")
             return text
@@ -50,36 +138,51 @@ class PDFProcessor:
             raise
     
     def split_text(self, text: str) -> List[str]:
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + self.chunk_size
-            chunk = text[start:end]
-            chunks.append(chunk)
-            start = end - self.chunk_overlap
+        chunks = [content for _, _, content, _ in self.chunker.split(text)]
         
         logger.info(f"Split text into {len(chunks)} chunks")
         return chunks
     
-    def process_pdf(self, file_path: str) -> List[Dict[str, Any]]:
+    def iter_chunks(self, file_path: str, file_hash: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        # Produces the same chunks as split_text(load_pdf(...)), but yields each one
+        # as soon as the pages it spans have been extracted
+        name = Path(file_path).name
+        page_offsets: List[int] = []
+        page_numbers: List[int] = []
+        
+        def page_texts() -> Iterator[str]:
+            total_length = 0
+            for page_num, page_text in self.iter_pages(file_path, file_hash):
+                page_offsets.append(total_length)
+                page_numbers.append(page_num)
+                total_length += len(page_text)
+                yield page_text
+        
+        for chunk_index, (start, end, content, token_count) in enumerate(self.chunker.iter_spans(page_texts())):
+            first = max(bisect.bisect_right(page_offsets, start) - 1, 0)
+            last = max(bisect.bisect_right(page_offsets, max(start, end - 1)) - 1, 0)
+            yield {
+                "content": content,
+                "source": file_path,
+                "chunk_id": chunk_index,
+                "metadata": {
+                    "source": name,
+                    "chunk_index": chunk_index,
+                    "page_start": page_numbers[first],
+                    "page_end": page_numbers[last],
+                    "token_count": token_count
+                }
+            }
+            # Chunks never start before the previous one, so earlier pages are done with
+            del page_offsets[:first]
+            del page_numbers[:first]
+    
+    def process_pdf(self, file_path: str, file_hash: Optional[str] = None) -> List[Dict[str, Any]]:
         try:
-            text = self.load_pdf(file_path)
-            chunks = self.split_text(text)
+            documents = list(self.iter_chunks(file_path, file_hash))
             
-            documents = []
-            for i, chunk in enumerate(chunks):
-                doc = {
-                    "content": chunk,
-                    "source": file_path,
-                    "chunk_id": i,
-                    "metadata": {
-                        "source": Path(file_path).name,
-                        "chunk_index": i,
-                        "total_chunks": len(chunks)
-                    }
-                }
-                documents.append(doc)
+            for doc in documents:
+                doc["metadata"]["total_chunks"] = len(documents)
             
             logger.info(f"Processed PDF into {len(documents)} documents")
             return documents
@@ -97,7 +200,7 @@ class PDFProcessor:
         
         pdf_files = []
         for file in os.listdir(search_dir):
-            if file.endswith('.pdf'):
+            if file.lower().endswith('.pdf'):
                 pdf_files.append(os.path.join(search_dir, file))
         
         logger.info(f"Found {len(pdf_files)} PDF files in {search_dir}")
@@ -105,6 +208,8 @@ class PDFProcessor:
     
     def validate_pdf(self, file_path: str) -> bool:
         try:
+            if self.page_cache.enabled and self.page_cache.contains(sha256_file(file_path), EXTRACTOR_VERSION):
+                return True
             with open(file_path, 'rb') as f:
                 PyPDF2.PdfReader(f)
             return True
@@ -0,0 +1,152 @@
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from src.logger import logger
+from src.config import Config
+from src.city_extractor import city_extractor
+
+
+ROUTES = ("weather", "pdf", "general")
+
+# Terms that only make sense in a weather question
+STRONG_WEATHER_TERMS = [
+    r"weather", r"forecasts?", r"rain(?:s|ing|y|fall)?", r"snow(?:s|ing|y|fall)?", r"humid(?:ity)?",
+    r"drizzl(?:e|ing)", r"sleet", r"hail(?:ing|storms?)?", r"sunny", r"cloudy", r"windy", r"rainy",
+    r"snowy", r"fog(?:gy)?", r"thunder(?:storms?)?", r"celsius", r"fahrenheit", r"sunset", r"sunrise",
+    r"dew", r"frost(?:y)?",
+]
+
+# Terms that are also common in documents ("model temperature", "cloud computing", ...)
+WEAK_WEATHER_TERMS = [
+    r"temperatures?", r"winds?", r"climate", r"pressure", r"clouds?", r"storms?", r"lightning",
+    r"degrees?", r"hot", r"cold", r"warm(?:er|est)?", r"cool(?:er|est)?", r"visibility",
+]
+
+# Terms that point a weak-only query at the indexed documents
+DOCUMENT_TERMS = [
+    r"papers?", r"documents?", r"pdfs?", r"sections?", r"chapters?", r"pages?", r"figures?", r"tables?",
+    r"articles?", r"reports?", r"authors?", r"appendix", r"abstract", r"experiments?", r"uploaded",
+]
+
+PROTOTYPE_QUERIES = {
+    "weather": [
+        "What is the weather in London?",
+        "Will it rain tomorrow?",
+        "How hot is it today in Paris?",
+        "What's the temperature outside right now?",
+        "Is it going to snow this weekend?",
+        "How windy is it in Chicago?",
+        "Do I need an umbrella today?",
+        "What's the forecast for New York?",
+    ],
+    "pdf": [
+        "What does the document say about this topic?",
+        "Summarize the uploaded paper",
+        "What are the main findings of the paper?",
+        "According to the PDF, which method is used?",
+        "Explain the model architecture described in the document",
+        "What results are reported in the experiments section?",
+    ],
+    "general": [
+        "Who won the world cup in 2022?",
+        "What is the capital of Australia?",
+        "Latest news about the stock market",
+        "Who is the CEO of Microsoft?",
+        "How do I cook pasta?",
+        "What happened in the news today?",
+    ],
+}
+
+
+def _compile_terms(terms: List[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(terms) + r")\b", re.IGNORECASE)
+
+
+class QueryRouter:
+    def __init__(self,
+                 use_embeddings: Optional[bool] = None,
+                 margin: Optional[float] = None,
+                 pdf_prior: Optional[float] = None,
+                 weak_keyword_bonus: Optional[float] = None):
+        self.use_embeddings = Config.ROUTER_USE_EMBEDDINGS if use_embeddings is None else use_embeddings
+        self.margin = Config.ROUTER_MARGIN if margin is None else margin
+        self.pdf_prior = Config.ROUTER_PDF_PRIOR if pdf_prior is None else pdf_prior
+        self.weak_keyword_bonus = Config.ROUTER_WEAK_KEYWORD_BONUS if weak_keyword_bonus is None else weak_keyword_bonus
+
+        self._strong_pattern = _compile_terms(STRONG_WEATHER_TERMS)
+        self._weak_pattern = _compile_terms(WEAK_WEATHER_TERMS)
+        self._document_pattern = _compile_terms(DOCUMENT_TERMS)
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def match_keywords(self, query: str) -> Optional[str]:
+        if self._strong_pattern.search(query):
+            return "strong"
+        if self._weak_pattern.search(query):
+            return "weak"
+        return None
+
+    def _get_centroids(self, embed_texts: Callable[[List[str]], List[List[float]]]) -> Dict[str, np.ndarray]:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = {}
+                    for route, examples in PROTOTYPE_QUERIES.items():
+                        vectors = np.asarray(embed_texts(examples), dtype=np.float32)
+                        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                        centroid = vectors.mean(axis=0)
+                        centroids[route] = centroid / np.linalg.norm(centroid)
+                    self._centroids = centroids
+        return self._centroids
+
+    def embedding_scores(self,
+                         query_embedding: List[float],
+                         embed_texts: Callable[[List[str]], List[List[float]]]) -> Dict[str, float]:
+        centroids = self._get_centroids(embed_texts)
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+        return {route: float(vector @ centroid) for route, centroid in centroids.items()}
+
+    def route(self,
+              query: str,
+              has_documents: bool,
+              query_embedding: Optional[List[float]] = None,
+              embed_texts: Optional[Callable[[List[str]], List[List[float]]]] = None) -> Dict[str, Any]:
+        keyword = self.match_keywords(query)
+        if keyword == "strong":
+            return {"route": "weather", "candidates": ["weather"], "scores": {}, "method": "keyword"}
+
+        scores: Dict[str, float] = {}
+        if self.use_embeddings and query_embedding is not None and embed_texts is not None:
+            try:
+                scores = self.embedding_scores(query_embedding, embed_texts)
+            except Exception as e:
+                logger.warning(f"Embedding routing failed, using keyword routing: {e}")
+
+        if scores:
+            if has_documents:
+                scores["pdf"] += self.pdf_prior
+            else:
+                scores.pop("pdf")
+            if keyword == "weak":
+                scores["weather"] += self.weak_keyword_bonus
+
+            ranked = sorted(scores, key=scores.get, reverse=True)
+            best = ranked[0]
+            candidates = [route for route in ranked if scores[best] - scores[route] <= self.margin]
+            return {"route": best, "candidates": candidates, "scores": scores, "method": "embedding"}
+
+        if keyword == "weak":
+            if not has_documents:
+                return {"route": "weather", "candidates": ["weather"], "scores": {}, "method": "keyword"}
+            # A weak term next to a document cue ("the paper", "section 3") is about the
+            # documents unless a city is named; otherwise it stays a weather question
+            if not self._document_pattern.search(query) or city_extractor.extract(query):
+                return {"route": "weather", "candidates": ["weather", "pdf"], "scores": {}, "method": "keyword"}
+        if has_documents:
+            return {"route": "pdf", "candidates": ["pdf"], "scores": {}, "method": "default"}
+        return {"route": "general", "candidates": ["general"], "scores": {}, "method": "default"}
+
+
+query_router = QueryRouter()
@@ -1,30 +1,99 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 from src.vector_store import vector_store
+from src.bm25_index import bm25_index
+from src.reranker import reranker as default_reranker
+from src.chunker import token_counter
 from src.logger import logger
 from src.config import Config
 
 
+def estimate_tokens(text: str) -> int:
+    # Counted the same way chunks are sized at ingestion
+    return token_counter.count(text)
+
+
+def _overlap_length(left: str, right: str, min_overlap: int = 16) -> int:
+    # Longest suffix of left that is also a prefix of right; very short matches
+    # are coincidence rather than chunk overlap
+    for length in range(min(len(left), len(right)), min_overlap - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
 class RAGRetriever:
     def __init__(self, 
                  vector_store_instance=None,
-                 top_k: int = None):
+                 top_k: int = None,
+                 context_token_budget: Optional[int] = None,
+                 lexical_index=None,
+                 hybrid: Optional[bool] = None,
+                 reranker=None):
         self.vector_store = vector_store_instance or vector_store
         self.top_k = top_k or Config.TOP_K_RETRIEVAL
+        self.lexical_index = lexical_index if lexical_index is not None else bm25_index
+        self.hybrid = Config.HYBRID_RETRIEVAL if hybrid is None else hybrid
+        self.hybrid_candidates = Config.HYBRID_CANDIDATES
+        self.rrf_k = Config.RRF_K
+        self.reranker = reranker or default_reranker
+        self.context_token_budget = (context_token_budget if context_token_budget is not None
+                                     else Config.CONTEXT_TOKEN_BUDGET)
+    
+    def _use_hybrid(self, query_text: Optional[str]) -> bool:
+        return bool(self.hybrid and query_text and len(self.lexical_index))
+    
+    def _use_rerank(self, query_text: Optional[str]) -> bool:
+        return bool(query_text and self.reranker.available)
+    
+    def _candidate_counts(self, k: int, hybrid: bool, rerank: bool) -> Tuple[int, int]:
+        # Reranking over-fetches so the cross-encoder has something to choose
+        # from; hybrid search fetches extra from each side before fusing
+        fused_k = max(k, self.reranker.candidates) if rerank else k
+        search_k = max(fused_k, self.hybrid_candidates) if hybrid else fused_k
+        return search_k, fused_k
+    
+    def fuse_results(self,
+                     result_lists: List[List[Dict[str, Any]]],
+                     top_k: int) -> List[Dict[str, Any]]:
+        # Reciprocal rank fusion: only ranks matter, so cosine and BM25 scores
+        # never have to be put on the same scale
+        fused: Dict[Any, Dict[str, Any]] = {}
+        for results in result_lists:
+            for rank, doc in enumerate(results, 1):
+                key = str(doc["id"])
+                if key not in fused:
+                    fused[key] = dict(doc, score=0.0)
+                fused[key]["score"] += 1.0 / (self.rrf_k + rank)
+        
+        return sorted(fused.values(), key=lambda doc: doc["score"], reverse=True)[:top_k]
     
     def retrieve(self, 
                 query_embedding: List[float],
-                top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+                top_k: Optional[int] = None,
+                query_text: Optional[str] = None) -> List[Dict[str, Any]]:
 
         try:
             k = top_k or self.top_k
-            logger.info(f"Retrieving top {k} documents")
+            hybrid = self._use_hybrid(query_text)
+            rerank = self._use_rerank(query_text)
+            search_k, fused_k = self._candidate_counts(k, hybrid, rerank)
+            logger.info(f"Retrieving top {k} documents{' (hybrid)' if hybrid else ''}"
+                        f"{f' from {fused_k} reranked candidates' if rerank else ''}")
             
             results = self.vector_store.search(
                 query_embedding=query_embedding,
-                top_k=k,
+                top_k=search_k,
                 score_threshold=0.0
             )
             
+            if hybrid:
+                lexical = self.lexical_index.search(query_text, search_k)
+                results = self.fuse_results([results, lexical], fused_k)
+            
+            if rerank:
+                results = self.reranker.rerank(query_text, results, min(k, self.reranker.top_n))
+            
             logger.info(f"Retrieved {len(results)} documents")
             return results
             
@@ -32,35 +101,159 @@ class RAGRetriever:
             logger.error(f"Error retrieving documents: {e}")
             raise
     
-    def format_context(self, documents: List[Dict[str, Any]]) -> str:
+    async def aretrieve(self,
+                        query_embedding: List[float],
+                        top_k: Optional[int] = None,
+                        query_text: Optional[str] = None) -> List[Dict[str, Any]]:
+
+        try:
+            k = top_k or self.top_k
+            hybrid = self._use_hybrid(query_text)
+            rerank = await asyncio.to_thread(self._use_rerank, query_text)
+            search_k, fused_k = self._candidate_counts(k, hybrid, rerank)
+            logger.info(f"Retrieving top {k} documents{' (hybrid)' if hybrid else ''}"
+                        f"{f' from {fused_k} reranked candidates' if rerank else ''}")
+            
+            results = await self.vector_store.asearch(
+                query_embedding=query_embedding,
+                top_k=search_k,
+                score_threshold=0.0
+            )
+            
+            if hybrid:
+                # The index is in memory, so scoring it inline is cheaper than a thread hop
+                lexical = self.lexical_index.search(query_text, search_k)
+                results = self.fuse_results([results, lexical], fused_k)
+            
+            if rerank:
+                results = await asyncio.to_thread(self.reranker.rerank, query_text, results,
+                                                  min(k, self.reranker.top_n))
+            
+            logger.info(f"Retrieved {len(results)} documents")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {e}")
+            raise
+    
+    def merge_passages(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Drop repeated chunks, then stitch consecutive chunks of the same source
+        # into one passage without their shared overlap
+        unique: Dict[Any, Dict[str, Any]] = {}
+        for doc in documents:
+            key = doc.get("document", "").strip()
+            if key and (key not in unique or doc.get("score", 0) > unique[key].get("score", 0)):
+                unique[key] = doc
+        
+        by_source: Dict[str, List[Dict[str, Any]]] = {}
+        for doc in unique.values():
+            by_source.setdefault(doc.get("source", "Unknown"), []).append(doc)
+        
+        passages = []
+        for source, docs in by_source.items():
+            docs.sort(key=lambda doc: (doc.get("chunk_id") is None, doc.get("chunk_id") or 0))
+            passage = None
+            for doc in docs:
+                chunk_id = doc.get("chunk_id")
+                text = doc.get("document", "")
+                adjacent = (passage is not None and chunk_id is not None
+                            and passage["last_chunk_id"] is not None
+                            and chunk_id == passage["last_chunk_id"] + 1)
+                if adjacent:
+                    passage["document"] += text[_overlap_length(passage["document"], text):]
+                    passage["score"] = max(passage["score"], doc.get("score", 0))
+                    passage["chunk_ids"].append(chunk_id)
+                    passage["last_chunk_id"] = chunk_id
+                else:
+                    passage = {
+                        "source": source,
+                        "document": text,
+                        "score": doc.get("score", 0),
+                        "chunk_ids": [chunk_id],
+                        "last_chunk_id": chunk_id
+                    }
+                    passages.append(passage)
+        
+        for passage in passages:
+            del passage["last_chunk_id"]
+        passages.sort(key=lambda passage: passage["score"], reverse=True)
+        return passages
+    
+    def _format_passage(self, index: int, passage: Dict[str, Any], content: str) -> str:
+        context = f"[Document {index}] (Score: {passage.get('score', 0):.4f})\n"
+        context += f"Source: {passage.get('source', 'Unknown')}\n"
+        context += f"Content:\n{content}\n"
+        return context
+    
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        spans = token_counter.spans(text)
+        if len(spans) <= max_tokens:
+            return text
+        return text[:spans[max_tokens - 1][1]] + " ..."
+    
+    def format_context(self,
+                       documents: List[Dict[str, Any]],
+                       token_budget: Optional[int] = None) -> str:
+        budget = self.context_token_budget if token_budget is None else token_budget
         context_parts = []
+        used = 0
         
-        for i, doc in enumerate(documents, 1):
-            context = f"[Document {i}] (Score: {doc.get('score', 0):.4f})\n"
-            context += f"Source: {doc.get('source', 'Unknown')}\n"
-            context += f"Content:\n{doc.get('document', '')}\n"
-            context_parts.append(context)
+        # Passages are packed best score first; one that does not fit is cut
+        # down to the remaining budget, or skipped when too little is left
+        for passage in self.merge_passages(documents):
+            content = passage["document"]
+            part = self._format_passage(len(context_parts) + 1, passage, content)
+            tokens = estimate_tokens(part)
+            
+            if budget > 0 and used + tokens > budget:
+                overhead = tokens - estimate_tokens(content)
+                remaining = budget - used - overhead
+                if remaining < Config.CONTEXT_MIN_PASSAGE_TOKENS:
+                    continue
+                content = self._truncate_to_tokens(content, remaining)
+                part = self._format_passage(len(context_parts) + 1, passage, content)
+                tokens = estimate_tokens(part)
+            
+            context_parts.append(part)
+            used += tokens
         
         return "\n".join(context_parts)
     
+    def _build_context_result(self,
+                              documents: List[Dict[str, Any]],
+                              include_scores: bool) -> Dict[str, Any]:
+        context = self.format_context(documents)
+        return {
+            "context": context,
+            "context_tokens": estimate_tokens(context),
+            "num_documents": len(documents),
+            "documents": documents if include_scores else [
+                {k: v for k, v in doc.items() if k != "score"}
+                for doc in documents
+            ]
+        }
+    
     def get_context_for_query(self,
                              query_embedding: List[float],
                              top_k: Optional[int] = None,
-                             include_scores: bool = True) -> Dict[str, Any]:
+                             include_scores: bool = True,
+                             query_text: Optional[str] = None) -> Dict[str, Any]:
         try:
-            documents = self.retrieve(query_embedding, top_k)
-            context = self.format_context(documents)
-            
-            result = {
-                "context": context,
-                "num_documents": len(documents),
-                "documents": documents if include_scores else [
-                    {k: v for k, v in doc.items() if k != "score"}
-                    for doc in documents
-                ]
-            }
+            documents = self.retrieve(query_embedding, top_k, query_text)
+            return self._build_context_result(documents, include_scores)
             
-            return result
+        except Exception as e:
+            logger.error(f"Error getting context: {e}")
+            raise
+    
+    async def aget_context_for_query(self,
+                                     query_embedding: List[float],
+                                     top_k: Optional[int] = None,
+                                     include_scores: bool = True,
+                                     query_text: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            documents = await self.aretrieve(query_embedding, top_k, query_text)
+            return self._build_context_result(documents, include_scores)
             
         except Exception as e:
             logger.error(f"Error getting context: {e}")
@@ -0,0 +1,106 @@
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from src.logger import logger
+from src.config import Config
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1 / (1 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1 + z)
+
+
+class Reranker:
+    def __init__(self,
+                 model=None,
+                 model_name: Optional[str] = None,
+                 device: Optional[str] = None,
+                 batch_size: Optional[int] = None,
+                 latency_budget: Optional[float] = None,
+                 candidates: Optional[int] = None,
+                 top_n: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        self.model = model
+        self.model_name = model_name or Config.RERANK_MODEL
+        self.device = device or Config.EMBEDDING_DEVICE
+        self.batch_size = batch_size or Config.RERANK_BATCH_SIZE
+        self.latency_budget = latency_budget if latency_budget is not None else Config.RERANK_LATENCY_BUDGET
+        self.candidates = candidates or Config.RERANK_CANDIDATES
+        self.top_n = top_n or Config.RERANK_TOP_N
+        self.enabled = Config.RERANK_ENABLED if enabled is None else enabled
+        self.last_stats: Dict[str, Any] = {}
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            # Optional dependency, only needed when reranking is switched on
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            logger.warning("sentence-transformers is not installed, reranking is disabled")
+            return None
+
+        try:
+            logger.info(f"Loading reranker {self.model_name} on {self.device}")
+            start = time.perf_counter()
+            model = CrossEncoder(self.model_name, device=self.device)
+            model.predict([("warm-up", "warm-up")])
+            logger.info(f"Loaded reranker {self.model_name} in {time.perf_counter() - start:.2f}s")
+            return model
+        except Exception as e:
+            logger.warning(f"Failed to load reranker {self.model_name}, reranking is disabled: {e}")
+            return None
+
+    def _get_model(self):
+        if self.model is None and not self._load_failed:
+            with self._lock:
+                if self.model is None and not self._load_failed:
+                    self.model = self._load()
+                    self._load_failed = self.model is None
+        return self.model
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self._get_model() is not None
+
+    def rerank(self,
+               query: str,
+               documents: List[Dict[str, Any]],
+               top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        n = top_n or self.top_n
+        model = self._get_model()
+        if model is None or not documents:
+            return documents[:n]
+
+        # Candidates are scored batch by batch in retrieval order; once the
+        # latency budget is spent the rest keep their retrieval order behind
+        # the scored ones
+        start = time.perf_counter()
+        scores: List[float] = []
+        for i in range(0, len(documents), self.batch_size):
+            if scores and time.perf_counter() - start > self.latency_budget:
+                logger.warning(f"Reranking stopped after {len(scores)} of {len(documents)} candidates "
+                               f"(latency budget {self.latency_budget}s)")
+                break
+            batch = documents[i:i + self.batch_size]
+            logits = model.predict([(query, doc.get("document", "")) for doc in batch],
+                                   batch_size=self.batch_size)
+            scores.extend(float(logit) for logit in logits)
+
+        reranked = []
+        for doc, logit in zip(documents, scores):
+            # Sigmoid maps cross-encoder logits onto 0..1 relevance
+            reranked.append(dict(doc, score=_sigmoid(logit), retrieval_score=doc.get("score")))
+        reranked.sort(key=lambda doc: doc["score"], reverse=True)
+        reranked.extend(dict(doc, score=0.0, retrieval_score=doc.get("score")) for doc in documents[len(scores):])
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {"candidates": len(documents), "scored": len(scores), "seconds": elapsed}
+        logger.info(f"Reranked {len(scores)} candidates in {elapsed * 1000:.0f}ms, keeping {min(n, len(reranked))}")
+        return reranked[:n]
+
+
+reranker = Reranker()
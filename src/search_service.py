@@ -1,5 +1,9 @@
-from typing import Dict, Any, Optional
+import copy
+from typing import Dict, Any, List, Optional, Tuple
+import httpx
 import requests
+from src.cache import SemanticCache, TTLCache
+from src.http_client import http_client
 from src.logger import logger
 from src.config import Config
 
@@ -8,50 +12,134 @@ class SearchService:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or getattr(Config, 'TAVILY_API_KEY', None)
         self.base_url = "https://api.tavily.com/search"
-        self.timeout = 10
+        self.http = http_client
+        
+        self.cache = TTLCache(max_size=Config.SEARCH_CACHE_SIZE, ttl=Config.SEARCH_CACHE_TTL)
+        # Near-duplicate lookup needs the caller to pass the query embedding
+        self.semantic_cache = (SemanticCache(max_size=Config.SEARCH_CACHE_SIZE,
+                                             ttl=Config.SEARCH_CACHE_TTL,
+                                             threshold=Config.SEARCH_SEMANTIC_THRESHOLD)
+                               if Config.SEARCH_SEMANTIC_CACHE else None)
         
         if not self.api_key:
             logger.warning("Tavily API key not configured. Search will be disabled.")
     
-    def search(self, query: str, max_results: int = 5) -> Dict[str, Any]:
+    def _build_payload(self, query: str, max_results: int) -> Dict[str, Any]:
+        return {
+            "api_key": self.api_key,
+            "query": query,
+            "max_results": max_results,
+            "include_answer": True
+        }
+    
+    def _format_results(self, query: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        formatted_results = {
+            "query": query,
+            "answer": data.get("answer", ""),
+            "results": []
+        }
+        
+        for result in data.get("results", []):
+            formatted_results["results"].append({
+                "title": result.get("title", ""),
+                "content": result.get("content", ""),
+                "url": result.get("url", "")
+            })
+        
+        return formatted_results
+    
+    def _cache_key(self, query: str, max_results: int) -> Tuple[str, int]:
+        return " ".join(query.lower().split()), max_results
+    
+    def _get_cached(self,
+                    query: str,
+                    max_results: int,
+                    query_embedding: Optional[List[float]]) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(self._cache_key(query, max_results))
+        if cached is not None:
+            logger.info(f"Serving cached search results for: {query}")
+            return copy.deepcopy(cached)
+        
+        if self.semantic_cache is not None and query_embedding is not None:
+            cached, similarity = self.semantic_cache.get_match(query_embedding, tag=max_results)
+            if cached is not None:
+                logger.info(f"Serving search results for '{cached['query']}' to similar query "
+                            f"'{query}' (similarity {similarity:.3f})")
+                return copy.deepcopy(cached)
+        return None
+    
+    def _store(self,
+               query: str,
+               max_results: int,
+               query_embedding: Optional[List[float]],
+               results: Dict[str, Any]):
+        self.cache.set(self._cache_key(query, max_results), copy.deepcopy(results))
+        if self.semantic_cache is not None and query_embedding is not None:
+            self.semantic_cache.set(query_embedding, copy.deepcopy(results), tag=max_results)
+    
+    def search(self,
+               query: str,
+               max_results: int = 5,
+               query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        if not self.api_key:
+            raise ValueError("Tavily API key not configured")
+        
+        cached = self._get_cached(query, max_results, query_embedding)
+        if cached is not None:
+            return cached
+        
+        formatted_results = self._search(query, max_results)
+        self._store(query, max_results, query_embedding, formatted_results)
+        return formatted_results
+    
+    async def asearch(self,
+                      query: str,
+                      max_results: int = 5,
+                      query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         if not self.api_key:
             raise ValueError("Tavily API key not configured")
         
+        cached = self._get_cached(query, max_results, query_embedding)
+        if cached is not None:
+            return cached
+        
+        formatted_results = await self._asearch(query, max_results)
+        self._store(query, max_results, query_embedding, formatted_results)
+        return formatted_results
+    
+    def _search(self, query: str, max_results: int) -> Dict[str, Any]:
         try:
-            payload = {
-                "api_key": self.api_key,
-                "query": query,
-                "max_results": max_results,
-                "include_answer": True
-            }
-            
             logger.info(f"Searching for: {query}")
-            response = requests.post(
+            response = self.http.post(
                 self.base_url,
-                json=payload,
-                timeout=self.timeout
+                json=self._build_payload(query, max_results)
             )
             
             response.raise_for_status()
-            data = response.json()
+            formatted_results = self._format_results(query, response.json())
             
-            formatted_results = {
-                "query": query,
-                "answer": data.get("answer", ""),
-                "results": []
-            }
+            logger.info(f"Search returned {len(formatted_results['results'])} results")
+            return formatted_results
             
-            for result in data.get("results", []):
-                formatted_results["results"].append({
-                    "title": result.get("title", ""),
-                    "content": result.get("content", ""),
-                    "url": result.get("url", "")
-                })
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error during search: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during search: {e}")
+            raise
+    
+    async def _asearch(self, query: str, max_results: int) -> Dict[str, Any]:
+        try:
+            logger.info(f"Searching for: {query}")
+            response = await self.http.apost(self.base_url, json=self._build_payload(query, max_results))
+            response.raise_for_status()
+            
+            formatted_results = self._format_results(query, response.json())
             
             logger.info(f"Search returned {len(formatted_results['results'])} results")
             return formatted_results
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error during search: {e}")
             raise
         except Exception as e:
@@ -1,28 +1,72 @@
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterator, Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (Distance, VectorParams, PointStruct, PointIdsList,
+                                  SetPayload, SetPayloadOperation)
+from src.hashing import point_id as make_point_id, sha256_text
+from src.http_client import close_at_loop_shutdown
 from src.logger import logger
 from src.config import Config
 
 
+VECTOR_BACKENDS = ("server", "local", "memory")
+
+
 class VectorStore:
     def __init__(self, 
                  url: Optional[str] = None,
                  collection_name: Optional[str] = None,
-                 vector_size: int = 384):
+                 vector_size: int = 384,
+                 upsert_batch_size: Optional[int] = None,
+                 upsert_workers: Optional[int] = None,
+                 upsert_max_retries: Optional[int] = None,
+                 backend: Optional[str] = None,
+                 path: Optional[str] = None):
+        
+        self.backend = (backend or Config.VECTOR_BACKEND).lower()
+        if self.backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend '{self.backend}', expected one of {', '.join(VECTOR_BACKENDS)}")
         
         self.url = url or Config.QDRANT_URL
+        self.path = path or Config.QDRANT_PATH
         self.collection_name = collection_name or Config.QDRANT_COLLECTION
         self.vector_size = vector_size
+        self.upsert_batch_size = upsert_batch_size or Config.UPSERT_BATCH_SIZE
+        # In-process backends gain nothing from concurrent upserts
+        self.upsert_workers = (upsert_workers or Config.UPSERT_WORKERS) if self.backend == "server" else 1
+        self.upsert_max_retries = (upsert_max_retries if upsert_max_retries is not None
+                                   else Config.UPSERT_MAX_RETRIES)
+        self.stats_ttl = Config.STATS_CACHE_TTL
+        self.write_generation = 0
+        self._stats_snapshot: Optional[Dict[str, Any]] = None
+        self._stats_fetched_at = 0.0
+        self._stats_lock = threading.Lock()
+        
+        # One async client per event loop, dropped with the loop
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
         
         try:
-            self.client = QdrantClient(url=self.url)
-            logger.info(f"Connected to Qdrant at {self.url}")
+            self.client = self._create_client()
         except Exception as e:
             logger.error(f"Failed to connect to Qdrant: {e}")
             raise
-        
-        self.id_counter = 0
+    
+    def _create_client(self) -> QdrantClient:
+        if self.backend == "local":
+            client = QdrantClient(path=self.path)
+            logger.info(f"Using embedded Qdrant storage at {self.path}")
+        elif self.backend == "memory":
+            client = QdrantClient(location=":memory:")
+            logger.info("Using in-memory Qdrant storage")
+        else:
+            client = QdrantClient(url=self.url)
+            logger.info(f"Connected to Qdrant at {self.url}")
+        return client
     
     def create_collection(self, 
                          force_recreate: bool = False) -> bool:
@@ -46,6 +90,7 @@ class VectorStore:
                 )
             )
             
+            self._invalidate_stats()
             logger.info(f"Created collection: {self.collection_name}")
             return True
             
@@ -56,20 +101,28 @@ class VectorStore:
     def add_embeddings(self,
                       embeddings: List[List[float]],
                       documents: List[Dict[str, Any]],
-                      metadata: Optional[List[Dict[str, Any]]] = None) -> bool:
+                      metadata: Optional[List[Dict[str, Any]]] = None,
+                      ids: Optional[List[Any]] = None) -> bool:
 
         try:
             if len(embeddings) != len(documents):
                 raise ValueError("Number of embeddings must match number of documents")
             
+            if ids is not None and len(ids) != len(documents):
+                raise ValueError("Number of ids must match number of documents")
+            
             points = []
             for i, (embedding, document) in enumerate(zip(embeddings, documents)):
-                point_id = self.id_counter + i
+                content_hash = document.get("content_hash") or sha256_text(document.get("content", ""))
+                point_id = ids[i] if ids is not None else make_point_id(document.get("source", ""), content_hash)
                 payload = {
                     "document": document.get("content", ""),
                     "source": document.get("source", ""),
                     "chunk_id": document.get("chunk_id", i),
+                    "content_hash": content_hash,
                 }
+                payload.update({k: v for k, v in document.get("metadata", {}).items()
+                                if k not in payload})
                 
                 if metadata and i < len(metadata):
                     payload.update(metadata[i])
@@ -81,12 +134,11 @@ class VectorStore:
                 )
                 points.append(point)
             
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
+            try:
+                self._upsert_in_batches(points)
+            finally:
+                self._invalidate_stats()
             
-            self.id_counter += len(embeddings)
             logger.info(f"Added {len(embeddings)} embeddings to vector store")
             return True
             
@@ -94,6 +146,126 @@ class VectorStore:
             logger.error(f"Error adding embeddings: {e}")
             raise
     
+    def _upsert_in_batches(self, points: List[PointStruct]):
+        batches = [points[i:i + self.upsert_batch_size]
+                   for i in range(0, len(points), self.upsert_batch_size)]
+        pending = list(range(len(batches)))
+        last_error: Optional[Exception] = None
+        
+        for attempt in range(self.upsert_max_retries + 1):
+            if attempt:
+                delay = 0.5 * 2 ** (attempt - 1)
+                logger.warning(f"Retrying {len(pending)} failed upsert batches in {delay:.1f}s "
+                               f"(attempt {attempt}/{self.upsert_max_retries})")
+                time.sleep(delay)
+            
+            failed = []
+            with ThreadPoolExecutor(max_workers=max(1, min(self.upsert_workers, len(pending)))) as executor:
+                futures = {
+                    executor.submit(self.client.upsert,
+                                    collection_name=self.collection_name,
+                                    points=batches[index]): index
+                    for index in pending
+                }
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        failed.append(futures[future])
+                        last_error = e
+            
+            if not failed:
+                return
+            pending = sorted(failed)
+        
+        raise RuntimeError(f"Failed to upsert {len(pending)} of {len(batches)} batches: {last_error}")
+    
+    def update_positions(self, documents: List[Dict[str, Any]]) -> bool:
+        # Chunks reused by a re-ingested file keep their point, but their chunk
+        # index and pages may have moved in the new version of the file
+        try:
+            if not documents:
+                return True
+            
+            operations = []
+            for document in documents:
+                payload = {"chunk_id": document.get("chunk_id")}
+                payload.update({k: v for k, v in document.get("metadata", {}).items()
+                                if k not in ("document", "source", "chunk_id", "content_hash")})
+                operations.append(SetPayloadOperation(
+                    set_payload=SetPayload(payload=payload, points=[document["point_id"]])
+                ))
+            
+            for i in range(0, len(operations), self.upsert_batch_size):
+                self.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=operations[i:i + self.upsert_batch_size]
+                )
+            
+            logger.info(f"Updated positions of {len(documents)} reused points")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating point positions: {e}")
+            raise
+    
+    def delete_points(self, ids: List[Any]) -> bool:
+        try:
+            if not ids:
+                return True
+            
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(ids))
+            )
+            self._invalidate_stats()
+            
+            logger.info(f"Deleted {len(ids)} points from vector store")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error deleting points: {e}")
+            raise
+    
+    def scroll_documents(self, batch_size: int = 256) -> Iterator[Dict[str, Any]]:
+        # Walks every stored chunk in the ingestion document shape, e.g. to
+        # rebuild indexes that sit next to the collection
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for point in points:
+                yield {
+                    "point_id": point.id,
+                    "content": point.payload.get("document", ""),
+                    "source": point.payload.get("source", ""),
+                    "chunk_id": point.payload.get("chunk_id"),
+                    "metadata": {k: v for k, v in point.payload.items()
+                                 if k not in ["document", "source", "chunk_id"]}
+                }
+            if offset is None:
+                return
+    
+    def _format_points(self, points) -> List[Dict[str, Any]]:
+        documents = []
+        for result in points:
+            doc = {
+                "id": result.id,
+                "score": result.score,
+                "document": result.payload.get("document", ""),
+                "source": result.payload.get("source", ""),
+                "chunk_id": result.payload.get("chunk_id"),
+                "metadata": {k: v for k, v in result.payload.items() 
+                           if k not in ["document", "source", "chunk_id"]}
+            }
+            documents.append(doc)
+        return documents
+    
     def search(self,
                query_embedding: List[float],
                top_k: int = 5,
@@ -107,18 +279,51 @@ class VectorStore:
                 score_threshold=score_threshold
             )
             
-            documents = []
-            for result in results.points:
-                doc = {
-                    "id": result.id,
-                    "score": result.score,
-                    "document": result.payload.get("document", ""),
-                    "source": result.payload.get("source", ""),
-                    "chunk_id": result.payload.get("chunk_id"),
-                    "metadata": {k: v for k, v in result.payload.items() 
-                               if k not in ["document", "source", "chunk_id"]}
-                }
-                documents.append(doc)
+            documents = self._format_points(results.points)
+            
+            logger.info(f"Search returned {len(documents)} results")
+            return documents
+            
+        except Exception as e:
+            logger.error(f"Error searching embeddings: {e}")
+            raise
+    
+    def _get_async_client(self) -> AsyncQdrantClient:
+        # The async client's connection pool belongs to the event loop it was created on
+        # and is closed when asyncio.run() shuts that loop down
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = AsyncQdrantClient(url=self.url)
+                entry = (client, close_at_loop_shutdown(client.close))
+                self._async_clients[loop] = entry
+        return entry[0]
+    
+    async def aclose(self):
+        # For loops not run by asyncio.run(): closes this loop's client before the loop goes away
+        with self._async_clients_lock:
+            entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+    
+    async def asearch(self,
+                      query_embedding: List[float],
+                      top_k: int = 5,
+                      score_threshold: float = 0.0) -> List[Dict[str, Any]]:
+        if self.backend != "server":
+            # Embedded storage is owned by the sync client and has no network wait to overlap
+            return await asyncio.to_thread(self.search, query_embedding, top_k, score_threshold)
+        
+        try:
+            results = await self._get_async_client().query_points(
+                collection_name=self.collection_name,
+                query=query_embedding,
+                limit=top_k,
+                score_threshold=score_threshold
+            )
+            
+            documents = self._format_points(results.points)
             
             logger.info(f"Search returned {len(documents)} results")
             return documents
@@ -140,5 +345,33 @@ class VectorStore:
             logger.error(f"Error getting stats: {e}")
             raise
 
+    
+    def _invalidate_stats(self):
+        with self._stats_lock:
+            self._stats_snapshot = None
+            self.write_generation += 1
+    
+    def get_cached_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            snapshot = self._stats_snapshot
+            if snapshot is not None and time.monotonic() - self._stats_fetched_at <= self.stats_ttl:
+                return snapshot
+        
+        try:
+            snapshot = self.get_stats()
+        except Exception:
+            # Remember the failure for one TTL instead of retrying on every request
+            snapshot = {
+                "collection_name": self.collection_name,
+                "vector_count": 0,
+                "vector_size": self.vector_size,
+                "status": "unavailable"
+            }
+        
+        with self._stats_lock:
+            self._stats_snapshot = snapshot
+            self._stats_fetched_at = time.monotonic()
+        return snapshot
+
 
 vector_store = VectorStore()
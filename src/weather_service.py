@@ -1,5 +1,9 @@
+import threading
+import httpx
 import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+from src.cache import AsyncSingleFlight, SingleFlight, TTLCache
+from src.http_client import http_client
 from src.logger import logger
 from src.config import Config
 
@@ -8,42 +12,111 @@ class WeatherService:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or Config.OPENWEATHER_API_KEY
         self.base_url = "https://api.openweathermap.org/data/2.5/weather"
-        self.timeout = 10
+        self.http = http_client
+        
+        # Entries are served fresh for cache_ttl seconds, then served stale
+        # for up to stale_ttl more while a background refresh runs
+        self.cache_ttl = Config.WEATHER_CACHE_TTL
+        self.stale_ttl = Config.WEATHER_STALE_TTL
+        self.cache = TTLCache(max_size=Config.WEATHER_CACHE_SIZE, ttl=self.cache_ttl + self.stale_ttl)
+        self._single_flight = SingleFlight()
+        self._async_single_flight = AsyncSingleFlight()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+    
+    def _cache_key(self, city: str, units: str) -> Tuple[str, str]:
+        return " ".join(city.lower().split()), units.lower()
+    
+    def _build_params(self, city: str, units: str) -> Dict[str, Any]:
+        return {
+            "q": city,
+            "appid": self.api_key,
+            "units": units
+        }
+    
+    def _format_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "city": data.get("name"),
+            "country": data.get("sys", {}).get("country"),
+            "temperature": data.get("main", {}).get("temp"),
+            "feels_like": data.get("main", {}).get("feels_like"),
+            "humidity": data.get("main", {}).get("humidity"),
+            "pressure": data.get("main", {}).get("pressure"),
+            "wind_speed": data.get("wind", {}).get("speed"),
+            "wind_direction": data.get("wind", {}).get("deg"),
+            "cloudiness": data.get("clouds", {}).get("all"),
+            "description": data.get("weather", [{}])[0].get("description"),
+            "main_weather": data.get("weather", [{}])[0].get("main"),
+            "visibility": data.get("visibility"),
+            "sunrise": data.get("sys", {}).get("sunrise"),
+            "sunset": data.get("sys", {}).get("sunset"),
+        }
     
     def get_weather(self, city: str, units: str = "metric") -> Dict[str, Any]:
+        key = self._cache_key(city, units)
+        cached = self._get_cached(key, city, units)
+        if cached is not None:
+            return cached
+        return dict(self._single_flight.do(key, lambda: self._fetch_and_store(key, city, units)))
+    
+    async def aget_weather(self, city: str, units: str = "metric") -> Dict[str, Any]:
+        key = self._cache_key(city, units)
+        cached = self._get_cached(key, city, units)
+        if cached is not None:
+            return cached
+        return dict(await self._async_single_flight.do(key, lambda: self._afetch_and_store(key, city, units)))
+    
+    def _get_cached(self, key: Tuple[str, str], city: str, units: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache.get_entry(key)
+        if entry is None:
+            return None
+        
+        data, age = entry
+        if age > self.cache_ttl:
+            logger.info(f"Serving stale weather for {city} ({age:.0f}s old) while refreshing")
+            self._refresh_in_background(key, city, units)
+        else:
+            logger.info(f"Serving cached weather for {city}")
+        return dict(data)
+    
+    def _refresh_in_background(self, key: Tuple[str, str], city: str, units: str):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self._single_flight.do(key, lambda: self._fetch_and_store(key, city, units))
+            except Exception as e:
+                logger.warning(f"Background weather refresh failed for {city}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+        
+        # A thread rather than a task so the refresh outlives short-lived event loops
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _fetch_and_store(self, key: Tuple[str, str], city: str, units: str) -> Dict[str, Any]:
+        data = self._fetch_weather(city, units)
+        self.cache.set(key, data)
+        return data
+    
+    async def _afetch_and_store(self, key: Tuple[str, str], city: str, units: str) -> Dict[str, Any]:
+        data = await self._afetch_weather(city, units)
+        self.cache.set(key, data)
+        return data
+    
+    def _fetch_weather(self, city: str, units: str = "metric") -> Dict[str, Any]:
         try:
-            params = {
-                "q": city,
-                "appid": self.api_key,
-                "units": units
-            }
-            
             logger.info(f"Fetching weather for city: {city}")
-            response = requests.get(
+            response = self.http.get(
                 self.base_url,
-                params=params,
-                timeout=self.timeout
+                params=self._build_params(city, units)
             )
             response.raise_for_status()
             
-            data = response.json()
-            
-            formatted_data = {
-                "city": data.get("name"),
-                "country": data.get("sys", {}).get("country"),
-                "temperature": data.get("main", {}).get("temp"),
-                "feels_like": data.get("main", {}).get("feels_like"),
-                "humidity": data.get("main", {}).get("humidity"),
-                "pressure": data.get("main", {}).get("pressure"),
-                "wind_speed": data.get("wind", {}).get("speed"),
-                "wind_direction": data.get("wind", {}).get("deg"),
-                "cloudiness": data.get("clouds", {}).get("all"),
-                "description": data.get("weather", [{}])[0].get("description"),
-                "main_weather": data.get("weather", [{}])[0].get("main"),
-                "visibility": data.get("visibility"),
-                "sunrise": data.get("sys", {}).get("sunrise"),
-                "sunset": data.get("sys", {}).get("sunset"),
-            }
+            formatted_data = self._format_response(response.json())
             
             logger.info(f"Successfully fetched weather for {city}")
             return formatted_data
@@ -61,6 +134,30 @@ class WeatherService:
             logger.error(f"Unexpected error fetching weather: {e}")
             raise
     
+    async def _afetch_weather(self, city: str, units: str = "metric") -> Dict[str, Any]:
+        try:
+            logger.info(f"Fetching weather for city: {city}")
+            response = await self.http.aget(self.base_url, params=self._build_params(city, units))
+            response.raise_for_status()
+            
+            formatted_data = self._format_response(response.json())
+            
+            logger.info(f"Successfully fetched weather for {city}")
+            return formatted_data
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                logger.error(f"City not found: {city}")
+                raise ValueError(f"City '{city}' not found")
+            logger.error(f"HTTP error occurred: {e}")
+            raise
+        except httpx.RequestError as e:
+            logger.error(f"Request error: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error fetching weather: {e}")
+            raise
+    
     def format_weather_text(self, weather_data: Dict[str, Any]) -> str:
         text = f"""Weather for {weather_data['city']}, {weather_data['country']}:
 - Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
@@ -74,7 +171,8 @@ class WeatherService:
     
     def validate_api_key(self) -> bool:
         try:
-            self.get_weather("London")
+            # Goes to the API directly so a cached answer cannot hide a bad key
+            self._fetch_weather("London")
             logger.info("OpenWeatherMap API key is valid")
             return True
         except Exception as e:
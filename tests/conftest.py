@@ -1,6 +1,10 @@
 import pytest
 import os
 from pathlib import Path
+
+# Tests count tokens with the regex estimate instead of downloading the embedding model's tokenizer
+os.environ.setdefault("CHUNK_TOKENIZER", "")
+
 from src.config import Config
 
 
@@ -1,17 +1,24 @@
+import asyncio
+import threading
+import time
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langsmith import tracing_context
 from src.agent import AIAgent
+from src.cache import SemanticCache
 
 
 class TestAIAgent(unittest.TestCase):
     def setUp(self):
         with patch('src.agent.ChatGroq'):
-            with patch('src.agent.HuggingFaceEmbeddings'):
+            with patch('src.agent.embedding_registry'):
                 self.agent = AIAgent()
     
     def test_agent_initialization(self):
         with patch('src.agent.ChatGroq'):
-            with patch('src.agent.HuggingFaceEmbeddings'):
+            with patch('src.agent.embedding_registry'):
                 agent = AIAgent()
         
         self.assertIsNotNone(agent.llm)
@@ -33,7 +40,7 @@ class TestAIAgent(unittest.TestCase):
     
     def test_classify_pdf_query(self):
         with patch('src.agent.vector_store') as mock_store:
-            mock_store.get_stats.return_value = {"vector_count": 5}
+            mock_store.get_cached_stats.return_value = {"vector_count": 5}
             
             state = {
                 "query": "What are the main topics in the document?",
@@ -49,6 +56,25 @@ class TestAIAgent(unittest.TestCase):
             
             self.assertEqual(result["query_type"], "pdf")
     
+    def test_classify_ignores_keywords_inside_words(self):
+        with patch('src.agent.vector_store') as mock_store:
+            mock_store.get_cached_stats.return_value = {"vector_count": 5}
+            
+            state = {
+                "query": "Describe the photo of the scaffold in the document",
+                "query_type": "",
+                "weather_data": None,
+                "context": "",
+                "response": "",
+                "messages": [],
+                "metadata": {}
+            }
+            
+            result = self.agent._classify_query(state)
+            
+            self.assertEqual(result["query_type"], "pdf")
+            self.assertEqual(result["metadata"]["route_candidates"], ["pdf"])
+    
     @patch('src.agent.weather_service')
     def test_fetch_weather(self, mock_weather):
         mock_weather.get_weather.return_value = {
@@ -72,6 +98,23 @@ class TestAIAgent(unittest.TestCase):
         
         self.assertIsNotNone(result.get("weather_data"))
         self.assertIn("Weather", result["context"])
+        mock_weather.get_weather.assert_called_once_with("London")
+        self.agent.llm.invoke.assert_not_called()
+    
+    @patch('src.agent.weather_service')
+    def test_fetch_weather_llm_fallback(self, mock_weather):
+        mock_weather.get_weather.return_value = {"city": "Springfield", "temperature": 10}
+        mock_weather.format_weather_text.return_value = "Weather: 10°C"
+        self.agent.llm = MagicMock()
+        self.agent.llm.invoke.return_value = MagicMock(content="Springfield")
+        
+        state = self.agent._initial_state({"query": "Is it raining in Springfield?"})
+        state["query_type"] = "weather"
+        
+        self.agent._fetch_weather(state)
+        
+        self.agent.llm.invoke.assert_called_once()
+        mock_weather.get_weather.assert_called_once_with("Springfield")
     
     def test_fetch_pdf_context_no_embeddings(self):
         self.agent.embeddings = None
@@ -123,7 +166,7 @@ class TestAIAgent(unittest.TestCase):
         mock_llm.invoke.return_value = mock_response
         mock_llm_class.return_value = mock_llm
         
-        with patch('src.agent.HuggingFaceEmbeddings'):
+        with patch('src.agent.embedding_registry'):
             agent = AIAgent()
         agent.llm = mock_llm
         
@@ -150,7 +193,7 @@ class TestAIAgent(unittest.TestCase):
         mock_llm.invoke.return_value = mock_response
         mock_llm_class.return_value = mock_llm
         
-        with patch('src.agent.HuggingFaceEmbeddings'):
+        with patch('src.agent.embedding_registry'):
             with patch('src.agent.weather_service') as mock_weather:
                 agent = AIAgent()
                 
@@ -166,6 +209,260 @@ class TestAIAgent(unittest.TestCase):
                 self.assertEqual(result["query_type"], "weather")
                 self.assertIsNotNone(result["response"])
 
+    def _fake_llm(self):
+        return GenericFakeChatModel(messages=iter([AIMessage(content="Clear skies today")]))
+    
+    @patch('src.agent.weather_service')
+    def test_stream_weather_query(self, mock_weather):
+        mock_weather.get_weather.return_value = {"city": "London", "temperature": 20}
+        mock_weather.format_weather_text.return_value = "Weather: 20°C"
+        self.agent.llm = self._fake_llm()
+        
+        events = list(self.agent.stream({"query": "Weather in London?"}))
+        
+        tokens = [event["content"] for event in events if event["type"] == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens), "Clear skies today")
+        self.assertEqual(events[-1]["type"], "final")
+        self.assertEqual(events[-1]["state"]["response"], "Clear skies today")
+        mock_weather.get_weather.assert_called_once_with("London")
+    
+    @patch('src.agent.weather_service')
+    def test_stream_is_traced_as_one_run(self, mock_weather):
+        mock_weather.get_weather.return_value = {"city": "London", "temperature": 20}
+        mock_weather.format_weather_text.return_value = "Weather: 20°C"
+        self.agent.llm = self._fake_llm()
+        client = MagicMock()
+        
+        with tracing_context(enabled=True, client=client):
+            list(self.agent.stream({"query": "Weather in London?"}))
+        
+        created = {call.kwargs["name"]: call.kwargs for call in client.create_run.call_args_list}
+        updated = {call.kwargs["name"]: call.kwargs for call in client.update_run.call_args_list}
+        self.assertEqual(created["LangGraph"]["parent_run_id"], created["stream"]["id"])
+        self.assertEqual(updated["stream"]["outputs"]["response"], "Clear skies today")
+    
+    def _enable_response_cache(self):
+        self.agent.response_cache = SemanticCache(max_size=8, threshold=0.95)
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.side_effect = (
+            lambda text: [1.0, 0.0] if "transformer" in text.lower() else [0.0, 1.0])
+    
+    @patch('src.agent.search_service')
+    @patch('src.agent.vector_store')
+    def test_response_cache_serves_paraphrased_query(self, mock_store, mock_search):
+        mock_store.get_cached_stats.return_value = {"vector_count": 0}
+        mock_search.search.return_value = {"query": "q", "answer": "", "results": []}
+        mock_search.format_search_context.return_value = "Search context"
+        self._enable_response_cache()
+        self.agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="Attention is all you need")]))
+        
+        first = self.agent.invoke({"query": "What is a transformer?"})
+        second = self.agent.invoke({"query": "what is a Transformer model?"})
+        events = list(self.agent.stream({"query": "Explain the transformer"}))
+        
+        self.assertEqual(first["response"], "Attention is all you need")
+        self.assertNotIn("response_cache_hit", first["metadata"])
+        self.assertEqual(second["response"], "Attention is all you need")
+        self.assertTrue(second["metadata"]["response_cache_hit"])
+        self.assertEqual(mock_search.search.call_count, 1)
+        self.assertEqual(events[0], {"type": "token", "content": "Attention is all you need"})
+    
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.vector_store')
+    def test_response_cache_is_invalidated_by_collection_changes(self, mock_store, mock_retriever):
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_store.write_generation = 1
+        mock_retriever.get_context_for_query.return_value = {"context": "Paper context", "num_documents": 1}
+        self._enable_response_cache()
+        self.agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="First answer"),
+                                                            AIMessage(content="Second answer")]))
+        
+        self.agent.invoke({"query": "What does the transformer paper propose?"})
+        mock_store.write_generation = 2
+        result = self.agent.invoke({"query": "What does the transformer paper propose?"})
+        
+        self.assertEqual(result["response"], "Second answer")
+        self.assertEqual(mock_retriever.get_context_for_query.call_count, 2)
+    
+    @patch('src.agent.ingest_manifest')
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.vector_store')
+    def test_response_cache_is_invalidated_by_other_processes(self, mock_store, mock_retriever, mock_manifest):
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_store.write_generation = 1
+        mock_manifest.version.return_value = (1, 10, 100)
+        mock_retriever.get_context_for_query.return_value = {"context": "Paper context", "num_documents": 1}
+        self._enable_response_cache()
+        self.agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="First answer"),
+                                                            AIMessage(content="Second answer")]))
+        
+        self.agent.invoke({"query": "What does the transformer paper propose?"})
+        # e.g. the bulk CLI saved the manifest; this process wrote nothing
+        mock_manifest.version.return_value = (2, 20, 101)
+        result = self.agent.invoke({"query": "What does the transformer paper propose?"})
+        
+        self.assertEqual(result["response"], "Second answer")
+        self.assertEqual(mock_retriever.get_context_for_query.call_count, 2)
+    
+    @patch('src.agent.weather_service')
+    def test_response_cache_skips_weather(self, mock_weather):
+        mock_weather.get_weather.return_value = {"city": "London", "temperature": 20}
+        mock_weather.format_weather_text.return_value = "Weather: 20°C"
+        self._enable_response_cache()
+        self.agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="Sunny"), AIMessage(content="Rainy")]))
+        
+        self.agent.invoke({"query": "Weather in London?"})
+        result = self.agent.invoke({"query": "Weather in London?"})
+        
+        self.assertEqual(result["response"], "Rainy")
+        self.assertEqual(len(self.agent.response_cache), 0)
+
+    
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.weather_service')
+    @patch('src.agent.vector_store')
+    def test_fanout_merges_ambiguous_query_sources(self, mock_store, mock_weather, mock_retriever):
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_weather.get_weather.return_value = {"city": "London", "temperature": 20}
+        mock_weather.format_weather_text.return_value = "Weather: 20°C"
+        mock_retriever.get_context_for_query.return_value = {"context": "Paper context", "num_documents": 2}
+        self.agent.fanout = True
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.return_value = [0.1, 0.2]
+        self.agent.llm = MagicMock()
+        self.agent.llm.invoke.return_value = MagicMock(content="London")
+        
+        result = self.agent.invoke({"query": "How cold is it in London?"})
+        
+        self.assertEqual(result["metadata"]["fanout"], {"weather": "ok", "pdf": "ok"})
+        self.assertEqual(result["metadata"]["fanout_sources"], ["weather", "pdf"])
+        self.assertIn("[Weather data]\nWeather: 20°C", result["context"])
+        self.assertIn("[Document excerpts]\nPaper context", result["context"])
+        self.assertEqual(result["weather_data"]["city"], "London")
+        self.assertEqual(result["metadata"]["retrieved_documents"], 2)
+    
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.weather_service')
+    @patch('src.agent.vector_store')
+    def test_fanout_drops_branches_past_deadline(self, mock_store, mock_weather, mock_retriever):
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_weather.get_weather.side_effect = lambda city: time.sleep(1) or {"city": city}
+        mock_retriever.get_context_for_query.return_value = {"context": "Paper context", "num_documents": 1}
+        self.agent.fanout = True
+        self.agent.branch_deadline = 0.1
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.return_value = [0.1, 0.2]
+        self.agent.llm = MagicMock()
+        self.agent.llm.invoke.return_value = MagicMock(content="Answer")
+        
+        start = time.perf_counter()
+        result = self.agent.invoke({"query": "What temperature in London does the paper report?"})
+        
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertEqual(result["metadata"]["fanout"], {"weather": "timeout", "pdf": "ok"})
+        self.assertEqual(result["query_type"], "pdf")
+        self.assertEqual(result["context"], "[Document excerpts]\nPaper context")
+    
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.weather_service')
+    @patch('src.agent.vector_store')
+    def test_stuck_branches_do_not_starve_later_fanouts(self, mock_store, mock_weather, mock_retriever):
+        release = threading.Event()
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_weather.get_weather.side_effect = lambda city: release.wait(5) and {"city": city}
+        mock_retriever.get_context_for_query.return_value = {"context": "Paper context", "num_documents": 1}
+        self.agent.fanout = True
+        self.agent.branch_deadline = 0.1
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.return_value = [0.1, 0.2]
+        self.agent.llm = MagicMock()
+        self.agent.llm.invoke.return_value = MagicMock(content="Answer")
+        
+        try:
+            results = [self.agent.invoke({"query": "What temperature in London does the paper report?"})
+                       for _ in range(8)]
+        finally:
+            release.set()
+        
+        for result in results:
+            self.assertEqual(result["metadata"]["fanout"], {"weather": "timeout", "pdf": "ok"})
+
+
+class TestAIAgentAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with patch('src.agent.ChatGroq'):
+            with patch('src.agent.embedding_registry'):
+                self.agent = AIAgent()
+        self.agent.llm = MagicMock()
+        self.agent.llm.ainvoke = AsyncMock(return_value=MagicMock(content="Clear skies today"))
+    
+    async def test_ainvoke_weather_query(self):
+        with patch('src.agent.weather_service') as mock_weather:
+            mock_weather.aget_weather = AsyncMock(return_value={"city": "London", "temperature": 20})
+            mock_weather.format_weather_text.return_value = "Weather: 20°C"
+            
+            result = await self.agent.ainvoke({"query": "Weather in London?"})
+        
+        self.assertEqual(result["query_type"], "weather")
+        self.assertEqual(result["response"], "Clear skies today")
+        mock_weather.aget_weather.assert_awaited_once_with("London")
+        self.agent.llm.invoke.assert_not_called()
+    
+    @patch('src.agent.rag_retriever')
+    async def test_afetch_pdf_context(self, mock_retriever):
+        mock_retriever.aget_context_for_query = AsyncMock(return_value={
+            "context": "Retrieved context",
+            "num_documents": 2
+        })
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.return_value = [0.1, 0.2]
+        
+        state = self.agent._initial_state({"query": "What is in the document?"})
+        state["query_type"] = "pdf"
+        
+        result = await self.agent._afetch_pdf_context(state)
+        
+        self.assertEqual(result["context"], "Retrieved context")
+        self.assertEqual(result["metadata"]["retrieved_documents"], 2)
+        mock_retriever.get_context_for_query.assert_not_called()
+    
+    async def test_astream_weather_query(self):
+        self.agent.llm = GenericFakeChatModel(messages=iter([AIMessage(content="Clear skies today")]))
+        
+        with patch('src.agent.weather_service') as mock_weather:
+            mock_weather.aget_weather = AsyncMock(return_value={"city": "London", "temperature": 20})
+            mock_weather.format_weather_text.return_value = "Weather: 20°C"
+            
+            events = [event async for event in self.agent.astream({"query": "Weather in London?"})]
+        
+        tokens = [event["content"] for event in events if event["type"] == "token"]
+        self.assertEqual("".join(tokens), "Clear skies today")
+        self.assertEqual(events[-1]["state"]["query_type"], "weather")
+    
+    @patch('src.agent.rag_retriever')
+    @patch('src.agent.vector_store')
+    async def test_afanout_drops_branches_past_deadline(self, mock_store, mock_retriever):
+        mock_store.get_cached_stats.return_value = {"vector_count": 5}
+        mock_retriever.aget_context_for_query = AsyncMock(return_value={"context": "Paper context",
+                                                                        "num_documents": 1})
+        self.agent.fanout = True
+        self.agent.branch_deadline = 0.1
+        self.agent.embeddings = MagicMock()
+        self.agent.embeddings.embed_query.return_value = [0.1, 0.2]
+        
+        async def slow_weather(city):
+            await asyncio.sleep(1)
+            return {"city": city}
+        
+        with patch('src.agent.weather_service') as mock_weather:
+            mock_weather.aget_weather = slow_weather
+            result = await self.agent.ainvoke({"query": "How warm is London according to the paper?"})
+        
+        self.assertEqual(result["metadata"]["fanout"], {"weather": "timeout", "pdf": "ok"})
+        self.assertEqual(result["context"], "[Document excerpts]\nPaper context")
+        self.assertEqual(result["response"], "Clear skies today")
+
 
 if __name__ == "__main__":
     unittest.main()
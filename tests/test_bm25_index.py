@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.bm25_index import BM25Index, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = BM25Index(path=os.path.join(self.temp_dir, "bm25_index.json.gz"))
+        self.index.add_documents([
+            {"point_id": "a", "content": "The big model reaches BLEU 28.4 on WMT 2014 English-German.",
+             "source": "paper.pdf", "chunk_id": 0, "metadata": {"page_start": 8}},
+            {"point_id": "b", "content": "The base model reaches BLEU 27.3 after training for 12 hours.",
+             "source": "paper.pdf", "chunk_id": 1},
+            {"point_id": "c", "content": "Attention weights are computed with a softmax over scaled dot products.",
+             "source": "paper.pdf", "chunk_id": 2}
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_tokenize_keeps_decimals(self):
+        self.assertEqual(tokenize("BLEU 28.4, v1.2.3!"), ["bleu", "28.4", "v1.2.3"])
+
+    def test_exact_numbers_rank_first(self):
+        results = self.index.search("BLEU 28.4", top_k=2)
+
+        self.assertEqual([doc["id"] for doc in results], ["a", "b"])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertEqual(results[0]["metadata"], {"page_start": 8})
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("convolution"), [])
+
+    def test_remove_and_replace(self):
+        self.index.remove(["a"])
+        self.assertEqual([doc["id"] for doc in self.index.search("28.4")], [])
+
+        self.index.add_documents([{"point_id": "b", "content": "rewritten chunk", "source": "paper.pdf"}])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.search("bleu"), [])
+
+    def test_persistence(self):
+        self.index.save()
+
+        reloaded = BM25Index(path=self.index.path)
+
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.search("softmax")[0]["id"], "c")
+
+    def test_reloads_after_another_process_saves(self):
+        self.index.save()
+        app_copy = BM25Index(path=self.index.path)
+        self.assertEqual(len(app_copy), 3)
+
+        self.index.add_documents([{"point_id": "d", "content": "Dropout rate 0.1", "source": "other.pdf"}])
+        self.index.save()
+
+        # The stale copy keeps answering while the new file is loaded in the background
+        self.assertEqual(app_copy.search("dropout"), [])
+        app_copy._reload_thread.join()
+        self.assertEqual(app_copy.search("dropout")[0]["id"], "d")
+
+    def test_reload_does_not_tokenize_saved_chunks(self):
+        self.index.save()
+
+        with patch("src.bm25_index.tokenize", wraps=tokenize) as tokenize_mock:
+            reloaded = BM25Index(path=self.index.path)
+            self.assertEqual(len(reloaded), 3)
+
+        tokenize_mock.assert_not_called()
+        self.assertEqual(reloaded.search("softmax")[0]["id"], "c")
+
+    def test_save_keeps_chunks_saved_by_another_process(self):
+        self.index.save()
+        app_copy = BM25Index(path=self.index.path)
+        app_copy.remove(["c"])
+
+        # The bulk CLI saves while the app still holds an older copy
+        self.index.add_documents([{"point_id": "d", "content": "Dropout rate 0.1", "source": "other.pdf"}])
+        self.index.save()
+        app_copy.save()
+
+        reloaded = BM25Index(path=self.index.path)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.search("dropout")[0]["id"], "d")
+        self.assertEqual(reloaded.search("softmax"), [])
+
+    def test_reset(self):
+        self.index.reset()
+
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.index.search("bleu"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
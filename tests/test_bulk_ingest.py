@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.bulk_ingest import BulkIngestor, find_pdfs
+from src.ingestion import IngestionPipeline
+from src.ingest_manifest import IngestManifest
+from src.bm25_index import BM25Index
+from src.page_text_cache import PageTextCache
+
+
+PDF_BYTES = (
+    b"%PDF-1.4\n"
+    b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n"
+    b"2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n"
+    b"3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+    b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>\nendobj\n"
+    b"4 0 obj\n<< /Length 44 >>\nstream\nBT /F1 12 Tf 100 700 Td (Test Content) Tj ET\nendstream\nendobj\n"
+    b"5 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n"
+    b"xref\n0 6\n0000000000 65535 f\n0000000009 00000 n\n0000000058 00000 n\n"
+    b"0000000115 00000 n\n0000000229 00000 n\n0000000323 00000 n\n"
+    b"trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n397\n%%EOF\n"
+)
+
+
+class TestBulkIngest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_dir = os.path.join(self.temp_dir, "pdfs")
+        os.makedirs(os.path.join(self.pdf_dir, "nested"))
+        for name in ["a.pdf", "nested/b.pdf", "notes.txt"]:
+            with open(os.path.join(self.pdf_dir, name), 'w') as f:
+                f.write(f"content of {name}")
+
+        self.mock_model = mock_model = MagicMock()
+        mock_model.embed_documents.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
+        self.mock_store = MagicMock()
+        self.mock_store.get_stats.return_value = {"vector_count": 10}
+        self.mock_store.scroll_documents.return_value = []
+        processor = MagicMock()
+        processor.chunk_size = 100
+        processor.chunk_overlap = 20
+        processor.chunk_settings.return_value = {"chunk_size": 100, "chunk_overlap": 20, "chunk_tokenizer": ""}
+        self.pipeline = IngestionPipeline(
+            embeddings_model=mock_model,
+            batch_size=2,
+            processor=processor,
+            store=self.mock_store,
+            manifest=IngestManifest(path=os.path.join(self.temp_dir, "manifest.json")),
+            lexical_index=BM25Index(path=os.path.join(self.temp_dir, "bm25_index.json.gz"))
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def _fake_extract(path, size, overlap, known_hash=None):
+        file_hash = f"hash-{os.path.basename(path)}"
+        if file_hash == known_hash:
+            return file_hash, None
+        return file_hash, [{"content": f"{path} {i}", "source": path, "chunk_id": i} for i in range(3)]
+
+    def test_find_pdfs_walks_subdirectories(self):
+        pdfs = find_pdfs(self.pdf_dir)
+
+        self.assertEqual([os.path.basename(p) for p in pdfs], ["a.pdf", "b.pdf"])
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_run_batches_across_files(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+
+        ingestor = BulkIngestor(pipeline=self.pipeline, workers=1, queue_size=1)
+        stats = ingestor.run(self.pdf_dir)
+
+        self.assertEqual(stats["files"], 2)
+        self.assertEqual(stats["chunks"], 6)
+        self.assertEqual(self.mock_store.add_embeddings.call_count, 3)
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_rerun_skips_unchanged_files(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+        BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+        self.mock_store.add_embeddings.reset_mock()
+
+        stats = BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.assertEqual(stats["unchanged_files"], 2)
+        self.assertEqual(stats["chunks"], 0)
+        self.mock_store.add_embeddings.assert_not_called()
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_rerun_rechunks_files_when_chunk_settings_change(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+        BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.pipeline.processor.chunk_settings.return_value = {"chunk_size": 50, "chunk_overlap": 10,
+                                                               "chunk_tokenizer": ""}
+        stats = BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.assertEqual(stats["unchanged_files"], 0)
+        self.assertEqual(stats["files"], 2)
+        self.assertEqual(mock_extract.call_args[0][3], None)
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_file_is_redone_when_embedding_fails(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+        embed = self.mock_model.embed_documents.side_effect
+        self.mock_model.embed_documents.side_effect = [RuntimeError("model crashed")]
+
+        with self.assertRaises(RuntimeError):
+            BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.mock_model.embed_documents.side_effect = embed
+        stats = BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.assertEqual(stats["unchanged_files"], 0)
+        self.assertEqual(stats["files"], 2)
+        self.assertEqual(stats["chunks"], 6)
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_file_is_redone_when_upsert_fails(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+        self.mock_store.add_embeddings.side_effect = [ConnectionError("qdrant down"), None, None]
+
+        stats = BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+        self.assertEqual(stats["failed_chunks"], 2)
+
+        self.mock_store.add_embeddings.side_effect = None
+        stats = BulkIngestor(pipeline=self.pipeline, workers=1).run(self.pdf_dir)
+
+        self.assertEqual(stats["files"], 1)
+        self.assertEqual(stats["unchanged_files"], 1)
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_manifest_is_saved_in_batches(self, mock_extract):
+        mock_extract.side_effect = self._fake_extract
+
+        with patch.object(self.pipeline.manifest, 'save') as mock_save:
+            BulkIngestor(pipeline=self.pipeline, workers=1, manifest_save_every=50).run(self.pdf_dir)
+
+        mock_save.assert_called_once()
+        self.assertEqual(len(self.pipeline.manifest.files()), 2)
+
+    @patch('src.bulk_ingest.extract_documents')
+    def test_run_skips_failed_files(self, mock_extract):
+        mock_extract.side_effect = [
+            ValueError("PDF file is empty"),
+            ("hash-b", [{"content": "text", "source": "b.pdf", "chunk_id": 0}]),
+        ]
+
+        ingestor = BulkIngestor(pipeline=self.pipeline, workers=1)
+        stats = ingestor.run(self.pdf_dir)
+
+        self.assertEqual(stats["files"], 1)
+        self.assertEqual(stats["failed_files"], 1)
+        self.assertEqual(stats["chunks"], 1)
+
+    def test_real_extraction_accepts_uppercase_extension(self):
+        pdf_dir = os.path.join(self.temp_dir, "real")
+        os.makedirs(pdf_dir)
+        for name in ["Upper.PDF", "lower.pdf"]:
+            with open(os.path.join(pdf_dir, name), 'wb') as f:
+                f.write(PDF_BYTES)
+
+        page_cache = PageTextCache(os.path.join(self.temp_dir, "page_text"), enabled=False)
+        with patch('src.pdf_processor.page_text_cache', page_cache):
+            first = BulkIngestor(pipeline=self.pipeline, workers=1).run(pdf_dir)
+            second = BulkIngestor(pipeline=self.pipeline, workers=1).run(pdf_dir)
+
+        self.assertEqual(first["failed_files"], 0)
+        self.assertEqual(first["files"], 2)
+        self.assertEqual(second["failed_files"], 0)
+        self.assertEqual(second["unchanged_files"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from src.cache import AsyncSingleFlight, SemanticCache, SingleFlight, TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    @patch('src.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(max_size=2, ttl=10)
+        cache.set("a", 1)
+
+        mock_monotonic.return_value = 105.0
+        self.assertEqual(cache.get("a"), 1)
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_followers_share_leader_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=lambda: results.append(flight.do("key", work)))
+                     for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 4)
+        self.assertFalse(flight.in_flight("key"))
+
+    def test_error_is_not_cached(self):
+        flight = SingleFlight()
+
+        with self.assertRaises(RuntimeError):
+            flight.do("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+        self.assertEqual(flight.do("key", lambda: 1), 1)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(4)])
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 4)
+
+
+class TestSemanticCache(unittest.TestCase):
+    def test_returns_values_above_threshold(self):
+        cache = SemanticCache(max_size=4, threshold=0.9)
+        cache.set([1.0, 0.0], "a")
+
+        self.assertEqual(cache.get([0.99, 0.05]), "a")
+        self.assertIsNone(cache.get([0.0, 1.0]))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_tags_partition_entries(self):
+        cache = SemanticCache(max_size=4, threshold=0.9)
+        cache.set([1.0, 0.0], "pdf answer", tag=("pdf", 1))
+
+        self.assertEqual(cache.get([1.0, 0.0], tag=("pdf", 1)), "pdf answer")
+        self.assertIsNone(cache.get([1.0, 0.0], tag=("pdf", 2)))
+
+    def test_least_recently_used_entry_is_replaced(self):
+        cache = SemanticCache(max_size=2, threshold=0.99)
+        with patch('src.cache.time.monotonic', side_effect=[1.0, 2.0, 3.0, 4.0, 5.0]):
+            cache.set([1.0, 0.0], "a")
+            cache.set([0.0, 1.0], "b")
+            cache.get([1.0, 0.0])
+            cache.set([0.7, 0.7], "c")
+            result = cache.get([0.0, 1.0])
+
+        self.assertIsNone(result)
+        self.assertEqual(len(cache), 2)
+
+    @patch('src.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = SemanticCache(max_size=2, ttl=10, threshold=0.9)
+        cache.set([1.0, 0.0], "a")
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get([1.0, 0.0]))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import time
+import unittest
+from src.chunker import Chunker, TokenCounter
+
+
+class FakeEncoding:
+    def __init__(self, text):
+        self.offsets = [(i, i + 1) for i, char in enumerate(text) if not char.isspace()]
+        self.ids = list(range(len(self.offsets)))
+
+
+class FakeTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return FakeEncoding(text)
+
+
+class TestChunker(unittest.TestCase):
+    def setUp(self):
+        self.counter = TokenCounter(tokenizer_name="")
+    
+    def test_chunks_end_on_sentence_boundaries(self):
+        chunker = Chunker(chunk_size=12, chunk_overlap=0, counter=self.counter)
+        text = "First sentence is here. Second one follows it. Third closes the text."
+        
+        chunks = chunker.split(text)
+        
+        self.assertEqual([chunk[2] for chunk in chunks],
+                         ["First sentence is here. Second one follows it.", "Third closes the text."])
+        self.assertEqual([chunk[3] for chunk in chunks], [10, 5])
+        for start, end, content, _ in chunks:
+            self.assertEqual(text[start:end], content)
+    
+    def test_overlap_repeats_trailing_sentences(self):
+        chunker = Chunker(chunk_size=10, chunk_overlap=4, counter=self.counter)
+        text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+        
+        chunks = [chunk[2] for chunk in chunker.split(text)]
+        
+        self.assertEqual(chunks, ["One two three. Four five six.",
+                                  "Four five six. Seven eight nine.",
+                                  "Seven eight nine. Ten eleven twelve."])
+    
+    def test_prefers_paragraph_breaks(self):
+        chunker = Chunker(chunk_size=12, chunk_overlap=0, counter=self.counter)
+        text = "Intro words here. More intro words.\n\nNext part begins. It keeps going on."
+        
+        chunks = [chunk[2] for chunk in chunker.split(text)]
+        
+        self.assertEqual(chunks, ["Intro words here. More intro words.", "Next part begins. It keeps going on."])
+    
+    def test_long_sentences_are_cut_at_token_boundaries(self):
+        chunker = Chunker(chunk_size=5, chunk_overlap=2, counter=self.counter)
+        
+        chunks = chunker.split("one two three four five six seven eight nine ten eleven")
+        
+        self.assertEqual([chunk[2] for chunk in chunks],
+                         ["one two three four five", "six seven eight nine ten", "eleven"])
+    
+    def test_streamed_pieces_match_whole_text(self):
+        chunker = Chunker(chunk_size=15, chunk_overlap=5, counter=self.counter)
+        text = ("Transformers use attention. The encoder maps inputs!\n\nDecoders generate outputs. "
+                "Results reached 28.4 BLEU. \"Quoted\" text ends here.") * 4
+        pieces = [text[i:i + 13] for i in range(0, len(text), 13)]
+        
+        self.assertEqual(list(chunker.iter_spans(pieces)), chunker.split(text))
+    
+    def test_text_without_boundaries_is_not_buffered_whole(self):
+        chunker = Chunker(chunk_size=5, chunk_overlap=0, counter=self.counter)
+        consumed = []
+        
+        def pieces():
+            for i in range(100):
+                consumed.append(i)
+                yield "word " * 10
+        
+        first = next(chunker.iter_spans(pieces()))
+        
+        self.assertEqual(first[2], "word word word word word")
+        self.assertLess(len(consumed), 3)
+        text = "word " * 1000
+        streamed = list(chunker.iter_spans([text[i:i + 7] for i in range(0, len(text), 7)]))
+        self.assertEqual(streamed, chunker.split(text))
+    
+    def test_long_whitespace_runs_are_chunked_in_linear_time(self):
+        chunker = Chunker(chunk_size=5, chunk_overlap=2, counter=self.counter)
+        padding = " " * 40000
+        text = "Intro text here." + padding + "\n\nNext part." + padding
+        
+        start = time.perf_counter()
+        chunks = chunker.split(text)
+        
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual([chunk[2] for chunk in chunks], ["Intro text here.", "Next part."])
+        
+        text = "Intro text here." + " " * 4000 + "\n \n" * 100 + "Next part." + " " * 4000
+        pieces = [text[i:i + 500] for i in range(0, len(text), 500)]
+        start = time.perf_counter()
+        streamed = list(chunker.iter_spans(pieces))
+        
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(streamed, chunker.split(text))
+    
+    def test_invalid_sizes_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Chunker(chunk_size=0, chunk_overlap=0, counter=self.counter)
+        with self.assertRaises(ValueError):
+            Chunker(chunk_size=10, chunk_overlap=10, counter=self.counter)
+    
+    def test_token_counter_uses_tokenizer_when_available(self):
+        counter = TokenCounter(tokenizer=FakeTokenizer())
+        chunker = Chunker(chunk_size=8, chunk_overlap=0, counter=counter)
+        
+        self.assertEqual(counter.count("ab cd."), 5)
+        self.assertEqual([chunk[3] for chunk in chunker.split("Abc de. Fghij.")], [6, 6])
+
+
+if __name__ == "__main__":
+    unittest.main()
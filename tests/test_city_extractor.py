@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from src.city_extractor import CityExtractor
+
+
+class TestCityExtractor(unittest.TestCase):
+    def setUp(self):
+        self.extractor = CityExtractor()
+
+    def test_single_word_city(self):
+        self.assertEqual(self.extractor.extract("What is the weather in London?"), "London")
+
+    def test_case_and_punctuation(self):
+        self.assertEqual(self.extractor.extract("is it raining in PARIS today??"), "Paris")
+
+    def test_multi_word_city_prefers_longest(self):
+        self.assertEqual(self.extractor.extract("Forecast for New York City tomorrow"), "New York City")
+        self.assertEqual(self.extractor.extract("How hot is it in new york"), "New York")
+
+    def test_accents_ignored(self):
+        self.assertEqual(self.extractor.extract("Temperature in São Paulo"), "Sao Paulo")
+
+    def test_leftmost_city_wins(self):
+        self.assertEqual(self.extractor.extract("Is Tokyo warmer than Berlin?"), "Tokyo")
+
+    def test_no_city(self):
+        self.assertIsNone(self.extractor.extract("Will it rain tomorrow?"))
+        self.assertIsNone(self.extractor.extract("Nice weather we are having"))
+
+    def test_custom_gazetteer(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("# comment\nSpringfield\n")
+        try:
+            extractor = CityExtractor(gazetteer_path=f.name)
+            self.assertEqual(extractor.extract("weather in springfield"), "Springfield")
+            self.assertIsNone(extractor.extract("weather in London"))
+        finally:
+            os.remove(f.name)
+
+    def test_missing_gazetteer(self):
+        extractor = CityExtractor(gazetteer_path="missing-cities.txt")
+        self.assertIsNone(extractor.extract("weather in London"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+from src.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = EmbeddingStore(directory=self.temp_dir, enabled=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        self.store.put_many("model-a", ["h1", "h2"], [[0.5, 1.0], [1.5, 2.0]])
+
+        vectors = self.store.get_many("model-a", ["h2", "missing", "h1"])
+
+        self.assertEqual(vectors, [[1.5, 2.0], None, [0.5, 1.0]])
+        self.assertEqual(self.store.hits, 2)
+        self.assertEqual(self.store.misses, 1)
+
+    def test_persists_across_instances(self):
+        self.store.put_many("sentence-transformers/all-MiniLM-L6-v2", ["h1"], [[0.25, 0.75]])
+
+        reopened = EmbeddingStore(directory=self.temp_dir, enabled=True)
+
+        self.assertEqual(reopened.get_many("sentence-transformers/all-MiniLM-L6-v2", ["h1"]), [[0.25, 0.75]])
+
+    def test_sees_rows_appended_by_another_writer(self):
+        reader = EmbeddingStore(directory=self.temp_dir, enabled=True)
+        self.assertEqual(reader.get_many("model-a", ["h1"]), [None])
+
+        self.store.put_many("model-a", ["h1"], [[1.0, 2.0]])
+
+        self.assertEqual(reader.get_many("model-a", ["h1"]), [[1.0, 2.0]])
+
+    def test_models_are_kept_apart(self):
+        self.store.put_many("model-a", ["h1"], [[1.0, 2.0]])
+
+        self.assertEqual(self.store.get_many("model-b", ["h1"]), [None])
+
+    def test_duplicates_are_stored_once(self):
+        self.store.put_many("model-a", ["h1", "h1"], [[1.0, 2.0], [1.0, 2.0]])
+        self.store.put_many("model-a", ["h1", "h2"], [[9.0, 9.0], [3.0, 4.0]])
+
+        self.assertEqual(self.store.count("model-a"), 2)
+        self.assertEqual(self.store.get_many("model-a", ["h1", "h2"]), [[1.0, 2.0], [3.0, 4.0]])
+        vectors_path = os.path.join(self.temp_dir, "model-a", "vectors.f32")
+        self.assertEqual(os.path.getsize(vectors_path), 2 * 2 * 4)
+
+    def test_interrupted_writes_are_ignored(self):
+        self.store.put_many("model-a", ["h1"], [[1.0, 2.0]])
+        directory = os.path.join(self.temp_dir, "model-a")
+        with open(os.path.join(directory, "vectors.f32"), 'ab') as f:
+            f.write(b"\x00\x00")
+        with open(os.path.join(directory, "index.tsv"), 'ab') as f:
+            f.write(b"h9\t")
+
+        reopened = EmbeddingStore(directory=self.temp_dir, enabled=True)
+        self.assertEqual(reopened.get_many("model-a", ["h1", "h9"]), [[1.0, 2.0], None])
+
+        reopened.put_many("model-a", ["h2"], [[3.0, 4.0]])
+        self.assertEqual(reopened.get_many("model-a", ["h2"]), [[3.0, 4.0]])
+
+    def test_mismatched_dimensions_are_not_stored(self):
+        self.store.put_many("model-a", ["h1"], [[1.0, 2.0]])
+        self.store.put_many("model-a", ["h2"], [[1.0, 2.0, 3.0]])
+
+        self.assertEqual(self.store.get_many("model-a", ["h2"]), [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
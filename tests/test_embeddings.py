@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from src.embeddings import EmbeddingRegistry, QueryEmbeddingCache
+
+
+class TestEmbeddingRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = EmbeddingRegistry()
+
+    @patch('src.embeddings.HuggingFaceEmbeddings')
+    def test_model_loaded_once(self, mock_embeddings_class):
+        first = self.registry.get("model-a", "cpu")
+        second = self.registry.get("model-a", "cpu")
+
+        self.assertIs(first, second)
+        mock_embeddings_class.assert_called_once_with(model_name="model-a", model_kwargs={"device": "cpu"})
+        first.embed_query.assert_called_once()
+        self.assertIsNotNone(self.registry.get_load_time("model-a", "cpu"))
+
+    @patch('src.embeddings.HuggingFaceEmbeddings')
+    def test_models_keyed_by_name_and_device(self, mock_embeddings_class):
+        mock_embeddings_class.side_effect = lambda **kwargs: MagicMock()
+
+        cpu_model = self.registry.get("model-a", "cpu")
+        cuda_model = self.registry.get("model-a", "cuda")
+        other_model = self.registry.get("model-b", "cpu")
+
+        self.assertIsNot(cpu_model, cuda_model)
+        self.assertIsNot(cpu_model, other_model)
+        self.assertEqual(mock_embeddings_class.call_count, 3)
+
+    @patch('src.embeddings.HuggingFaceEmbeddings')
+    def test_load_failure_not_cached(self, mock_embeddings_class):
+        mock_embeddings_class.side_effect = [Exception("download failed"), MagicMock()]
+
+        with self.assertRaises(Exception):
+            self.registry.get("model-a", "cpu")
+
+        self.assertIsNotNone(self.registry.get("model-a", "cpu"))
+        self.assertEqual(mock_embeddings_class.call_count, 2)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = QueryEmbeddingCache(max_size=10, ttl=60)
+        self.model = MagicMock()
+        self.model.model_name = "model-a"
+        self.model.embed_query.return_value = [0.1, 0.2, 0.3]
+
+    def test_repeated_query_hits_cache(self):
+        first = self.cache.get_embedding("What is attention?", self.model)
+        second = self.cache.get_embedding("  what is   ATTENTION? ", self.model)
+
+        self.assertEqual(first, second)
+        self.model.embed_query.assert_called_once_with("what is attention?")
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_embedding_returned_as_list(self):
+        embedding = self.cache.get_embedding("query", self.model)
+
+        self.assertIsInstance(embedding, list)
+        self.assertEqual(len(embedding), 3)
+        self.assertAlmostEqual(embedding[0], 0.1, places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
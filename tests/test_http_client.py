@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+import httpx
+import requests
+from src.http_client import CircuitBreaker, CircuitOpenError, HTTPClient
+
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(pool_size=4, connect_timeout=2, read_timeout=5, max_retries=2,
+                                 backoff_factor=0.1, backoff_jitter=0.1, circuit_failures=2, circuit_reset=30)
+
+    def test_session_is_pooled_with_retries(self):
+        session = self.client.session
+        adapter = session.get_adapter("https://api.tavily.com/search")
+
+        self.assertIs(self.client.session, session)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(adapter.max_retries.total, 2)
+        self.assertIn(429, adapter.max_retries.status_forcelist)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertIn("POST", adapter.max_retries.allowed_methods)
+
+    def test_request_uses_connect_and_read_timeouts(self):
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200)
+        self.client._session = session
+
+        self.client.get("https://example.com/data", params={"q": "x"})
+
+        session.request.assert_called_once_with("GET", "https://example.com/data",
+                                                params={"q": "x"}, timeout=(2, 5))
+
+    def test_circuit_opens_after_repeated_failures(self):
+        session = MagicMock()
+        session.request.side_effect = requests.exceptions.ConnectionError("down")
+        self.client._session = session
+
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.get("https://example.com/data")
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get("https://example.com/data")
+        self.assertEqual(session.request.call_count, 2)
+
+        # Other hosts have their own breaker
+        session.request.side_effect = None
+        session.request.return_value = MagicMock(status_code=200)
+        self.client.get("https://other.example.com/data")
+
+    def test_server_errors_count_as_failures(self):
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=503)
+        self.client._session = session
+
+        self.client.get("https://example.com/data")
+        self.client.get("https://example.com/data")
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get("https://example.com/data")
+
+    @patch('src.http_client.time.monotonic')
+    def test_circuit_half_opens_after_reset_timeout(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+
+        self.assertFalse(breaker.allow())
+
+        mock_monotonic.return_value = 111.0
+        self.assertEqual(breaker.state, "half-open")
+        self.assertTrue(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+
+class TestHTTPClientAsync(unittest.IsolatedAsyncioTestCase):
+    def _patch_client(self, handler):
+        transport = httpx.MockTransport(handler)
+        real_client = httpx.AsyncClient
+        return patch('src.http_client.httpx.AsyncClient',
+                     side_effect=lambda **kwargs: real_client(**dict(kwargs, transport=transport)))
+
+    async def test_arequest_retries_retryable_statuses(self):
+        client = HTTPClient(max_retries=2, backoff_factor=0.001, backoff_jitter=0.001)
+        responses = [httpx.Response(503), httpx.Response(429), httpx.Response(200, json={"ok": True})]
+
+        with self._patch_client(lambda request: responses.pop(0)):
+            response = await client.aget("https://example.com/data")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(responses, [])
+
+    async def test_arequest_returns_last_response_when_retries_exhausted(self):
+        client = HTTPClient(max_retries=1, backoff_factor=0.001, backoff_jitter=0.001)
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(502)
+
+        with self._patch_client(handler):
+            response = await client.apost("https://example.com/search", json={"q": "x"})
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(len(calls), 2)
+
+    async def test_async_client_is_reused_within_loop(self):
+        client = HTTPClient()
+
+        with self._patch_client(lambda request: httpx.Response(200)):
+            await client.aget("https://example.com/a")
+            first = client._get_async_client()
+            await client.aget("https://example.com/b")
+
+        self.assertIs(client._get_async_client(), first)
+
+    async def test_aclose_closes_the_loops_client(self):
+        client = HTTPClient()
+        first = client._get_async_client()
+
+        await client.aclose()
+
+        self.assertTrue(first.is_closed)
+        self.assertIsNot(client._get_async_client(), first)
+
+
+class TestHTTPClientLoops(unittest.TestCase):
+    def test_async_client_is_closed_with_its_loop(self):
+        client = HTTPClient()
+
+        async def use_client():
+            return client._get_async_client()
+
+        first = asyncio.run(use_client())
+        second = asyncio.run(use_client())
+
+        self.assertTrue(first.is_closed)
+        self.assertTrue(second.is_closed)
+        self.assertIsNot(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
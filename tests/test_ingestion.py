@@ -0,0 +1,254 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from src.ingestion import IngestionPipeline
+from src.ingest_manifest import IngestManifest
+from src.bm25_index import BM25Index
+from src.embedding_store import EmbeddingStore
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, "test.pdf")
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b"version 1")
+
+        self.mock_model = MagicMock()
+        self.mock_model.embed_documents.side_effect = lambda texts: [[0.1, 0.2] for _ in texts]
+        self.mock_processor = MagicMock()
+        self.mock_processor.chunk_settings.return_value = {"chunk_size": 256, "chunk_overlap": 48,
+                                                           "chunk_tokenizer": ""}
+        self.mock_store = MagicMock()
+        self.mock_store.get_stats.return_value = {"vector_count": 10}
+        self.mock_store.scroll_documents.return_value = []
+        self.manifest = IngestManifest(path=os.path.join(self.temp_dir, "manifest.json"))
+        self.lexical_index = BM25Index(path=os.path.join(self.temp_dir, "bm25_index.json.gz"))
+        self.embedding_store = EmbeddingStore(directory=os.path.join(self.temp_dir, "embeddings"), enabled=True)
+        self.pipeline = IngestionPipeline(
+            embeddings_model=self.mock_model,
+            batch_size=2,
+            processor=self.mock_processor,
+            store=self.mock_store,
+            manifest=self.manifest,
+            lexical_index=self.lexical_index,
+            embedding_store=self.embedding_store
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _documents(self, contents):
+        return [
+            {"content": content, "source": self.pdf_path, "chunk_id": i}
+            for i, content in enumerate(contents)
+        ]
+
+    def _stored_documents(self):
+        return [doc for call in self.mock_store.add_embeddings.call_args_list for doc in call[0][1]]
+
+    def test_embed_documents_batches(self):
+        embeddings = self.pipeline.embed_documents(self._documents(["a", "b", "c", "d", "e"]))
+
+        self.assertEqual(len(embeddings), 5)
+        self.assertEqual(self.mock_model.embed_documents.call_count, 3)
+        self.mock_model.embed_query.assert_not_called()
+        self.assertEqual(self.pipeline.last_stats["chunks"], 5)
+        self.assertIn("chunks_per_sec", self.pipeline.last_stats)
+
+    def test_embed_batch_reuses_stored_embeddings(self):
+        self.mock_model.model_name = "test-model"
+        self.mock_model.embed_documents.side_effect = lambda texts: [[float(len(text)), 1.0] for text in texts]
+
+        first, _ = self.pipeline.embed_batch(self._documents(["a", "bb"]))
+        second, _ = self.pipeline.embed_batch(self._documents(["bb", "ccc"]))
+
+        self.assertEqual(first, [[1.0, 1.0], [2.0, 1.0]])
+        self.assertEqual(second, [[2.0, 1.0], [3.0, 1.0]])
+        self.assertEqual(self.mock_model.embed_documents.call_args_list[-1][0][0], ["ccc"])
+        self.assertEqual(self.embedding_store.count("test-model"), 3)
+
+    def test_rebuilt_collection_is_upserted_without_embedding(self):
+        self.mock_model.model_name = "test-model"
+        self.mock_processor.iter_chunks.side_effect = lambda *args: iter(self._documents(["a", "b", "c"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        # An emptied collection resets the manifest, so every chunk is stored again
+        self.mock_store.get_stats.return_value = {"vector_count": 0}
+        self.mock_model.embed_documents.reset_mock()
+        self.mock_store.add_embeddings.reset_mock()
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.mock_model.embed_documents.assert_not_called()
+        self.assertEqual(len(self._stored_documents()), 3)
+
+    def test_ingest_pdf_streams_batches(self):
+        documents = self._documents(["a", "b", "c"])
+        self.mock_processor.iter_chunks.return_value = iter(documents)
+
+        count = self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual(count, 3)
+        self.mock_store.create_collection.assert_called_once_with(force_recreate=False)
+        self.assertEqual(self.mock_store.add_embeddings.call_count, 2)
+        self.assertEqual(self._stored_documents(), documents)
+        self.assertEqual(self.pipeline.last_stats["chunks"], 3)
+
+    def test_unchanged_file_skipped(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        self.mock_store.add_embeddings.reset_mock()
+        self.mock_processor.iter_chunks.reset_mock()
+
+        count = self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual(count, 2)
+        self.assertTrue(self.pipeline.last_stats["unchanged"])
+        self.mock_processor.iter_chunks.assert_not_called()
+        self.mock_store.add_embeddings.assert_not_called()
+
+    def test_changed_chunk_settings_rechunk_unchanged_file(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        self.mock_store.add_embeddings.reset_mock()
+
+        self.mock_processor.chunk_settings.return_value = {"chunk_size": 128, "chunk_overlap": 16,
+                                                           "chunk_tokenizer": ""}
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b c"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertFalse(self.pipeline.last_stats["unchanged"])
+        self.assertEqual([doc["content"] for doc in self._stored_documents()], ["b c"])
+        self.assertEqual(self.manifest.get_file(self.pdf_path)["settings"]["chunk_size"], 128)
+
+    def test_changed_embedding_model_reembeds_every_chunk(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        old_ids = dict(self.manifest.get_file(self.pdf_path)["chunks"])
+        self.mock_store.add_embeddings.reset_mock()
+
+        self.mock_model.model_name = "other-model"
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual([doc["content"] for doc in self._stored_documents()], ["a", "b"])
+        self.assertEqual(self.manifest.get_file(self.pdf_path)["chunks"], old_ids)
+        self.mock_store.delete_points.assert_called_with([])
+
+    def test_changed_file_replaces_only_changed_chunks(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b", "c"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        old_ids = dict(self.manifest.get_file(self.pdf_path)["chunks"])
+        self.mock_store.add_embeddings.reset_mock()
+
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b"version 2")
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b", "x"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual([doc["content"] for doc in self._stored_documents()], ["x"])
+        deleted_ids = self.mock_store.delete_points.call_args[0][0]
+        self.assertEqual(len(deleted_ids), 1)
+        self.assertNotIn(deleted_ids[0], self.manifest.get_file(self.pdf_path)["chunks"].values())
+        self.assertEqual(self.pipeline.last_stats["reused"], 2)
+        self.assertTrue(set(old_ids.values()) & set(self.manifest.get_file(self.pdf_path)["chunks"].values()))
+
+    def test_reused_chunks_get_their_new_positions(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        old_ids = self.manifest.get_file(self.pdf_path)["chunks"]
+
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b"version 2")
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["new intro", "a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        reused = self.mock_store.update_positions.call_args[0][0]
+        self.assertEqual([(doc["content"], doc["chunk_id"]) for doc in reused], [("a", 1), ("b", 2)])
+        self.assertEqual({doc["point_id"] for doc in reused}, set(old_ids.values()))
+        self.assertEqual(self.lexical_index.search("a", 1)[0]["chunk_id"], 1)
+
+    def test_manifest_keeps_entries_written_by_another_process(self):
+        other = IngestManifest(path=self.manifest.path)
+        self.manifest.set_file(self.pdf_path, "hash-1", {"h": "id-1"})
+        self.manifest.save()
+
+        # other loaded before that save and never saw it
+        other.set_file(os.path.join(self.temp_dir, "other.pdf"), "hash-2", {"h2": "id-2"})
+        other.save()
+
+        self.assertEqual(len(other), 2)
+        self.assertEqual(len(self.manifest), 2)
+        self.assertEqual(self.manifest.get_file(os.path.join(self.temp_dir, "other.pdf"))["file_hash"], "hash-2")
+
+    def test_manifest_version_follows_saves_by_another_process(self):
+        other = IngestManifest(path=self.manifest.path)
+        self.manifest.save()
+        before = self.manifest.version()
+
+        other.set_file(self.pdf_path, "hash-1", {"h": "id-1"})
+        other.save()
+
+        self.assertIsNotNone(before)
+        self.assertNotEqual(self.manifest.version(), before)
+
+    def test_manifest_persisted(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        reloaded = IngestManifest(path=self.manifest.path)
+        self.assertIsNotNone(reloaded.get_file(self.pdf_path))
+
+    def test_purge_missing_files(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a", "b"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        os.remove(self.pdf_path)
+
+        purged = self.pipeline.purge_missing_files()
+
+        self.assertEqual(purged, 1)
+        self.assertEqual(len(self.mock_store.delete_points.call_args[0][0]), 2)
+        self.assertIsNone(self.manifest.get_file(self.pdf_path))
+
+    def test_empty_collection_resets_manifest(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+        self.mock_store.get_stats.return_value = {"vector_count": 0}
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["a"]))
+
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertFalse(self.pipeline.last_stats["unchanged"])
+        self.assertEqual(self.mock_store.add_embeddings.call_count, 2)
+
+
+    def test_lexical_index_follows_stored_chunks(self):
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["alpha text", "beta text"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual(self.lexical_index.search("alpha")[0]["document"], "alpha text")
+
+        with open(self.pdf_path, 'wb') as f:
+            f.write(b"version 2")
+        self.mock_processor.iter_chunks.return_value = iter(self._documents(["alpha text", "gamma text"]))
+        self.pipeline.ingest_pdf(self.pdf_path)
+
+        self.assertEqual(self.lexical_index.search("beta"), [])
+        reloaded = BM25Index(path=self.lexical_index.path)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.search("gamma")[0]["document"], "gamma text")
+
+    def test_missing_lexical_index_is_rebuilt_from_collection(self):
+        self.mock_store.scroll_documents.return_value = [
+            {"point_id": "p1", "content": "stored chunk about BLEU", "source": "a.pdf", "chunk_id": 0, "metadata": {}}
+        ]
+
+        self.pipeline.sync_manifest()
+
+        self.assertEqual(self.lexical_index.search("bleu")[0]["id"], "p1")
+
+
+if __name__ == "__main__":
+    unittest.main()
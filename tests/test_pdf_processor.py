@@ -2,13 +2,16 @@ import unittest
 import tempfile
 import os
 from pathlib import Path
-from src.pdf_processor import PDFProcessor
+from unittest.mock import patch
+from src.page_text_cache import PageTextCache
+from src.pdf_processor import EXTRACTOR_VERSION, PDFProcessor
 
 
 class TestPDFProcessor(unittest.TestCase):
     def setUp(self):
-        self.processor = PDFProcessor(chunk_size=100, chunk_overlap=20)
         self.temp_dir = tempfile.mkdtemp()
+        self.page_cache = PageTextCache(os.path.join(self.temp_dir, "page_text"), enabled=True)
+        self.processor = PDFProcessor(chunk_size=100, chunk_overlap=20, page_cache=self.page_cache)
     
     def tearDown(self):
         import shutil
@@ -34,6 +37,34 @@ class TestPDFProcessor(unittest.TestCase):
         
         return pdf_path
     
+    def _create_multipage_pdf(self, page_count):
+        pdf_path = os.path.join(self.temp_dir, "multipage.pdf")
+        page_ids = [4 + 2 * i for i in range(page_count)]
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in page_ids) + b"] /Count %d >>" % page_count,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+        ]
+        for i, page_id in enumerate(page_ids):
+            stream = b"BT /F1 12 Tf 72 700 Td (Page %d text.) Tj ET" % (i + 1)
+            objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                           b"/Resources << /Font << /F1 3 0 R >> >> >>" % (page_id + 1))
+            objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        
+        data = b"%PDF-1.4\n"
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(data))
+            data += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        xref = len(data)
+        data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+        data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+        
+        with open(pdf_path, 'wb') as f:
+            f.write(data)
+        return pdf_path
+    
     def test_load_pdf_success(self):
         pdf_path = self._create_test_pdf()
         
@@ -76,7 +107,8 @@ class TestPDFProcessor(unittest.TestCase):
         
         self.assertGreater(len(chunks), 1)
         for chunk in chunks:
-            self.assertLessEqual(len(chunk), self.processor.chunk_size + 50)
+            self.assertLessEqual(self.processor.chunker.counter.count(chunk), self.processor.chunk_size)
+            self.assertTrue(chunk.startswith("This") and chunk.endswith("document."))
     
     def test_split_text_single_chunk(self):
         text = "Short text"
@@ -85,6 +117,100 @@ class TestPDFProcessor(unittest.TestCase):
         self.assertEqual(len(chunks), 1)
         self.assertEqual(chunks[0], text)
     
+    def test_zero_overlap_is_kept(self):
+        processor = PDFProcessor(chunk_size=10, chunk_overlap=0)
+        
+        self.assertEqual(processor.chunk_overlap, 0)
+        self.assertEqual(processor.split_text("One two three. Four five six. Seven eight nine."),
+                         ["One two three. Four five six.", "Seven eight nine."])
+    
+    def test_overlap_not_below_chunk_size_is_rejected(self):
+        with self.assertRaises(ValueError):
+            PDFProcessor(chunk_size=100, chunk_overlap=100)
+    
+    def test_iter_chunks_matches_split_text(self):
+        sentence = "The model reached 28.4 BLEU on the test set. "
+        pages = [(1, sentence * 12), (2, ""), (3, "Results continue here. " + sentence * 20)]
+        
+        with patch.object(self.processor, 'iter_pages', return_value=iter(pages)):
+            documents = list(self.processor.iter_chunks("test.pdf"))
+        
+        expected = self.processor.split_text("".join(text for _, text in pages))
+        self.assertEqual([doc["content"] for doc in documents], expected)
+        self.assertEqual(documents[0]["metadata"]["page_start"], 1)
+        self.assertTrue(any(doc["metadata"]["page_start"] == 1 and doc["metadata"]["page_end"] == 3
+                            for doc in documents))
+        self.assertEqual(documents[-1]["metadata"]["page_start"], 3)
+        self.assertEqual([doc["chunk_id"] for doc in documents], list(range(len(documents))))
+        for doc in documents:
+            self.assertEqual(doc["metadata"]["token_count"], self.processor.chunker.counter.count(doc["content"]))
+    
+    def test_iter_chunks_is_lazy(self):
+        def pages():
+            yield 1, "A sentence on the first page. " * 50
+            raise AssertionError("second page should not be read yet")
+        
+        with patch.object(self.processor, 'iter_pages', return_value=pages()):
+            first = next(self.processor.iter_chunks("test.pdf"))
+        
+        self.assertLessEqual(first["metadata"]["token_count"], 100)
+        self.assertTrue(first["content"].endswith("page."))
+    
+    def test_large_pdf_pages_are_sharded_in_order(self):
+        pdf_path = self._create_multipage_pdf(7)
+        no_cache = PageTextCache(enabled=False)
+        sequential = PDFProcessor(shard_workers=1, page_cache=no_cache)
+        sharded = PDFProcessor(shard_workers=2, shard_threshold=5, shard_pages=2, page_cache=no_cache)
+        
+        expected = list(sequential.iter_pages(pdf_path))
+        with patch.object(sharded, '_iter_sharded_pages', wraps=sharded._iter_sharded_pages) as mock_sharded:
+            pages = list(sharded.iter_pages(pdf_path))
+        
+        mock_sharded.assert_called_once_with(pdf_path, 7)
+        self.assertEqual(pages, expected)
+        self.assertEqual([page_num for page_num, _ in pages], list(range(1, 8)))
+        self.assertIn("Page 7 text.", pages[-1][1])
+    
+    def test_small_pdf_is_not_sharded(self):
+        pdf_path = self._create_multipage_pdf(3)
+        processor = PDFProcessor(shard_workers=2, shard_threshold=5, page_cache=PageTextCache(enabled=False))
+        
+        with patch.object(processor, '_iter_sharded_pages') as mock_sharded:
+            pages = list(processor.iter_pages(pdf_path))
+        
+        mock_sharded.assert_not_called()
+        self.assertEqual(len(pages), 3)
+    
+    def test_extracted_pages_are_cached(self):
+        pdf_path = self._create_multipage_pdf(3)
+        
+        pages = list(self.processor.iter_pages(pdf_path))
+        
+        with patch.object(self.processor, '_extract_pages', side_effect=AssertionError("parsed again")), \
+                patch('src.pdf_processor.PyPDF2.PdfReader', side_effect=AssertionError("parsed again")):
+            self.assertEqual(list(self.processor.iter_pages(pdf_path)), pages)
+            self.assertTrue(self.processor.validate_pdf(pdf_path))
+        
+        self.assertIn("Page 3 text.", pages[-1][1])
+    
+    def test_cache_is_keyed_by_content_and_extractor_version(self):
+        pdf_path = self._create_multipage_pdf(2)
+        list(self.processor.iter_pages(pdf_path, file_hash="abc"))
+        
+        self.assertTrue(self.page_cache.contains("abc", EXTRACTOR_VERSION))
+        self.assertFalse(self.page_cache.contains("abc", EXTRACTOR_VERSION + "-next"))
+        self.assertFalse(self.page_cache.contains("def", EXTRACTOR_VERSION))
+    
+    def test_interrupted_extraction_is_not_cached(self):
+        pdf_path = self._create_multipage_pdf(3)
+        
+        pages = self.processor.iter_pages(pdf_path, file_hash="abc")
+        next(pages)
+        pages.close()
+        
+        self.assertFalse(self.page_cache.contains("abc", EXTRACTOR_VERSION))
+        self.assertEqual(os.listdir(self.page_cache.directory), [])
+    
     def test_get_pdf_list_empty(self):
         pdf_list = self.processor.get_pdf_list(self.temp_dir)
         self.assertEqual(len(pdf_list), 0)
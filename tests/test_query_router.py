@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+from src.query_router import QueryRouter
+
+
+def fake_embed_texts(texts):
+    return [fake_embed(text) for text in texts]
+
+
+def fake_embed(text):
+    # One axis per route, keyed on words that appear in the prototype queries
+    text = text.lower()
+    weather = sum(word in text for word in ["weather", "rain", "hot", "temperature", "snow", "windy",
+                                            "umbrella", "forecast", "outside"])
+    pdf = sum(word in text for word in ["document", "paper", "pdf", "findings", "architecture",
+                                        "experiments", "model"])
+    general = sum(word in text for word in ["who", "capital", "news", "ceo", "cook", "world", "stock"])
+    return [weather + 0.01, pdf + 0.01, general + 0.01]
+
+
+class TestQueryRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = QueryRouter(use_embeddings=False)
+    
+    def test_strong_keyword_routes_to_weather(self):
+        decision = self.router.route("Will it be rainy in Paris tomorrow?", has_documents=True)
+        
+        self.assertEqual(decision["route"], "weather")
+        self.assertEqual(decision["candidates"], ["weather"])
+    
+    def test_keywords_match_whole_words_only(self):
+        self.assertIsNone(self.router.match_keywords("Show the photo of the scaffold"))
+        self.assertEqual(self.router.match_keywords("Is it HOT today?"), "weak")
+        self.assertEqual(self.router.match_keywords("weather please"), "strong")
+    
+    def test_weak_keyword_without_document_cue_stays_weather(self):
+        for query in ["What's the temperature outside right now?",
+                      "How hot is it today?",
+                      "Is it going to be cold tomorrow?"]:
+            decision = self.router.route(query, has_documents=True)
+            
+            self.assertEqual(decision["route"], "weather", query)
+            self.assertEqual(decision["candidates"], ["weather", "pdf"], query)
+    
+    def test_weak_keyword_with_document_cue_prefers_documents(self):
+        for query in ["What temperature does the paper use?",
+                      "What does the paper say about cloud computing?",
+                      "Explain the hot-swap mechanism in section 3"]:
+            decision = self.router.route(query, has_documents=True)
+            
+            self.assertEqual(decision["route"], "pdf", query)
+            self.assertEqual(decision["candidates"], ["pdf"], query)
+    
+    def test_weak_keyword_with_city_is_ambiguous_with_documents(self):
+        with patch("src.query_router.city_extractor.extract", return_value="Paris"):
+            decision = self.router.route("How cold does the report say Paris gets?", has_documents=True)
+        
+        self.assertEqual(decision["route"], "weather")
+        self.assertEqual(decision["candidates"], ["weather", "pdf"])
+    
+    def test_weak_keyword_without_documents(self):
+        decision = self.router.route("Is it hot today?", has_documents=False)
+        
+        self.assertEqual(decision["route"], "weather")
+    
+    def test_default_routes(self):
+        self.assertEqual(self.router.route("Who wrote Hamlet?", has_documents=True)["route"], "pdf")
+        self.assertEqual(self.router.route("Who wrote Hamlet?", has_documents=False)["route"], "general")
+    
+    def test_embedding_routing(self):
+        router = QueryRouter(use_embeddings=True, margin=0.05, pdf_prior=0.0, weak_keyword_bonus=0.1)
+        
+        query = "What sampling temperature does the paper use for the model?"
+        decision = router.route(query, True, fake_embed(query), fake_embed_texts)
+        
+        self.assertEqual(decision["method"], "embedding")
+        self.assertEqual(decision["route"], "pdf")
+        self.assertEqual(set(decision["scores"]), {"weather", "pdf", "general"})
+        
+        query = "Who is the CEO of the company?"
+        decision = router.route(query, False, fake_embed(query), fake_embed_texts)
+        
+        self.assertEqual(decision["route"], "general")
+        self.assertNotIn("pdf", decision["scores"])
+    
+    def test_embedding_failure_falls_back_to_keywords(self):
+        router = QueryRouter(use_embeddings=True)
+        
+        def failing_embed(texts):
+            raise RuntimeError("model unavailable")
+        
+        decision = router.route("Summarize the document", True, [1.0, 0.0, 0.0], failing_embed)
+        
+        self.assertEqual(decision["route"], "pdf")
+        self.assertEqual(decision["method"], "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
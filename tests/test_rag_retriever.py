@@ -38,6 +38,47 @@ class TestRAGRetriever(unittest.TestCase):
         self.assertEqual(results[0]["score"], 0.95)
         self.assertEqual(results[1]["score"], 0.85)
     
+    def test_retrieve_fuses_dense_and_lexical_results(self):
+        lexical_index = MagicMock()
+        lexical_index.__len__.return_value = 3
+        lexical_index.search.return_value = [
+            {"id": "c", "score": 7.0, "document": "BLEU 28.4", "source": "paper.pdf", "chunk_id": 2},
+            {"id": "a", "score": 3.0, "document": "Doc a", "source": "paper.pdf", "chunk_id": 0}
+        ]
+        self.mock_vector_store.search.return_value = [
+            {"id": "a", "score": 0.9, "document": "Doc a", "source": "paper.pdf", "chunk_id": 0},
+            {"id": "b", "score": 0.8, "document": "Doc b", "source": "paper.pdf", "chunk_id": 1}
+        ]
+        retriever = RAGRetriever(vector_store_instance=self.mock_vector_store, top_k=2,
+                                 lexical_index=lexical_index, hybrid=True)
+        
+        results = retriever.retrieve([0.1, 0.2], query_text="What is the BLEU 28.4 result?")
+        
+        self.assertEqual([doc["id"] for doc in results], ["a", "c"])
+        self.assertEqual(self.mock_vector_store.search.call_args[1]["top_k"], retriever.hybrid_candidates)
+        lexical_index.search.assert_called_once_with("What is the BLEU 28.4 result?", retriever.hybrid_candidates)
+        
+        retriever.retrieve([0.1, 0.2])
+        self.assertEqual(self.mock_vector_store.search.call_args[1]["top_k"], 2)
+    
+    def test_retrieve_reranks_overfetched_candidates(self):
+        reranker = MagicMock()
+        reranker.available = True
+        reranker.candidates = 20
+        reranker.top_n = 2
+        reranker.rerank.side_effect = lambda query, docs, n: list(reversed(docs))[:n]
+        self.mock_vector_store.search.return_value = [
+            {"id": i, "score": 0.9, "document": f"Doc {i}", "source": "s", "chunk_id": i} for i in range(20)
+        ]
+        retriever = RAGRetriever(vector_store_instance=self.mock_vector_store, top_k=5,
+                                 hybrid=False, reranker=reranker)
+        
+        results = retriever.retrieve([0.1, 0.2], query_text="query")
+        
+        self.assertEqual([doc["id"] for doc in results], [19, 18])
+        self.assertEqual(self.mock_vector_store.search.call_args[1]["top_k"], 20)
+        reranker.rerank.assert_called_once()
+    
     def test_format_context(self):
         documents = [
             {
@@ -61,6 +102,51 @@ class TestRAGRetriever(unittest.TestCase):
         
         self.assertEqual(context, "")
     
+    def test_format_context_merges_adjacent_chunks(self):
+        text = " ".join(f"Sentence {i} of the transformer paper." for i in range(20))
+        documents = [
+            {"score": 0.9, "document": text[:300], "source": "paper.pdf", "chunk_id": 3},
+            {"score": 0.8, "document": text[250:460], "source": "paper.pdf", "chunk_id": 4},
+            {"score": 0.7, "document": "Unrelated section about training data.", "source": "paper.pdf", "chunk_id": 9}
+        ]
+        
+        passages = self.retriever.merge_passages(documents)
+        
+        self.assertEqual(len(passages), 2)
+        self.assertEqual(passages[0]["document"], text[:460])
+        self.assertEqual(passages[0]["chunk_ids"], [3, 4])
+        self.assertEqual(passages[0]["score"], 0.9)
+    
+    def test_format_context_drops_duplicate_chunks(self):
+        documents = [
+            {"score": 0.6, "document": "Same text", "source": "a.pdf", "chunk_id": 0},
+            {"score": 0.9, "document": "Same text", "source": "b.pdf", "chunk_id": 5}
+        ]
+        
+        context = self.retriever.format_context(documents)
+        
+        self.assertEqual(context.count("Same text"), 1)
+        self.assertIn("b.pdf", context)
+        self.assertNotIn("Document 2", context)
+    
+    def test_format_context_respects_token_budget(self):
+        documents = [
+            {"score": 0.9, "document": "alpha " * 100, "source": "a.pdf", "chunk_id": 0},
+            {"score": 0.8, "document": "beta " * 100, "source": "b.pdf", "chunk_id": 0},
+            {"score": 0.7, "document": "gamma " * 20, "source": "c.pdf", "chunk_id": 0}
+        ]
+        
+        context = self.retriever.format_context(documents, token_budget=200)
+        
+        self.assertLessEqual(len(context.split()), 200)
+        self.assertEqual(context.count("alpha"), 100)
+        self.assertIn("beta", context)
+        self.assertTrue(context.rstrip().endswith("..."))
+        self.assertNotIn("gamma", context)
+        
+        unlimited = self.retriever.format_context(documents, token_budget=0)
+        self.assertEqual(unlimited.count("gamma"), 20)
+    
     def test_get_context_for_query(self):
         mock_documents = [
             {
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from src.reranker import Reranker
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.batches = []
+    
+    def predict(self, pairs, batch_size=32):
+        self.batches.append(len(pairs))
+        # Relevance grows with the number of query words found in the passage
+        return [sum(word in passage.lower() for word in query.lower().split()) * 2.0 - 3.0
+                for query, passage in pairs]
+
+
+class TestReranker(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            {"id": i, "score": 0.9 - i * 0.1, "document": text, "source": "paper.pdf", "chunk_id": i}
+            for i, text in enumerate([
+                "Training used eight GPUs.",
+                "Positional encodings use sine and cosine functions.",
+                "The model achieves a BLEU score of 28.4.",
+                "BLEU measures translation quality.",
+            ])
+        ]
+    
+    def test_rerank_orders_by_cross_encoder_score(self):
+        model = FakeCrossEncoder()
+        reranker = Reranker(model=model, batch_size=3, enabled=True)
+        
+        results = reranker.rerank("model BLEU score", self.documents, top_n=2)
+        
+        self.assertEqual([doc["id"] for doc in results], [2, 3])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertLess(results[0]["score"], 1.0)
+        self.assertAlmostEqual(results[0]["retrieval_score"], 0.7)
+        self.assertEqual(model.batches, [3, 1])
+        self.assertEqual(self.documents[2]["score"], 0.9 - 0.2)
+    
+    @patch('src.reranker.time.perf_counter')
+    def test_latency_budget_stops_scoring(self, mock_clock):
+        mock_clock.side_effect = [0.0, 1.0, 1.0]
+        model = FakeCrossEncoder()
+        reranker = Reranker(model=model, batch_size=2, latency_budget=0.5, enabled=True)
+        
+        results = reranker.rerank("bleu score", self.documents, top_n=4)
+        
+        self.assertEqual(model.batches, [2])
+        self.assertEqual(reranker.last_stats["scored"], 2)
+        self.assertEqual([doc["id"] for doc in results[2:]], [2, 3])
+        self.assertEqual(results[2]["score"], 0.0)
+    
+    def test_missing_dependency_disables_reranking(self):
+        reranker = Reranker(enabled=True)
+        
+        with patch.dict('sys.modules', {'sentence_transformers': None}):
+            self.assertFalse(reranker.available)
+            results = reranker.rerank("query", self.documents, top_n=2)
+        
+        self.assertEqual([doc["id"] for doc in results], [0, 1])
+    
+    def test_disabled_reranker_is_unavailable(self):
+        model = MagicMock()
+        reranker = Reranker(model=model, enabled=False)
+        
+        self.assertFalse(reranker.available)
+
+
+if __name__ == "__main__":
+    unittest.main()
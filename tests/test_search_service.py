@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from src.cache import SemanticCache
+from src.search_service import SearchService
+
+
+class TestSearchService(unittest.TestCase):
+    def setUp(self):
+        self.service = SearchService(api_key="test_api_key")
+        self.service.semantic_cache = SemanticCache(max_size=8, threshold=0.9)
+        self.api_response = {
+            "answer": "Canberra is the capital of Australia.",
+            "results": [{"title": "Canberra", "content": "Capital city", "url": "https://example.com"}]
+        }
+    
+    def _mock_post(self, mock_post):
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.api_response
+        mock_post.return_value = mock_response
+    
+    @patch('src.search_service.http_client.post')
+    def test_search_success(self, mock_post):
+        self._mock_post(mock_post)
+        
+        result = self.service.search("What is the capital of Australia?")
+        
+        self.assertEqual(result["answer"], "Canberra is the capital of Australia.")
+        self.assertEqual(result["results"][0]["title"], "Canberra")
+    
+    @patch('src.search_service.http_client.post')
+    def test_search_is_cached_by_normalized_query(self, mock_post):
+        self._mock_post(mock_post)
+        
+        first = self.service.search("What is the capital of Australia?")
+        first["results"].clear()
+        second = self.service.search("  what is the CAPITAL of australia? ")
+        
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(len(second["results"]), 1)
+        
+        self.service.search("What is the capital of Australia?", max_results=3)
+        self.assertEqual(mock_post.call_count, 2)
+    
+    @patch('src.search_service.http_client.post')
+    def test_semantic_cache_reuses_near_duplicate_queries(self, mock_post):
+        self._mock_post(mock_post)
+        
+        self.service.search("What is the capital of Australia?", query_embedding=[1.0, 0.0, 0.1])
+        similar = self.service.search("Which city is Australia's capital?", query_embedding=[1.0, 0.0, 0.12])
+        self.service.search("Who won the 2022 world cup?", query_embedding=[0.0, 1.0, 0.0])
+        
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(similar["query"], "What is the capital of Australia?")
+    
+    def test_search_without_api_key(self):
+        service = SearchService(api_key="")
+        service.api_key = ""
+        
+        with self.assertRaises(ValueError):
+            service.search("anything")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import asyncio
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from src.vector_store import VectorStore
 
 
@@ -11,6 +12,20 @@ class TestVectorStore(unittest.TestCase):
                 collection_name="test_collection"
             )
     
+    @patch('src.vector_store.AsyncQdrantClient')
+    def test_async_client_is_closed_with_its_loop(self, mock_async_client_class):
+        mock_async_client_class.side_effect = lambda **kwargs: MagicMock(close=AsyncMock())
+        
+        async def use_client():
+            return self.store._get_async_client()
+        
+        first = asyncio.run(use_client())
+        second = asyncio.run(use_client())
+        
+        self.assertIsNot(first, second)
+        first.close.assert_awaited_once()
+        second.close.assert_awaited_once()
+    
     @patch('src.vector_store.QdrantClient')
     def test_vector_store_initialization(self, mock_client):
         store = VectorStore(
@@ -37,7 +52,63 @@ class TestVectorStore(unittest.TestCase):
         result = store.add_embeddings(embeddings, documents)
         
         self.assertTrue(result)
-        self.assertEqual(store.id_counter, 2)
+        points = mock_client.upsert.call_args[1]["points"]
+        self.assertEqual(len(points), 2)
+        self.assertNotEqual(points[0].id, points[1].id)
+        
+        store.add_embeddings(embeddings, documents)
+        repeated = mock_client.upsert.call_args[1]["points"]
+        self.assertEqual([p.id for p in repeated], [p.id for p in points])
+    
+    @patch('src.vector_store.QdrantClient')
+    def test_add_embeddings_in_batches(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        
+        store = VectorStore(collection_name="test", upsert_batch_size=2, upsert_workers=2)
+        
+        embeddings = [[0.1, 0.2]] * 5
+        documents = [{"content": f"Document {i}", "source": "source1", "chunk_id": i} for i in range(5)]
+        store.add_embeddings(embeddings, documents)
+        
+        batch_sizes = sorted(len(call[1]["points"]) for call in mock_client.upsert.call_args_list)
+        self.assertEqual(batch_sizes, [1, 2, 2])
+    
+    @patch('src.vector_store.time.sleep')
+    @patch('src.vector_store.QdrantClient')
+    def test_add_embeddings_retries_failed_batches_only(self, mock_client_class, mock_sleep):
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        attempts = {}
+        
+        def flaky_upsert(collection_name, points):
+            first_id = points[0].id
+            attempts[first_id] = attempts.get(first_id, 0) + 1
+            if points[0].payload["chunk_id"] == 2 and attempts[first_id] == 1:
+                raise TimeoutError("upsert timed out")
+        
+        mock_client.upsert.side_effect = flaky_upsert
+        store = VectorStore(collection_name="test", upsert_batch_size=2, upsert_workers=1)
+        
+        embeddings = [[0.1, 0.2]] * 4
+        documents = [{"content": f"Document {i}", "source": "source1", "chunk_id": i} for i in range(4)]
+        store.add_embeddings(embeddings, documents)
+        
+        self.assertEqual(mock_client.upsert.call_count, 3)
+        self.assertEqual(sorted(attempts.values()), [1, 2])
+    
+    @patch('src.vector_store.time.sleep')
+    @patch('src.vector_store.QdrantClient')
+    def test_add_embeddings_gives_up_after_retries(self, mock_client_class, mock_sleep):
+        mock_client = MagicMock()
+        mock_client.upsert.side_effect = TimeoutError("upsert timed out")
+        mock_client_class.return_value = mock_client
+        
+        store = VectorStore(collection_name="test", upsert_max_retries=2)
+        
+        with self.assertRaises(RuntimeError):
+            store.add_embeddings([[0.1, 0.2]], [{"content": "Document", "source": "source1"}])
+        self.assertEqual(mock_client.upsert.call_count, 3)
     
     @patch('src.vector_store.QdrantClient')
     def test_add_embeddings_mismatch(self, mock_client_class):
@@ -55,6 +126,21 @@ class TestVectorStore(unittest.TestCase):
         with self.assertRaises(ValueError):
             store.add_embeddings(embeddings, documents)
     
+    @patch('src.vector_store.QdrantClient')
+    def test_delete_points(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client_class.return_value = mock_client
+        
+        store = VectorStore(collection_name="test")
+        
+        self.assertTrue(store.delete_points([3, 4]))
+        points_selector = mock_client.delete.call_args[1]["points_selector"]
+        self.assertEqual(points_selector.points, [3, 4])
+        
+        mock_client.delete.reset_mock()
+        store.delete_points([])
+        mock_client.delete.assert_not_called()
+    
     @patch('src.vector_store.QdrantClient')
     def test_search(self, mock_client_class):
         mock_client = MagicMock()
@@ -100,6 +186,109 @@ class TestVectorStore(unittest.TestCase):
         self.assertEqual(stats["vector_count"], 100)
         self.assertEqual(stats["vector_size"], 384)
 
+    @patch('src.vector_store.QdrantClient')
+    def test_cached_stats(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client.get_collection.return_value.points_count = 100
+        mock_client_class.return_value = mock_client
+        
+        store = VectorStore(collection_name="test")
+        
+        self.assertEqual(store.get_cached_stats()["vector_count"], 100)
+        self.assertEqual(store.get_cached_stats()["vector_count"], 100)
+        self.assertEqual(mock_client.get_collection.call_count, 1)
+        
+        store.add_embeddings([[0.1, 0.2]], [{"content": "Document", "source": "source1"}])
+        store.get_cached_stats()
+        self.assertEqual(mock_client.get_collection.call_count, 2)
+        
+        store.stats_ttl = 0
+        store.get_cached_stats()
+        self.assertEqual(mock_client.get_collection.call_count, 3)
+    
+    @patch('src.vector_store.QdrantClient')
+    def test_cached_stats_when_unavailable(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client.get_collection.side_effect = Exception("Collection not found")
+        mock_client_class.return_value = mock_client
+        
+        store = VectorStore(collection_name="test")
+        
+        self.assertEqual(store.get_cached_stats()["vector_count"], 0)
+        store.get_cached_stats()
+        self.assertEqual(mock_client.get_collection.call_count, 1)
+    
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            VectorStore(collection_name="test", backend="sqlite")
+    
+    @patch('src.vector_store.QdrantClient')
+    def test_local_backend_uses_path(self, mock_client_class):
+        store = VectorStore(collection_name="test", backend="local", path="/tmp/qdrant-test")
+        
+        mock_client_class.assert_called_once_with(path="/tmp/qdrant-test")
+        self.assertEqual(store.upsert_workers, 1)
+
+
+class TestInMemoryVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.store = VectorStore(collection_name="test", vector_size=3, backend="memory")
+        self.store.create_collection()
+    
+    def test_add_search_delete_round_trip(self):
+        documents = [
+            {"content": "Attention is all you need", "source": "paper.pdf", "chunk_id": 0,
+             "metadata": {"page_start": 1}},
+            {"content": "Weather report", "source": "other.pdf", "chunk_id": 0},
+        ]
+        self.store.add_embeddings([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], documents)
+        
+        results = self.store.search([0.9, 0.1, 0.0], top_k=1)
+        
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["document"], "Attention is all you need")
+        self.assertEqual(results[0]["metadata"]["page_start"], 1)
+        self.assertEqual(self.store.get_stats()["vector_count"], 2)
+        
+        self.store.delete_points([results[0]["id"]])
+        self.assertEqual(self.store.get_stats()["vector_count"], 1)
+    
+    def test_scroll_documents(self):
+        documents = [{"content": f"Chunk {i}", "source": "paper.pdf", "chunk_id": i} for i in range(5)]
+        self.store.add_embeddings([[1.0, float(i), 0.0] for i in range(5)], documents)
+        
+        scrolled = list(self.store.scroll_documents(batch_size=2))
+        
+        self.assertEqual(sorted(doc["content"] for doc in scrolled), [f"Chunk {i}" for i in range(5)])
+        self.assertTrue(all(doc["source"] == "paper.pdf" and "content_hash" in doc["metadata"] for doc in scrolled))
+
+    
+    def test_update_positions(self):
+        document = {"content": "Reused chunk", "source": "paper.pdf", "chunk_id": 2,
+                    "metadata": {"source": "paper.pdf", "page_start": 1, "page_end": 1}}
+        self.store.add_embeddings([[1.0, 0.0, 0.0]], [document])
+        stored_id = self.store.search([1.0, 0.0, 0.0], top_k=1)[0]["id"]
+        
+        self.store.update_positions([dict(document, point_id=stored_id, chunk_id=5,
+                                          metadata={"source": "paper.pdf", "page_start": 3, "page_end": 4})])
+        
+        result = self.store.search([1.0, 0.0, 0.0], top_k=1)[0]
+        self.assertEqual(result["chunk_id"], 5)
+        self.assertEqual(result["metadata"]["page_start"], 3)
+        self.assertEqual(result["document"], "Reused chunk")
+        self.assertEqual(result["source"], "paper.pdf")
+
+
+class TestInMemoryVectorStoreAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_asearch(self):
+        store = VectorStore(collection_name="test", vector_size=3, backend="memory")
+        store.create_collection()
+        store.add_embeddings([[1.0, 0.0, 0.0]], [{"content": "Document", "source": "source1"}])
+        
+        results = await store.asearch([1.0, 0.0, 0.0], top_k=1)
+        
+        self.assertEqual(results[0]["document"], "Document")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,10 @@
+import asyncio
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
+import httpx
+from src.http_client import HTTPClient
 from src.weather_service import WeatherService
 
 
@@ -22,7 +27,7 @@ class TestWeatherService(unittest.TestCase):
             "cod": "200"
         }
     
-    @patch('src.weather_service.requests.get')
+    @patch('src.weather_service.http_client.get')
     def test_get_weather_success(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = self.mock_response
@@ -35,7 +40,7 @@ class TestWeatherService(unittest.TestCase):
         self.assertEqual(result["temperature"], 15.5)
         self.assertEqual(result["humidity"], 72)
     
-    @patch('src.weather_service.requests.get')
+    @patch('src.weather_service.http_client.get')
     def test_get_weather_city_not_found(self, mock_get):
         import requests
         mock_response = MagicMock()
@@ -46,7 +51,7 @@ class TestWeatherService(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.service.get_weather("NonExistentCity")
     
-    @patch('src.weather_service.requests.get')
+    @patch('src.weather_service.http_client.get')
     def test_get_weather_api_error(self, mock_get):
         mock_get.side_effect = Exception("API Error")
         
@@ -74,7 +79,7 @@ class TestWeatherService(unittest.TestCase):
         self.assertIn("Partly cloudy", text)
         self.assertIn("72%", text)
     
-    @patch('src.weather_service.requests.get')
+    @patch('src.weather_service.http_client.get')
     def test_validate_api_key(self, mock_get):
         mock_response = MagicMock()
         mock_response.json.return_value = self.mock_response
@@ -84,6 +89,131 @@ class TestWeatherService(unittest.TestCase):
         
         self.assertTrue(result)
 
+    
+    @patch('src.weather_service.http_client.get')
+    def test_get_weather_is_cached_by_normalized_city(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.mock_response
+        mock_get.return_value = mock_response
+        
+        first = self.service.get_weather("London")
+        first["temperature"] = 99
+        second = self.service.get_weather("  LONDON ")
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(second["temperature"], 15.5)
+        
+        self.service.get_weather("London", units="imperial")
+        self.assertEqual(mock_get.call_count, 2)
+    
+    @patch('src.weather_service.http_client.get')
+    def test_concurrent_lookups_are_coalesced(self, mock_get):
+        release = threading.Event()
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.mock_response
+        
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return mock_response
+        
+        mock_get.side_effect = slow_get
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.service.get_weather("London")))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while not self.service._single_flight.in_flight(("london", "metric")):
+            time.sleep(0.01)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result["city"] == "London" for result in results))
+    
+    @patch('src.cache.time.monotonic')
+    @patch('src.weather_service.http_client.get')
+    def test_stale_entry_is_served_while_refreshing(self, mock_get, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.mock_response
+        mock_get.return_value = mock_response
+        self.service.get_weather("London")
+        
+        refreshed = dict(self.mock_response, main={"temp": 20.0})
+        mock_response.json.return_value = refreshed
+        mock_monotonic.return_value = 1000.0 + self.service.cache_ttl + 1
+        
+        stale = self.service.get_weather("London")
+        self.assertEqual(stale["temperature"], 15.5)
+        
+        deadline = time.time() + 5
+        while self.service._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+        
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self.service.get_weather("London")["temperature"], 20.0)
+    
+    @patch('src.weather_service.http_client.get')
+    def test_validate_api_key_bypasses_cache(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.json.return_value = self.mock_response
+        mock_get.return_value = mock_response
+        
+        self.service.get_weather("London")
+        self.service.validate_api_key()
+        
+        self.assertEqual(mock_get.call_count, 2)
+
+
+
+class TestWeatherServiceAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.service = WeatherService(api_key="test_api_key")
+        self.service.http = HTTPClient(max_retries=0)
+    
+    def _patch_client(self, handler):
+        transport = httpx.MockTransport(handler)
+        real_client = httpx.AsyncClient
+        return patch('src.http_client.httpx.AsyncClient',
+                     side_effect=lambda **kwargs: real_client(**dict(kwargs, transport=transport)))
+    
+    async def test_aget_weather_success(self):
+        def handler(request):
+            self.assertEqual(request.url.params["q"], "London")
+            return httpx.Response(200, json={"name": "London", "sys": {"country": "GB"},
+                                             "main": {"temp": 15.5}, "weather": [{"description": "Cloudy"}]})
+        
+        with self._patch_client(handler):
+            result = await self.service.aget_weather("London")
+        
+        self.assertEqual(result["city"], "London")
+        self.assertEqual(result["temperature"], 15.5)
+    
+    async def test_aget_weather_city_not_found(self):
+        with self._patch_client(lambda request: httpx.Response(404, json={"message": "city not found"})):
+            with self.assertRaises(ValueError):
+                await self.service.aget_weather("NonExistentCity")
+    
+    async def test_aget_weather_coalesces_concurrent_lookups(self):
+        calls = []
+        
+        async def handler(request):
+            calls.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={"name": "Paris", "sys": {"country": "FR"},
+                                             "main": {"temp": 21.0}, "weather": [{"description": "Clear"}]})
+        
+        with self._patch_client(handler):
+            results = await asyncio.gather(*[self.service.aget_weather("Paris") for _ in range(5)])
+            cached = await self.service.aget_weather("paris")
+        
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result["temperature"] == 21.0 for result in results))
+        self.assertEqual(cached["city"], "Paris")
+
 
 if __name__ == "__main__":
     unittest.main()